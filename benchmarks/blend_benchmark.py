@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Benchmark translucent shapes blended on their bounding box against
+compositing a canvas-sized RGBA layer per shape.
+
+Usage:
+    python benchmarks/blend_benchmark.py
+"""
+
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from PIL import Image, ImageDraw  # noqa: E402
+
+from shape_canvas import geometry  # noqa: E402
+from shape_canvas.shapes import Circle  # noqa: E402
+
+
+def full_canvas(canvas: Image.Image, radius: int) -> None:
+    """Composite one translucent circle through a canvas-sized RGBA layer."""
+    layer = Image.new("RGBA", canvas.size, (0, 0, 0, 0))
+    x, y = canvas.width // 2, canvas.height // 2
+    ImageDraw.Draw(layer).ellipse([x - radius, y - radius, x + radius, y + radius],
+                                  fill=(30, 60, 250, 128))
+    canvas.paste(Image.alpha_composite(canvas.convert("RGBA"), layer).convert("RGB"))
+
+
+def measure(func, repeat: int = 5) -> float:
+    """Get the best time of one call in milliseconds."""
+    return min(timeit.repeat(func, number=1, repeat=repeat)) * 1000
+
+
+def main() -> None:
+    """Run the benchmark and print per-shape costs."""
+    backend = "numpy" if geometry.has_numpy() else "pillow"
+    print(f"Blending with {backend}")
+    print(f"{'canvas':>12} {'radius':>7} {'full canvas ms':>15} {'bbox ms':>9} {'speed-up':>9} "
+          f"{'multiply ms':>12}")
+    for width, height in ((1000, 1000), (4000, 3000), (8000, 8000)):
+        canvas = Image.new("RGB", (width, height), (255, 255, 255))
+        for radius in (10, 100, 400):
+            shape = Circle({"type": "circle", "center": [width // 2, height // 2], "radius": radius,
+                            "fill_color": [30, 60, 250], "opacity": 0.5})
+            multiply = Circle(dict(shape.data, blend_mode="multiply"))
+            repeat = 3 if width * height > 10 ** 7 else 5
+            full_ms = measure(lambda: full_canvas(canvas, radius), repeat)
+            bbox_ms = measure(lambda: shape.paint(canvas), repeat)
+            multiply_ms = measure(lambda: multiply.paint(canvas), repeat)
+            print(f"{width:>6}x{height:<5} {radius:7} {full_ms:15.2f} {bbox_ms:9.3f} "
+                  f"{full_ms / bbox_ms:8.0f}x {multiply_ms:12.3f}")
+
+
+if __name__ == "__main__":
+    main()
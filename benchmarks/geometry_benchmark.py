@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Benchmark NumPy against pure-Python sampling of curve geometry.
+
+Usage:
+    python benchmarks/geometry_benchmark.py
+"""
+
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from shape_canvas import geometry  # noqa: E402
+
+
+CASES = [
+    ("sine_wave width=20000", lambda: geometry.sine_wave((0, 500), 20000, 80, 40, 20000)),
+    ("wave_along_line length=50000",
+     lambda: geometry.wave_along_line((0, 0), (30000, 40000), 20, 200, 10000)),
+    ("spiral turns=400", lambda: geometry.spiral((500, 500), 450, 400, 400 * 50)),
+    ("helix turns=400", lambda: geometry.helix((500, 500), 120, 900, 400, 400 * 30)),
+    ("quadratic_bezier 20000 points",
+     lambda: geometry.quadratic_bezier((0, 0), (500, -300), (1000, 0), 20000)),
+    ("heart 20000 points", lambda: geometry.heart((500, 500), 12, 30, 20000)),
+]
+
+
+def measure(func, repeat: int = 5) -> float:
+    """Get the best time of one call in milliseconds."""
+    return min(timeit.repeat(func, number=1, repeat=repeat)) * 1000
+
+
+def main() -> None:
+    """Run the benchmark and print a comparison table."""
+    if not geometry.has_numpy():
+        print("NumPy is not installed; only the pure-Python backend is available.")
+        return
+
+    numpy_module = geometry.np
+    print(f"{'case':32} {'python ms':>10} {'numpy ms':>10} {'speed-up':>9}")
+    for name, func in CASES:
+        geometry.np = None
+        python_ms = measure(func)
+        geometry.np = numpy_module
+        numpy_ms = measure(func)
+        print(f"{name:32} {python_ms:10.2f} {numpy_ms:10.2f} {python_ms / numpy_ms:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Benchmark drawing from parsed parameter records against re-validating shape data.
+
+Each shape is drawn once reading ``shape.params`` and once with its record
+set aside, so every accessor validates the raw data again as it did before
+shapes were parsed at construction.
+
+Usage:
+    python benchmarks/params_benchmark.py
+"""
+
+import sys
+import timeit
+from pathlib import Path
+
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from shape_canvas.params import NO_PARAMS  # noqa: E402
+from shape_canvas.shapes import ShapeFactory  # noqa: E402
+
+
+SHAPES = [
+    {"type": "circle", "center": [100, 100], "radius": 30, "fill_color": [255, 0, 0],
+     "outline_color": [0, 0, 0], "border_width": 2},
+    {"type": "rectangle", "start": [10, 10], "end": [90, 60], "fill_color": [0, 255, 0],
+     "outline_color": [0, 0, 0], "border_width": 2},
+    {"type": "star", "center": [100, 100], "size": 40, "fill_color": [255, 200, 0],
+     "outline_color": [0, 0, 0], "border_width": 1},
+    {"type": "straight_line", "start": [20, 100], "end": [180, 120], "fill_color": [0, 0, 255],
+     "border_width": 3},
+]
+
+NUMBER = 20000
+
+
+def measure(func) -> float:
+    """Get the best time of one call in microseconds."""
+    return min(timeit.repeat(func, number=NUMBER, repeat=7)) / NUMBER * 1e6
+
+
+def main() -> None:
+    """Run the benchmark and print a comparison table."""
+    image = Image.new("RGB", (200, 200))
+    print(f"{'shape':14} {'construct us':>13} {'re-validate us':>15} {'record us':>10} {'speed-up':>9}")
+    for data in SHAPES:
+        construct_us = measure(lambda: ShapeFactory.create_shape(data))
+        shape = ShapeFactory.create_shape(data)
+        record_us = measure(lambda: shape.draw(image))
+
+        def revalidate() -> None:
+            # Accessors parse the raw data again while no record is set
+            params, shape.params, shape._data = shape.params, NO_PARAMS, data
+            shape._parsing = {}
+            shape.draw(image)
+            shape.params = params
+            del shape._parsing
+
+        revalidate_us = measure(revalidate)
+        print(f"{data['type']:14} {construct_us:13.2f} {revalidate_us:15.2f} {record_us:10.2f} "
+              f"{revalidate_us / record_us:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
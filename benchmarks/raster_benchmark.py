@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark the NumPy raster backend against drawing each shape with ImageDraw.
+
+Usage:
+    python benchmarks/raster_benchmark.py
+"""
+
+import random
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from PIL import Image  # noqa: E402
+
+from shape_canvas import geometry  # noqa: E402
+from shape_canvas.displaylist import DisplayList  # noqa: E402
+from shape_canvas.batch import ShapeBatch  # noqa: E402
+from shape_canvas.raster import new_image  # noqa: E402
+from shape_canvas.shapes import Circle, Rectangle  # noqa: E402
+
+
+SIZE = (1600, 1200)
+LARGE = (8000, 8000)
+BACKGROUND = (255, 255, 255)
+
+
+def make_shapes(kind: str, count: int, extent: int, seed: int = 0) -> list:
+    """Create randomly placed circles or rectangles of up to the given extent."""
+    rng = random.Random(seed)
+    shapes = []
+    for _ in range(count):
+        style = {
+            "fill_color": [rng.randrange(256) for _ in range(3)],
+            "outline_color": [rng.randrange(256) for _ in range(3)],
+            "border_width": rng.randrange(0, 3),
+        }
+        x, y = rng.randrange(SIZE[0]), rng.randrange(SIZE[1])
+        if kind == "circle":
+            shapes.append(Circle(dict(style, type="circle", center=[x, y],
+                                      radius=rng.randrange(2, extent))))
+        else:
+            shapes.append(Rectangle(dict(style, type="rectangle", start=[x, y],
+                                         end=[x + rng.randrange(extent), y + rng.randrange(extent)])))
+    return shapes
+
+
+def make_batch(kind: str, count: int, extent: int, seed: int = 0, size: tuple = SIZE) -> ShapeBatch:
+    """Create a batch of equally sized circles or squares with random positions and colors."""
+    rng = random.Random(seed)
+    points = [[rng.randrange(size[0]), rng.randrange(size[1])] for _ in range(count)]
+    colors = [[rng.randrange(256) for _ in range(3)] for _ in range(count)]
+    if kind == "circle":
+        return ShapeBatch({"type": "shape_batch", "shape": "circle", "center": points,
+                           "radius": extent, "fill_color": colors})
+    return ShapeBatch({"type": "shape_batch", "shape": "rectangle", "start": points,
+                       "end": [[x + extent, y + extent] for x, y in points], "fill_color": colors})
+
+
+def measure(func, repeat: int = 5) -> float:
+    """Get the best time of one call in milliseconds."""
+    return min(timeit.repeat(func, number=1, repeat=repeat)) * 1000
+
+
+def main() -> None:
+    """Run the benchmark and print a comparison table."""
+    if not geometry.has_numpy():
+        print("NumPy is not installed; the raster backend is not available.")
+        return
+
+    print(f"{'case':36} {'imagedraw ms':>12} {'numpy ms':>10} {'speed-up':>9}")
+    cases = []
+    for kind in ("circle", "rectangle"):
+        for count, extent in ((1000, 12), (10000, 12), (10000, 40), (2000, 150)):
+            cases.append((f"{count} {kind}s up to {extent}px", make_shapes(kind, count, extent), SIZE))
+        for count, extent in ((10000, 4), (100000, 4)):
+            cases.append((f"{count} {kind}s of {extent}px (batch)", [make_batch(kind, count, extent)], SIZE))
+    # Shapes scattered over a large canvas, covering a small part of it
+    cases.append(("200000 circles of 4px on 8000x8000", [make_batch("circle", 200000, 4, size=LARGE)], LARGE))
+
+    for name, shapes, size in cases:
+        display_list = DisplayList.compile(shapes, size)
+        image = Image.new("RGB", size, BACKGROUND)
+
+        def imagedraw():
+            for shape in shapes:
+                shape.draw(image)
+
+        canvas = new_image(size, BACKGROUND)
+        repeat = 5 if size == SIZE else 3
+        imagedraw_ms = measure(imagedraw, repeat)
+        numpy_ms = measure(lambda: display_list.execute(canvas, raster_backend=True), repeat)
+        print(f"{name:36} {imagedraw_ms:12.2f} {numpy_ms:10.2f} {imagedraw_ms / numpy_ms:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
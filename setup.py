@@ -36,6 +36,7 @@ setup(
     python_requires=">=3.8",
     install_requires=requirements,
     extras_require={
+        "numpy": ["numpy>=1.20"],
         "dev": [
             "pytest>=7.0.0",
             "pytest-cov>=4.0.0",
@@ -0,0 +1,293 @@
+"""Columnar batches of simple shapes for ShapeCanvas.
+
+A batch stores many circles, rectangles or straight lines as one column
+per parameter instead of one object and one JSON dict per shape. Columns
+are NumPy arrays when NumPy is installed and lists otherwise; a column
+given as a single value applies to every shape of the batch.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from PIL import Image
+
+from . import geometry
+from .compositing import surface_area
+from .exceptions import ValidationError
+from .shapes import BOUNDS_MARGIN, BaseShape, ShapeFactory, ShapeType
+
+
+Box = Tuple[float, float, float, float]
+
+# Marks columns without a default
+REQUIRED = object()
+
+# Columns of each batchable shape type: (name, values per shape (0 for a
+# scalar), kind, minimum, default). Minimums and defaults follow the
+# single-shape classes; a missing border width draws 1 pixel wide.
+BATCH_COLUMNS: Dict[str, Tuple[Tuple[str, int, str, int, Any], ...]] = {
+    "circle": (
+        ("center", 2, "point", 0, REQUIRED),
+        ("radius", 0, "int", 1, REQUIRED),
+        ("fill_color", 3, "color", 0, (0, 0, 0)),
+        ("outline_color", 3, "color", 0, (0, 0, 0)),
+        ("border_width", 0, "int", 0, 1),
+    ),
+    "rectangle": (
+        ("start", 2, "point", 0, REQUIRED),
+        ("end", 2, "point", 0, REQUIRED),
+        ("fill_color", 3, "color", 0, (0, 0, 0)),
+        ("outline_color", 3, "color", 0, (0, 0, 0)),
+        ("border_width", 0, "int", 0, 1),
+    ),
+    "straight_line": (
+        ("start", 2, "point", 0, REQUIRED),
+        ("end", 2, "point", 0, REQUIRED),
+        ("fill_color", 3, "color", 0, (0, 0, 0)),
+        ("border_width", 0, "int", 1, REQUIRED),
+    ),
+}
+
+
+def _is_number(value: Any, integer: bool) -> bool:
+    """Check a single value: an int, or any real number for coordinates."""
+    if isinstance(value, bool):
+        return False
+    return isinstance(value, int) if integer else isinstance(value, (int, float))
+
+
+class ShapeBatch(BaseShape):
+    """Batch of shapes of one type stored column by column."""
+
+    __slots__ = ()
+
+    # Display lists keep the batch itself rather than a primitive per shape
+    deferred = True
+
+    def __init__(self, data: Dict[str, Any]):
+        """Initialize batch with data, releasing the source columns once parsed."""
+        super().__init__(data)
+        self.compact()
+
+    def __len__(self) -> int:
+        return int(self.params.shape_count)
+
+    def validate(self) -> None:
+        """Validate batch data, converting every column at once."""
+        data = self._data if self._data is not None else self.data
+        shape = data.get('shape')
+        if shape not in BATCH_COLUMNS:
+            raise ValidationError(f"Batches support {', '.join(BATCH_COLUMNS)}, got {shape!r}")
+        self._parsing['shape'] = shape
+
+        columns = BATCH_COLUMNS[shape]
+        # The first column gives one row per shape; a single row such as
+        # [400, 300] would otherwise be read as two shapes
+        first = data.get(columns[0][0])
+        count = self._count(columns[0][0], first) if first is not None else 0
+        self._parsing['shape_count'] = count
+        for name, width, kind, minimum, default in columns:
+            value = data.get(name, default)
+            if value is REQUIRED:
+                raise ValidationError(f"Batch column {name} is required")
+            self._parsing[name] = self._column(name, value, count, width, kind, minimum)
+
+        unknown = set(data) - {name for name, *_ in columns} - {'type', 'shape'}
+        if unknown:
+            raise ValidationError(f"Unknown batch columns for {shape}: {', '.join(sorted(unknown))}")
+
+    @staticmethod
+    def _count(name: str, first: Any) -> int:
+        """Get the number of shapes from the first column, which must hold one row per shape."""
+        ndim = getattr(first, 'ndim', None)
+        if ndim is not None:
+            rows = ndim == 2
+        elif isinstance(first, (list, tuple)):
+            rows = all(isinstance(row, (list, tuple)) or getattr(row, 'ndim', None) == 1 for row in first)
+        else:
+            rows = False
+        if not rows:
+            raise ValidationError(f"Batch column {name} must hold one row per shape, e.g. [[x, y], ...]")
+        return len(first)
+
+    def _column(self, name: str, value: Any, count: int, width: int, kind: str,
+                minimum: int) -> Any:
+        """Convert one column, broadcasting a single value to every shape."""
+        maximum = 255 if kind == "color" else None
+        np = geometry.np
+        if np is not None:
+            array = np.asarray(value)
+            if array.dtype == bool or not (np.issubdtype(array.dtype, np.integer) or
+                                           (kind == "point" and np.issubdtype(array.dtype, np.floating))):
+                raise ValidationError(f"Invalid values in batch column {name}")
+            shape = (count, width) if width else (count,)
+            if array.shape != shape:
+                if array.shape != shape[1:]:
+                    raise ValidationError(f"Batch column {name} must have shape {shape} or {shape[1:]}")
+                # A single value is shared by every shape without copying it
+                array = np.broadcast_to(array, shape)
+            if array.size and kind != "point":
+                if array.min() < minimum:
+                    raise ValidationError(f"Values in batch column {name} must be >= {minimum}")
+                if maximum is not None and array.max() > maximum:
+                    raise ValidationError(f"Values in batch column {name} must be <= {maximum}")
+            if kind == "color":
+                return array.astype(np.uint8, copy=False)
+            if np.issubdtype(array.dtype, np.integer) and array.size:
+                info = np.iinfo(np.int32)
+                if info.min <= array.min() and array.max() <= info.max:
+                    return array.astype(np.int32, copy=False)
+            return array
+
+        def check(item: Any) -> Any:
+            if width:
+                if not isinstance(item, (list, tuple)) or len(item) != width:
+                    raise ValidationError(f"Invalid values in batch column {name}")
+                values = item
+            else:
+                values = (item,)
+            for x in values:
+                if not _is_number(x, kind != "point"):
+                    raise ValidationError(f"Invalid values in batch column {name}")
+                if kind != "point" and x < minimum:
+                    raise ValidationError(f"Values in batch column {name} must be >= {minimum}")
+                if maximum is not None and x > maximum:
+                    raise ValidationError(f"Values in batch column {name} must be <= {maximum}")
+            return tuple(item) if width else item
+
+        if width:
+            single = all(not isinstance(x, (list, tuple)) for x in value) \
+                if isinstance(value, (list, tuple)) else False
+        else:
+            single = not isinstance(value, (list, tuple))
+        if single:
+            return [check(value)] * count
+        if not isinstance(value, (list, tuple)) or len(value) != count:
+            raise ValidationError(f"Batch column {name} must have one value per shape")
+        return [check(item) for item in value]
+
+    def _boxes(self) -> Any:
+        """Get the bounds of every shape as (left, top, right, bottom) columns."""
+        params = self.params
+        np = geometry.np
+        if params.shape == "circle":
+            columns = [params.center, params.radius]
+        else:
+            columns = [params.start, params.end]
+        # Lines, and rectangle borders wider than the rectangle, reach past the points
+        widths = None if params.shape == "circle" else params.border_width
+
+        if np is not None and not isinstance(columns[0], list):
+            a, b = columns
+            if params.shape == "circle":
+                lo = a - b[:, None]
+                hi = a + b[:, None]
+            else:
+                lo = np.minimum(a, b)
+                hi = np.maximum(a, b)
+            pad = BOUNDS_MARGIN if widths is None else np.asarray(widths)[:, None] + BOUNDS_MARGIN
+            return np.concatenate([lo - pad, hi + pad], axis=1)
+
+        boxes = []
+        for i, (a, b) in enumerate(zip(*columns)):
+            if params.shape == "circle":
+                lo = (a[0] - b, a[1] - b)
+                hi = (a[0] + b, a[1] + b)
+            else:
+                lo = (min(a[0], b[0]), min(a[1], b[1]))
+                hi = (max(a[0], b[0]), max(a[1], b[1]))
+            p = BOUNDS_MARGIN if widths is None else widths[i] + BOUNDS_MARGIN
+            boxes.append((lo[0] - p, lo[1] - p, hi[0] + p, hi[1] + p))
+        return boxes
+
+    def bounds(self) -> Optional[Box]:
+        """Get the extent of the whole batch."""
+        if not len(self):
+            return None
+        boxes = self._boxes()
+        if isinstance(boxes, list):
+            return (min(box[0] for box in boxes), min(box[1] for box in boxes),
+                    max(box[2] for box in boxes), max(box[3] for box in boxes))
+        left, top = boxes[:, :2].min(axis=0).tolist()
+        right, bottom = boxes[:, 2:].max(axis=0).tolist()
+        return (left, top, right, bottom)
+
+    def unclipped_parts(self, canvas_size: Tuple[int, int], min_size: float) -> List[Box]:
+        """Get the large shapes with fractional coordinates, and large lines wider than a pixel."""
+        if not len(self):
+            return []
+        params = self.params
+        boxes = self._boxes()
+        points = [params.center] if params.shape == "circle" else [params.start, params.end]
+
+        if isinstance(boxes, list):
+            parts = []
+            for i, box in enumerate(boxes):
+                if box[2] - box[0] <= min_size and box[3] - box[1] <= min_size:
+                    continue
+                clip_safe = all(float(x).is_integer() for column in points for x in column[i])
+                if params.shape == "straight_line" and params.border_width[i] > 1:
+                    clip_safe = False
+                if not clip_safe:
+                    parts.append(box)
+            return parts
+
+        np = geometry.np
+        large = (boxes[:, 2] - boxes[:, 0] > min_size) | (boxes[:, 3] - boxes[:, 1] > min_size)
+        clip_safe = np.ones(len(self), dtype=bool)
+        for column in points:
+            clip_safe &= (column == np.floor(column)).all(axis=1)
+        if params.shape == "straight_line":
+            clip_safe &= np.asarray(params.border_width) <= 1
+        return [tuple(box) for box in boxes[large & ~clip_safe].tolist()]
+
+    def _visible(self, canvas: Any) -> List[int]:
+        """Get the indices of the shapes touching the area a surface covers."""
+        area = surface_area(canvas)
+        boxes = self._boxes()
+        if isinstance(boxes, list):
+            return [i for i, box in enumerate(boxes)
+                    if box[0] < area[2] and box[2] >= area[0] and box[1] < area[3] and box[3] >= area[1]]
+        np = geometry.np
+        mask = ((boxes[:, 0] < area[2]) & (boxes[:, 2] >= area[0]) &
+                (boxes[:, 1] < area[3]) & (boxes[:, 3] >= area[1]))
+        indices: List[int] = np.flatnonzero(mask).tolist()
+        return indices
+
+    def _rows(self, names: Sequence[str], indices: List[int]) -> List[Any]:
+        """Get the values of the given columns for the given shapes as Python objects."""
+        rows = []
+        for name in names:
+            column = getattr(self.params, name)
+            if isinstance(column, list):
+                rows.append([column[i] for i in indices])
+                continue
+            values = column[indices].tolist()
+            rows.append([tuple(value) for value in values] if column.ndim == 2 else values)
+        return rows
+
+    def draw(self, canvas: Image.Image) -> Image.Image:
+        """Draw every shape of the batch that touches the canvas area, in order."""
+        indices = self._visible(canvas)
+        if not indices:
+            return canvas
+        draw = self._get_draw(canvas)
+
+        shape = self.params.shape
+        if shape == "circle":
+            rows = self._rows(("center", "radius", "fill_color", "outline_color", "border_width"),
+                              indices)
+            for (x, y), radius, fill_color, outline_color, border_width in zip(*rows):
+                draw.ellipse([(x - radius, y - radius), (x + radius, y + radius)],
+                             fill=fill_color, outline=outline_color, width=border_width)
+        elif shape == "rectangle":
+            rows = self._rows(("start", "end", "fill_color", "outline_color", "border_width"), indices)
+            for start, end, fill_color, outline_color, border_width in zip(*rows):
+                draw.rectangle([start, end], fill=fill_color, outline=outline_color, width=border_width)
+        else:
+            rows = self._rows(("start", "end", "fill_color", "border_width"), indices)
+            for start, end, fill_color, border_width in zip(*rows):
+                draw.line([start, end], fill=fill_color, width=border_width, joint="curve")
+        return canvas
+
+
+ShapeFactory.register_shape(ShapeType.SHAPE_BATCH, ShapeBatch)
@@ -1,18 +1,37 @@
 """Canvas class for ShapeCanvas library."""
 
 import logging
-from typing import Dict, Any, List, Optional, Union, Tuple
+import math
+import sys
+from dataclasses import replace
+from typing import Dict, Any, Iterable, List, Optional, Union, Tuple, cast
 from pathlib import Path
+from types import MappingProxyType
 
-from PIL import Image, ImageDraw
+from PIL import Image
 
 from .config import CanvasConfig, ConfigLoader
-from .shapes import ShapeFactory, BaseShape
+from .shapes import ShapeFactory, ShapeType, BaseShape
+from .batch import ShapeBatch
+from .instances import ShapeInstances
+from .tiling import TileSurface, drawing_area, plan_tiles, render_tiled, shape_extent, unclipped_extents
+from .grid import GridLayer, grid_layer, paste_grid
+from .spatial import SpatialIndex, find_occluded, intersects
+from .displaylist import DisplayList
+from .sprites import sprite_cache
+from .stream import iter_shapes
+from . import geometry, raster
 from .exceptions import DrawingError, ConfigurationError
 
 
 logger = logging.getLogger(__name__)
 
+# Tile edge length for anti-aliased rendering when no tile size is configured
+ANTIALIAS_TILE_SIZE = 256
+
+# Streamed shapes compiled and drawn together by render_stream()
+STREAM_CHUNK_SHAPES = 1024
+
 
 class Canvas:
     """Main canvas class for drawing shapes."""
@@ -39,59 +58,80 @@ class Canvas:
         
         self._canvas: Optional[Image.Image] = None
         self._shapes: List[BaseShape] = []
+        self._display_list: Optional[DisplayList] = None
+        self._visible: List[bool] = []
+        self._culled_count = 0
+        self._occluded_count = 0
+        self._overdraw_saved = 0
+        # Shapes before this position have been checked for occlusion
+        self._occlusion_checked = 0
+        self._rendered_count = 0
+        self._streamed_count = 0
+        self._grid_applied = False
+        self._grid_pending = False
+        self._config_loaded = False
+        # Work actually performed, reported by get_canvas_info()
+        self._config_loads = 0
+        self._grid_draws = 0
+        self._index = SpatialIndex()
+        # Values shared between compacted shapes
+        self._shared_values: Dict[Any, Any] = {}
         self._initialize_canvas()
         
         # Auto-load shapes if present in configuration
         if 'shapes' in self._raw_config:
             self.load_shapes_from_config()
-            # Add grid after loading shapes if configured
-            self.add_grid()
+            # Grid is drawn by the first render, so show_grid can still change
+            self._grid_pending = True
     
     def _initialize_canvas(self) -> None:
         """Initialize the blank canvas."""
         try:
-            self._canvas = Image.new('RGB', self.config.size, self.config.background_color)
+            if self.config.raster_backend:
+                self._canvas = raster.new_image(self.config.size, self.config.background_color)
+            else:
+                self._canvas = Image.new('RGB', self.config.size, self.config.background_color)
             logger.info(f"Canvas initialized with size {self.config.size}")
         except Exception as e:
             raise DrawingError(f"Failed to initialize canvas: {e}")
     
     def add_grid(self) -> 'Canvas':
-        """Add grid lines to the canvas."""
-        if not self.config.show_grid or self.config.line_interval is None:
+        """
+        Add grid lines to the canvas.
+        
+        The grid is drawn once; further calls do nothing until the canvas
+        is cleared.
+        """
+        self._grid_pending = False
+        if self._grid_applied or not self.config.show_grid or self.config.line_interval is None:
             return self
         
         if self._canvas is None:
             raise DrawingError("Canvas not initialized")
         
         try:
-            draw = ImageDraw.Draw(self._canvas)
-            width, height = self.config.size
-            interval = self.config.line_interval
-            line_color = self.config.line_color or "gray"
-            
-            # Draw vertical lines
-            for x in range(0, width, interval):
-                draw.line([(x, 0), (x, height)], fill=line_color)
-            
-            # Draw horizontal lines
-            for y in range(0, height, interval):
-                draw.line([(0, y), (width, y)], fill=line_color)
-            
-            # Add coordinate labels
-            num_units_x = width // interval
-            num_units_y = height // interval
-            
-            for x in range(num_units_x + 1):
-                for y in range(num_units_y + 1):
-                    coords = (x * interval, y * interval)
-                    draw.text(coords, f"({x * interval},{y * interval})", fill="black")
-            
-            logger.info(f"Grid added with interval {interval}")
+            paste_grid(self._canvas, self._grid_layer())
+            self._grid_applied = True
+            self._grid_draws += 1
+            logger.info(f"Grid added with interval {self.config.line_interval}")
         except Exception as e:
             raise DrawingError(f"Failed to add grid: {e}")
         
         return self
     
+    def _grid_layer(self) -> GridLayer:
+        """Get the cached grid overlay for this canvas configuration."""
+        if self.config.line_interval is None:
+            raise DrawingError("Grid line interval not set")
+        return grid_layer(self.config.size, self.config.line_interval,
+                          self.config.line_color or "gray")
+    
+    def _draw_background(self, image: Image.Image, origin: Tuple[int, int] = (0, 0)) -> None:
+        """Reset an image covering part of the canvas to background and grid."""
+        image.paste(self.config.background_color, (0, 0) + image.size)
+        if self._grid_applied:
+            paste_grid(image, self._grid_layer(), origin)
+    
     def add_shape(self, shape_data: Dict[str, Any]) -> 'Canvas':
         """
         Add a single shape to the canvas.
@@ -103,12 +143,10 @@ class Canvas:
             Self for method chaining
         """
         try:
-            # Validate shape data
-            ConfigLoader.validate_shape_data(shape_data)
-            
-            # Create shape instance
-            shape = ShapeFactory.create_shape(shape_data)
-            self._shapes.append(shape)
+            shape = self._create_shape(shape_data)
+            if self.config.compact_shapes:
+                shape.compact(self._shared_values)
+            self._append_shape(shape)
             
             logger.info(f"Added shape: {shape_data.get('type', 'unknown')}")
         except Exception as e:
@@ -117,6 +155,70 @@ class Canvas:
         
         return self
     
+    def _create_shape(self, shape_data: Dict[str, Any]) -> BaseShape:
+        """Validate shape data and create the shape with the canvas settings."""
+        ConfigLoader.validate_shape_data(shape_data)
+        shape = ShapeFactory.create_shape(shape_data)
+        if self.config.flatness is not None:
+            shape.flatness = self.config.flatness
+        shape.use_sprites = self.config.sprite_cache
+        return shape
+    
+    def add_batch(self, shape_type: str, **columns: Any) -> 'Canvas':
+        """
+        Add many shapes of one type from per-shape columns.
+        
+        The batch is validated and stored column by column, without a dict
+        or object per shape, and draws like the same shapes added one by one.
+        
+        Args:
+            shape_type: "circle", "rectangle" or "straight_line"
+            **columns: Shape parameters as arrays with one row per shape,
+                e.g. center=(N, 2), radius=(N,), fill_color=(N, 3); a single
+                value applies to every shape
+            
+        Returns:
+            Self for method chaining
+        """
+        try:
+            batch = ShapeBatch(dict(columns, type=ShapeType.SHAPE_BATCH.value, shape=shape_type))
+            self._append_shape(batch)
+            logger.info(f"Added batch of {len(batch)} {shape_type} shapes")
+        except Exception as e:
+            logger.error(f"Failed to add {shape_type} batch: {e}")
+            raise DrawingError(f"Failed to add batch: {e}")
+        
+        return self
+    
+    def add_instances(self, template: Dict[str, Any], offsets: Any, **overrides: Any) -> 'Canvas':
+        """
+        Add one shape placed at many offsets.
+        
+        The template is validated once; each placement is a copy moved by
+        its offset, stamped from the sprite cache when ``sprite_cache`` is
+        set and the shape supports it.
+        
+        Args:
+            template: Shape data of the shape to repeat
+            offsets: (dx, dy) offset of each placement
+            **overrides: Per-placement ``fill_colors`` or ``rotations``,
+                with one value per offset
+            
+        Returns:
+            Self for method chaining
+        """
+        return self.add_shape(dict(overrides, type=ShapeType.INSTANCES.value,
+                                   template=template, offsets=offsets))
+    
+    def _append_shape(self, shape: BaseShape) -> None:
+        """Store a shape and index its bounds."""
+        bounds = shape.bounds()
+        self._shapes.append(shape)
+        self._index.insert(len(self._shapes) - 1, bounds)
+        self._visible.append(bounds is None or intersects(bounds, (0, 0) + self.config.size))
+        if not self._visible[-1]:
+            self._culled_count += 1
+    
     def add_shapes(self, shapes_data: List[Dict[str, Any]]) -> 'Canvas':
         """
         Add multiple shapes to the canvas.
@@ -137,26 +239,364 @@ class Canvas:
         return self
     
     def load_shapes_from_config(self) -> 'Canvas':
-        """Load shapes from the original configuration."""
-        if 'shapes' in self._raw_config:
+        """
+        Load shapes from the original configuration.
+        
+        The shapes are loaded once; further calls do nothing until the
+        canvas is cleared. With ``compact_shapes`` the configuration's shape
+        list is released after loading, so it cannot be loaded again.
+        """
+        if 'shapes' in self._raw_config and not self._config_loaded:
             self.add_shapes(self._raw_config['shapes'])
+            self._config_loaded = True
+            self._config_loads += 1
+            if self.config.compact_shapes:
+                self._raw_config = {key: value for key, value in self._raw_config.items()
+                                    if key != 'shapes'}
+        return self
+    
+    def set_antialias(self, factor: Optional[int]) -> 'Canvas':
+        """
+        Configure supersampled anti-aliasing.
+        
+        Args:
+            factor: Supersampling factor per axis (2 to 8), or None or 1 to
+                draw aliased edges
+            
+        Returns:
+            Self for method chaining
+        """
+        self.config = replace(self.config, antialias=factor)
+        return self
+    
+    def set_tiling(self, tile_size: Optional[int], workers: Optional[int] = None) -> 'Canvas':
+        """
+        Configure tiled rendering.
+        
+        Args:
+            tile_size: Tile edge length in pixels, or None for sequential rendering
+            workers: Number of worker processes (defaults to the CPU count)
+            
+        Returns:
+            Self for method chaining
+        """
+        self.config = replace(self.config, tile_size=tile_size, workers=workers)
         return self
     
-    def render(self) -> 'Canvas':
-        """Render all shapes on the canvas."""
+    def render(self, region: Optional[Tuple[int, int, int, int]] = None,
+               full: bool = False) -> 'Canvas':
+        """
+        Render shapes on the canvas.
+        
+        Only shapes added since the previous render are drawn, on top of the
+        pixels already on the canvas. A grid requested by the configuration
+        is drawn first if it has not been added yet.
+        
+        Args:
+            region: Optional (left, top, right, bottom) box; when given, the
+                region is rebuilt from the background with every shape
+                intersecting it, and no other pixels change
+            full: Rebuild the whole canvas from the background and draw all shapes
+                
+        Returns:
+            Self for method chaining
+        """
         if self._canvas is None:
             raise DrawingError("Canvas not initialized")
         
+        if self._grid_pending:
+            self.add_grid()
+        
+        if region is not None:
+            return self._render_region(region)
+        
         try:
-            for shape in self._shapes:
-                self._canvas = shape.draw(self._canvas)
+            if full:
+                self._draw_background(self._canvas)
+                self._rendered_count = 0
             
-            logger.info(f"Rendered {len(self._shapes)} shapes")
+            start = self._rendered_count
+            if self._antialias_factor() > 1:
+                self._cull_occluded(start)
+                self._render_antialiased((0, 0, *self.config.size), start)
+            elif self.config.tile_size:
+                self._cull_occluded(start)
+                shapes = [shape for shape, visible in zip(self._shapes[start:], self._visible[start:])
+                          if visible]
+                self._canvas = render_tiled(self._canvas, shapes,
+                                            self.config.tile_size, self.config.workers)
+            else:
+                self.compile().execute(self._canvas, start=start,
+                                       raster_backend=bool(self.config.raster_backend))
+            
+            self._rendered_count = len(self._shapes)
+            culled = self._visible[start:].count(False)
+            logger.info(f"Rendered {len(self._shapes) - start - culled} shapes "
+                        f"({culled} off-canvas or hidden shapes culled)")
         except Exception as e:
             raise DrawingError(f"Failed to render shapes: {e}")
         
         return self
     
+    def render_stream(self, source: Union[str, Path, Iterable[Dict[str, Any]]],
+                      chunk_shapes: int = STREAM_CHUNK_SHAPES) -> 'Canvas':
+        """
+        Draw shapes read one at a time, without keeping them on the canvas.
+        
+        Shapes already on the canvas are rendered first. Each streamed shape
+        is then validated, drawn and discarded, a chunk of shapes at a time,
+        so memory use does not grow with the number of shapes. Invalid
+        shapes are skipped, as with ``add_shapes()``.
+        
+        Streamed shapes are not part of the canvas's shapes: they are not
+        indexed, occlusion culled or anti-aliased, and a full or region
+        render rebuilds pixels without them.
+        
+        Args:
+            source: NDJSON file with one shape per line, JSON file with a
+                ``shapes`` array (or a bare array), or any iterable of shape
+                data dictionaries
+            chunk_shapes: Number of shapes compiled and drawn together
+            
+        Returns:
+            Self for method chaining
+        """
+        self.render()
+        canvas = self._canvas
+        if canvas is None:
+            raise DrawingError("Canvas not initialized")
+        shapes = iter_shapes(source) if isinstance(source, (str, Path)) else iter(source)
+        area = (0, 0, *self.config.size)
+        chunk: List[BaseShape] = []
+        visible: List[bool] = []
+        drawn = skipped = 0
+        
+        def flush() -> None:
+            display_list = DisplayList([], self.config.size)
+            try:
+                display_list.extend(chunk, visible)
+                display_list.execute(canvas, raster_backend=bool(self.config.raster_backend))
+            except Exception as e:
+                raise DrawingError(f"Failed to render streamed shapes: {e}")
+            chunk.clear()
+            visible.clear()
+        
+        for shape_data in shapes:
+            try:
+                shape = self._create_shape(shape_data)
+            except Exception as e:
+                logger.error(f"Skipped streamed shape: {e}")
+                skipped += 1
+                continue
+            bounds = shape.bounds()
+            chunk.append(shape)
+            visible.append(bounds is None or intersects(bounds, area))
+            if not visible[-1]:
+                self._culled_count += 1
+            drawn += 1
+            if len(chunk) >= chunk_shapes:
+                flush()
+        if chunk:
+            flush()
+        
+        self._streamed_count += drawn
+        logger.info(f"Streamed {drawn} shapes ({skipped} invalid shapes skipped)")
+        return self
+    
+    def _render_region(self, region: Tuple[int, int, int, int]) -> 'Canvas':
+        """Rebuild a region from the background and the shapes intersecting it."""
+        if self._canvas is None:
+            raise DrawingError("Canvas not initialized")
+        width, height = self.config.size
+        box = (max(int(region[0]), 0), max(int(region[1]), 0),
+               min(int(region[2]), width), min(int(region[3]), height))
+        if box[0] >= box[2] or box[1] >= box[3]:
+            return self
+        
+        try:
+            if self._antialias_factor() > 1:
+                image = Image.new(self._canvas.mode, (box[2] - box[0], box[3] - box[1]))
+                self._draw_background(image, box[:2])
+                self._canvas.paste(image, box[:2])
+                self._render_antialiased(box)
+                logger.info(f"Rendered region {box} anti-aliased")
+                return self
+            
+            indices = self._index.query(box)
+            shapes = [self._shapes[i] for i in indices]
+            unclipped = [part for shape in shapes
+                         for part in unclipped_extents(shape, shape_extent(shape, self.config.size),
+                                                       self.config.size)
+                         if intersects(part, box)]
+            area = drawing_area(box, unclipped, self.config.size)
+            
+            image = Image.new(self._canvas.mode, (area[2] - area[0], area[3] - area[1]))
+            self._draw_background(image, (area[0], area[1]))
+            surface = TileSurface(image, (area[0], area[1]), self.config.size)
+            for shape in shapes:
+                # Tile surfaces draw in canvas coordinates like an image
+                shape.paint(cast(Image.Image, surface))
+            
+            local = (box[0] - area[0], box[1] - area[1], box[2] - area[0], box[3] - area[1])
+            self._canvas.paste(image.crop(local), box[:2])
+            
+            logger.info(f"Rendered {len(indices)} shapes in region {box}")
+        except Exception as e:
+            raise DrawingError(f"Failed to render region: {e}")
+        
+        return self
+    
+    def _antialias_factor(self) -> int:
+        """Get the configured supersampling factor, 1 when anti-aliasing is off."""
+        return self.config.antialias or 1
+    
+    def _render_antialiased(self, box: Tuple[int, int, int, int], start: int = 0) -> None:
+        """
+        Draw shapes supersampled, one tile at a time, into a box of the canvas.
+        
+        Each tile is enlarged from the canvas, the shapes touching it are
+        replayed at the supersampling factor, and the result is reduced
+        straight back into the canvas, so at most one enlarged tile is held
+        in memory.
+        
+        Args:
+            box: (left, top, right, bottom) canvas box to draw
+            start: Index of the first shape to draw
+        """
+        if self._canvas is None:
+            raise DrawingError("Canvas not initialized")
+        factor = self._antialias_factor()
+        display_list = self.compile()
+        # Scale about pixel centers: canvas pixel x covers factor pixels
+        # starting at (x - left) * factor in the enlarged tile
+        offset = 0.5 - 0.5 / factor
+        for tile in plan_tiles(self.config.size, self.config.tile_size or ANTIALIAS_TILE_SIZE):
+            part = (max(tile[0], box[0]), max(tile[1], box[1]), min(tile[2], box[2]), min(tile[3], box[3]))
+            if part[0] >= part[2] or part[1] >= part[3]:
+                continue
+            indices = [i for i in self._index.query(tile) if i >= start and self._visible[i]]
+            if not indices:
+                continue
+            
+            size = (tile[2] - tile[0], tile[3] - tile[1])
+            image = self._canvas.crop(tile).resize((size[0] * factor, size[1] * factor),
+                                                   Image.Resampling.NEAREST)
+            display_list.execute(image, scale=(factor, factor),
+                                 origin=(tile[0] - offset, tile[1] - offset),
+                                 shapes=indices, centers=True)
+            image = image.reduce(factor)
+            self._canvas.paste(image.crop((part[0] - tile[0], part[1] - tile[1],
+                                           part[2] - tile[0], part[3] - tile[1])), part[:2])
+    
+    def shapes_at(self, x: float, y: float) -> List[BaseShape]:
+        """
+        Get the shapes whose bounds contain a point.
+        
+        Args:
+            x: Point x coordinate
+            y: Point y coordinate
+            
+        Returns:
+            Shapes in drawing order
+        """
+        return [self._shapes[i] for i in self._index.query_point(x, y)]
+    
+    def shapes_in(self, bbox: Tuple[float, float, float, float]) -> List[BaseShape]:
+        """
+        Get the shapes whose bounds intersect a box.
+        
+        Args:
+            bbox: (left, top, right, bottom) box
+            
+        Returns:
+            Shapes in drawing order
+        """
+        return [self._shapes[i] for i in self._index.query(bbox)]
+    
+    def compile(self) -> DisplayList:
+        """
+        Compile the shapes into a display list of drawing primitives.
+        
+        Shapes lying completely off the canvas are culled, and with
+        ``occlusion_culling`` so are shapes hidden under a later opaque
+        shape. The display list grows as shapes are added, so each shape's
+        geometry is calculated only once.
+        
+        Returns:
+            DisplayList for the current shapes
+        """
+        if self._display_list is None:
+            self._display_list = DisplayList([], self.config.size)
+        
+        start = self._display_list.shape_count
+        if start < len(self._shapes):
+            self._cull_occluded(start)
+            try:
+                self._display_list.extend(self._shapes[start:], self._visible[start:])
+            except Exception as e:
+                raise DrawingError(f"Failed to compile shapes: {e}")
+        return self._display_list
+    
+    def _cull_occluded(self, start: int) -> None:
+        """
+        Cull shapes that will be covered by the opaque interior of a later shape.
+        
+        Only shapes from ``start`` on are considered, since earlier ones have
+        already been drawn or compiled.
+        
+        Args:
+            start: Position of the first shape not yet drawn or compiled
+        """
+        start = max(start, self._occlusion_checked)
+        if not self.config.occlusion_culling or start >= len(self._shapes):
+            return
+        
+        try:
+            shapes = self._shapes[start:]
+            visible = self._visible[start:]
+            bounds = [shape.bounds() if shown else None for shape, shown in zip(shapes, visible)]
+            # Translucent shapes let what is below show through
+            interiors = [shape.interior() if shown and shape.is_opaque() else None
+                         for shape, shown in zip(shapes, visible)]
+            hidden = find_occluded(bounds, interiors)
+        except Exception as e:
+            raise DrawingError(f"Failed to cull hidden shapes: {e}")
+        
+        width, height = self.config.size
+        for i in hidden:
+            self._visible[start + i] = False
+            # Pixels of the bounding box on the canvas that are no longer painted
+            # over; only shapes with bounds are found hidden
+            left, top, right, bottom = cast(Tuple[float, float, float, float], bounds[i])
+            columns = min(math.floor(right), width - 1) - max(math.ceil(left), 0) + 1
+            rows = min(math.floor(bottom), height - 1) - max(math.ceil(top), 0) + 1
+            self._overdraw_saved += max(columns, 0) * max(rows, 0)
+        self._occluded_count += len(hidden)
+        self._occlusion_checked = len(self._shapes)
+        if hidden:
+            logger.info(f"Culled {len(hidden)} shapes hidden under later opaque shapes")
+    
+    def rasterize(self, size: Optional[Tuple[int, int]] = None) -> Image.Image:
+        """
+        Rasterize the shapes onto a fresh image, optionally at another size.
+        
+        Args:
+            size: Output image size (defaults to the canvas size)
+            
+        Returns:
+            New image with the background and all shapes; the grid is not included
+        """
+        width, height = self.config.size
+        size = size or self.config.size
+        try:
+            image = Image.new('RGB', size, self.config.background_color)
+            scale = (size[0] / width, size[1] / height)
+            return self.compile().execute(image, scale=scale)
+        except DrawingError:
+            raise
+        except Exception as e:
+            raise DrawingError(f"Failed to rasterize canvas: {e}")
+    
     def save(self, filename: Union[str, Path], format: Optional[str] = None) -> 'Canvas':
         """
         Save the canvas to a file.
@@ -173,9 +613,9 @@ class Canvas:
         
         try:
             if format:
-                self._canvas.save(filename, format=format)
+                self._output_image().save(filename, format=format)
             else:
-                self._canvas.save(filename)
+                self._output_image().save(filename)
             
             logger.info(f"Canvas saved to {filename}")
         except Exception as e:
@@ -189,7 +629,7 @@ class Canvas:
             raise DrawingError("Canvas not initialized")
         
         try:
-            self._canvas.show()
+            self._output_image().show()
         except Exception as e:
             logger.warning(f"Failed to display canvas: {e}")
         
@@ -199,11 +639,48 @@ class Canvas:
         """Get the PIL Image object."""
         if self._canvas is None:
             raise DrawingError("Canvas not initialized")
-        return self._canvas.copy()
+        image = self._output_image()
+        return image.copy() if image is self._canvas else image
+    
+    def _output_image(self) -> Image.Image:
+        """Get the canvas as an RGB image, converting the raster backend's RGBX buffer."""
+        if self._canvas is None:
+            raise DrawingError("Canvas not initialized")
+        if self._canvas.mode == 'RGB':
+            return self._canvas
+        return self._canvas.convert('RGB')
+    
+    def pixels(self) -> Any:
+        """
+        Get a copy of the canvas pixels as a NumPy array.
+        
+        The array is a snapshot: later rendering does not update it and
+        writes to it do not change the canvas. Requires the
+        ``raster_backend`` option.
+        
+        Returns:
+            (height, width, 3) uint8 array of the canvas
+        """
+        if not self.config.raster_backend:
+            raise DrawingError("Pixel access requires raster_backend='numpy'")
+        return geometry.np.array(self._output_image())
     
     def clear(self) -> 'Canvas':
         """Clear the canvas and reset to background color."""
         self._shapes.clear()
+        self._display_list = None
+        self._visible.clear()
+        self._culled_count = 0
+        self._occluded_count = 0
+        self._overdraw_saved = 0
+        self._occlusion_checked = 0
+        self._rendered_count = 0
+        self._streamed_count = 0
+        self._grid_applied = False
+        self._grid_pending = False
+        self._config_loaded = False
+        self._index.clear()
+        self._shared_values.clear()
         self._initialize_canvas()
         return self
     
@@ -215,9 +692,57 @@ class Canvas:
             "show_grid": self.config.show_grid,
             "line_interval": self.config.line_interval,
             "shapes_count": len(self._shapes),
+            "culled_count": self._culled_count,
+            "occluded_count": self._occluded_count,
+            "overdraw_pixels_saved": self._overdraw_saved,
+            "rendered_count": self._rendered_count,
+            "streamed_count": self._streamed_count,
+            "config_loads": self._config_loads,
+            "grid_draws": self._grid_draws,
+            "tile_size": self.config.tile_size,
+            "workers": self.config.workers,
+            "flatness": self.config.flatness,
+            "compact_shapes": self.config.compact_shapes,
+            "raster_backend": self.config.raster_backend,
+            "occlusion_culling": self.config.occlusion_culling,
+            "antialias": self.config.antialias,
+            "sprite_cache": self.config.sprite_cache,
+            "sprites": sprite_cache.info(),
             "supported_shapes": ShapeFactory.get_supported_shapes()
         }
     
+    def memory_report(self) -> Dict[str, Dict[str, float]]:
+        """
+        Measure the memory held by the shapes, by shape class.
+        
+        Sizes include each shape's parameters and source data. Objects
+        shared between shapes are counted once, for the first shape
+        referencing them. Batches and instances count each shape they hold.
+        
+        Returns:
+            Dictionary mapping shape class names, and "total", to their
+            shape count, bytes and bytes per shape
+        """
+        seen: set = set()
+        report: Dict[str, Dict[str, float]] = {}
+        for shape in self._shapes:
+            if isinstance(shape, ShapeBatch):
+                name, count = f"ShapeBatch[{shape.params.shape}]", len(shape)
+            elif isinstance(shape, ShapeInstances):
+                name = f"ShapeInstances[{type(shape.params.template).__name__}]"
+                count = len(shape)
+            else:
+                name, count = type(shape).__name__, 1
+            entry = report.setdefault(name, {"count": 0, "bytes": 0})
+            entry["count"] += count
+            entry["bytes"] += _deep_sizeof(shape, seen)
+        
+        report["total"] = {"count": sum(entry["count"] for entry in report.values()),
+                           "bytes": sum(entry["bytes"] for entry in report.values())}
+        for entry in report.values():
+            entry["bytes_per_shape"] = entry["bytes"] / entry["count"] if entry["count"] else 0
+        return report
+    
     @classmethod
     def from_file(cls, config_file: Union[str, Path]) -> 'Canvas':
         """
@@ -249,4 +774,20 @@ class Canvas:
             size=(width, height),
             background_color=background_color
         )
-        return cls(config)
\ No newline at end of file
+        return cls(config)
+
+
+def _deep_sizeof(obj: Any, seen: set) -> int:
+    """Get the size of an object and everything it references that is not in ``seen``."""
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, BaseShape):
+        for name in ('_data', '_extra', 'params'):
+            size += _deep_sizeof(getattr(obj, name), seen)
+    elif isinstance(obj, (dict, MappingProxyType)):
+        size += sum(_deep_sizeof(key, seen) + _deep_sizeof(value, seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple)):
+        size += sum(_deep_sizeof(item, seen) for item in obj)
+    return size
@@ -1,13 +1,17 @@
 """Command-line interface for ShapeCanvas."""
 
 import argparse
+import json
 import sys
 import logging
+import time
 from pathlib import Path
-from typing import Optional
+from typing import Any, Dict, List, Optional
 
 from . import Canvas, __version__
 from .exceptions import ShapeCanvasError
+from .jobs import FORMAT_SUFFIXES, MANIFEST_NAME, find_configs, plan_jobs, run_jobs
+from .stream import load_settings
 
 
 def setup_logging(verbose: bool = False) -> None:
@@ -19,11 +23,115 @@ def setup_logging(verbose: bool = False) -> None:
     )
 
 
-def main() -> None:
+def batch_main(argv: Optional[List[str]] = None) -> None:
+    """Entry point of ``shape-canvas batch``: render many configs in warm worker processes."""
+    parser = argparse.ArgumentParser(
+        description="Render many JSON configurations in a pool of long-lived worker processes",
+        prog="shape-canvas batch"
+    )
+    
+    parser.add_argument(
+        "sources",
+        nargs="+",
+        help="Configuration files, directories of *.json files, glob patterns (quoted) "
+             "or manifests listing one configuration path per line"
+    )
+    
+    parser.add_argument(
+        "-o", "--output-dir",
+        default="output",
+        help="Directory receiving the images (default: output)"
+    )
+    
+    parser.add_argument(
+        "-f", "--format",
+        choices=list(FORMAT_SUFFIXES),
+        help="Output image format (default: PNG)"
+    )
+    
+    parser.add_argument(
+        "--no-grid",
+        action="store_true",
+        help="Disable grid even if specified in a config"
+    )
+    
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="Number of worker processes (default: CPU count)"
+    )
+    
+    parser.add_argument(
+        "--manifest",
+        help=f"Results manifest path, one JSON record per job (default: OUTPUT_DIR/{MANIFEST_NAME})"
+    )
+    
+    parser.add_argument(
+        "-v", "--verbose",
+        action="store_true",
+        help="Enable verbose logging"
+    )
+    
+    args = parser.parse_args(argv)
+    
+    setup_logging(args.verbose)
+    logger = logging.getLogger(__name__)
+    if not args.verbose:
+        # Per-shape messages from thousands of configs would drown the summary
+        logging.getLogger("shape_canvas").setLevel(logging.WARNING)
+        logger.setLevel(logging.INFO)
+    
+    try:
+        jobs = plan_jobs(find_configs(args.sources), args.output_dir, args.format or "PNG")
+    except ShapeCanvasError as e:
+        logger.error(f"ShapeCanvas error: {e}")
+        sys.exit(1)
+    if not jobs:
+        logger.error("No configuration files found")
+        sys.exit(1)
+    
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = Path(args.manifest) if args.manifest else output_dir / MANIFEST_NAME
+    logger.info(f"Rendering {len(jobs)} configurations into {output_dir}")
+    
+    start = time.perf_counter()
+    failed = 0
+    try:
+        with open(manifest_path, "w", encoding="utf-8") as manifest:
+            def record(result: Dict[str, Any]) -> None:
+                nonlocal failed
+                # Written as each job finishes, so an interrupted run keeps its records
+                manifest.write(json.dumps(result) + "\n")
+                manifest.flush()
+                if result["status"] != "ok":
+                    failed += 1
+                    logger.error(f"{result['config']}: {result['error']}")
+            
+            run_jobs(jobs, args.workers, args.format, args.no_grid, on_result=record)
+    except KeyboardInterrupt:
+        logger.info("Operation cancelled by user")
+        sys.exit(1)
+    
+    elapsed = time.perf_counter() - start
+    logger.info(f"Rendered {len(jobs) - failed} of {len(jobs)} configurations in {elapsed:.1f}s; "
+                f"results in {manifest_path}")
+    if failed:
+        sys.exit(1)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
     """Main CLI entry point."""
+    if argv is None:
+        argv = sys.argv[1:]
+    if argv and argv[0] == "batch":
+        batch_main(argv[1:])
+        return
+    
     parser = argparse.ArgumentParser(
         description="ShapeCanvas - Draw geometric shapes on canvas using JSON configuration",
-        prog="shape-canvas"
+        prog="shape-canvas",
+        epilog="Run 'shape-canvas batch --help' to render many configurations in one run."
     )
     
     parser.add_argument(
@@ -61,13 +169,44 @@ def main() -> None:
         help="Display the canvas after rendering"
     )
     
+    parser.add_argument(
+        "--tile-size",
+        type=int,
+        help="Render in tiles of this many pixels across a process pool"
+    )
+    
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="Number of worker processes for tiled rendering (default: CPU count)"
+    )
+    
+    parser.add_argument(
+        "--antialias",
+        type=int,
+        metavar="N",
+        help="Anti-alias by drawing each tile at N times the size (2-8; about N*N times slower)"
+    )
+    
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Read, draw and discard shapes one at a time, for shape lists too large for memory"
+    )
+    
+    parser.add_argument(
+        "--shapes",
+        metavar="FILE",
+        help="Stream shapes from this NDJSON file (one shape per line) instead of the config"
+    )
+    
     parser.add_argument(
         "-v", "--verbose",
         action="store_true",
         help="Enable verbose logging"
     )
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     
     setup_logging(args.verbose)
     logger = logging.getLogger(__name__)
@@ -81,15 +220,32 @@ def main() -> None:
         
         # Create canvas from configuration
         logger.info(f"Loading configuration from {config_path}")
-        canvas = Canvas.from_file(config_path)
+        stream = args.stream or args.shapes is not None
+        if stream:
+            # Leave the shapes in the file until they are drawn
+            canvas = Canvas(load_settings(config_path))
+        else:
+            canvas = Canvas.from_file(config_path)
         
         # Disable grid if requested
         if args.no_grid:
             canvas.config.show_grid = False
         
+        # Enable tiled rendering if requested
+        if args.tile_size is not None or args.workers is not None:
+            canvas.set_tiling(args.tile_size or canvas.config.tile_size,
+                              args.workers or canvas.config.workers)
+        
+        # Enable anti-aliasing if requested
+        if args.antialias is not None:
+            canvas.set_antialias(args.antialias)
+        
         # Process canvas
         logger.info("Processing canvas...")
-        canvas.add_grid().load_shapes_from_config().render()
+        if stream:
+            canvas.add_grid().render_stream(args.shapes or config_path)
+        else:
+            canvas.add_grid().load_shapes_from_config().render()
         
         # Save output
         output_path = Path(args.output)
@@ -103,7 +259,7 @@ def main() -> None:
         
         # Print canvas info
         info = canvas.get_canvas_info()
-        logger.info(f"Canvas rendered successfully: {info['size'][0]}x{info['size'][1]} with {info['shapes_count']} shapes")
+        logger.info(f"Canvas rendered successfully: {info['size'][0]}x{info['size'][1]} with {info['shapes_count'] + info['streamed_count']} shapes")
         
     except ShapeCanvasError as e:
         logger.error(f"ShapeCanvas error: {e}")
@@ -0,0 +1,182 @@
+"""Compositing of translucent and masked shapes within their bounding box.
+
+Shapes that build a temporary image and paste it through a mask draw into
+a layer covering only the part of their bounds that lies on the drawing
+surface, so the cost of the temporary image follows the shape's area
+instead of the canvas area. Shapes with an opacity or a blend mode are
+drawn into such a layer and blended onto the crop of the canvas below it:
+blend modes mix colors with NumPy when installed, and with Pillow's channel
+operations otherwise, before a masked paste applies coverage and opacity.
+"""
+
+import math
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+from PIL import Image, ImageChops, ImageDraw
+
+from . import geometry
+from .tiling import TranslatedDraw
+
+
+Box = Tuple[int, int, int, int]
+
+# Blend modes shapes may set, combining backdrop and shape colors
+BLEND_MODES = ("normal", "multiply", "screen", "darken", "lighten", "add")
+
+# Pillow equivalents of the blend modes other than normal, used without NumPy
+_CHOPS: Dict[str, Callable[[Image.Image, Image.Image], Image.Image]] = {
+    "multiply": ImageChops.multiply,
+    "screen": ImageChops.screen,
+    "darken": ImageChops.darker,
+    "lighten": ImageChops.lighter,
+    "add": ImageChops.add,
+}
+
+
+def _mix(mode: str, backdrop: Any, source: Any) -> Any:
+    """Combine backdrop and shape colors, as uint16 arrays, with a blend mode."""
+    np = geometry.np
+    if mode == "multiply":
+        return backdrop * source // 255
+    if mode == "screen":
+        return 255 - (255 - backdrop) * (255 - source) // 255
+    if mode == "darken":
+        return np.minimum(backdrop, source)
+    if mode == "lighten":
+        return np.maximum(backdrop, source)
+    if mode == "add":
+        return np.minimum(backdrop + source, 255)
+    return source
+
+
+def blend(image: Image.Image, layer: Image.Image, position: Sequence[int],
+          opacity: float = 1.0, blend_mode: str = "normal") -> None:
+    """
+    Blend an RGBA layer onto the part of an image it covers.
+
+    Colors are mixed with the blend mode, then composited through the
+    layer's alpha scaled by the opacity. Only the pixels under the layer
+    are read and written.
+
+    Args:
+        image: RGB or RGBX image receiving the pixels
+        layer: RGBA image; alpha gives the shape's coverage
+        position: Image coordinates of the layer's top-left pixel
+        opacity: Opacity from 0 (invisible) to 1
+        blend_mode: One of BLEND_MODES
+    """
+    x, y = position
+    box = (max(x, 0), max(y, 0), min(x + layer.width, image.width), min(y + layer.height, image.height))
+    if box[0] >= box[2] or box[1] >= box[3]:
+        return
+    if box != (x, y, x + layer.width, y + layer.height):
+        layer = layer.crop((box[0] - x, box[1] - y, box[2] - x, box[3] - y))
+    source = layer.convert('RGB')
+    if blend_mode != "normal":
+        backdrop = image.crop(box)
+        if backdrop.mode != 'RGB':
+            backdrop = backdrop.convert('RGB')
+        np = geometry.np
+        if np is None:
+            source = _CHOPS[blend_mode](backdrop, source)
+        else:
+            # Products of two channel values fit in 16 bits
+            mixed = _mix(blend_mode, np.asarray(backdrop).astype(np.uint16),
+                         np.asarray(source).astype(np.uint16))
+            source = Image.fromarray(mixed.astype(np.uint8), 'RGB')
+    # Coverage scaled by the opacity; the masked paste composites only the
+    # pixels under the layer
+    mask = layer.getchannel('A')
+    if opacity < 1:
+        mask = mask.point([int(value * opacity + 0.5) for value in range(256)])
+    image.paste(source, box[:2], mask)
+
+
+def surface_area(canvas: Any) -> Box:
+    """
+    Get the canvas pixels a drawing surface covers.
+
+    Args:
+        canvas: Image, tile surface or recording surface
+
+    Returns:
+        (left, top, right, bottom) box in canvas coordinates, right and
+        bottom exclusive
+    """
+    if isinstance(canvas, Image.Image):
+        return (0, 0) + canvas.size
+    if hasattr(canvas, 'origin'):
+        x, y = canvas.origin
+        return (x, y, x + canvas.image.width, y + canvas.image.height)
+    return (0, 0) + tuple(canvas.size)
+
+
+class Layer:
+    """
+    Temporary image covering a box of the canvas, drawn in canvas coordinates.
+
+    The layer is clipped to the area the target surface covers; it is empty
+    when the box lies completely outside it. Shapes can draw on a layer as
+    on any other surface.
+    """
+
+    def __init__(self, canvas: Any, bounds: Optional[Tuple[float, float, float, float]],
+                 mode: str = 'RGBA', color: Any = 0):
+        """
+        Initialize layer.
+
+        Args:
+            canvas: Surface the layer will be composited onto
+            bounds: (left, top, right, bottom) extent of what is drawn,
+                inclusive, or None to cover the whole surface
+            mode: Image mode of the layer
+            color: Initial color of the layer
+        """
+        area = surface_area(canvas)
+        if bounds is None:
+            bounds = (area[0], area[1], area[2] - 1, area[3] - 1)
+        self.origin = (max(math.floor(bounds[0]), area[0]), max(math.floor(bounds[1]), area[1]))
+        right = min(math.ceil(bounds[2]) + 1, area[2])
+        bottom = min(math.ceil(bounds[3]) + 1, area[3])
+        self.empty = right <= self.origin[0] or bottom <= self.origin[1]
+        size = (1, 1) if self.empty else (right - self.origin[0], bottom - self.origin[1])
+        self.image = Image.new(mode, size, color)
+        # Shapes see the size of the canvas they are laid out on
+        self.size = canvas.size
+
+    def get_draw(self) -> TranslatedDraw:
+        """Get a drawing context in canvas coordinates."""
+        return TranslatedDraw(ImageDraw.Draw(self.image), self.origin)
+
+    def paste(self, im: Image.Image, box: Sequence[int], mask: Optional[Image.Image] = None) -> None:
+        """Paste an image given in canvas coordinates onto the layer."""
+        ox, oy = self.origin
+        self.image.paste(im, (box[0] - ox, box[1] - oy), mask)
+
+    def composite(self, canvas: Any, mask: Optional[Image.Image] = None,
+                  opacity: float = 1.0, blend_mode: str = "normal") -> None:
+        """
+        Paste the layer onto the canvas.
+
+        Args:
+            canvas: Image, tile surface or recording surface
+            mask: Mask to paste through; defaults to the layer's own alpha
+            opacity: Opacity from 0 to 1 the layer is blended with
+            blend_mode: One of BLEND_MODES
+        """
+        if self.empty:
+            return
+        if opacity < 1 or blend_mode != "normal":
+            x, y = self.origin
+            if isinstance(canvas, Image.Image):
+                blend(canvas, self.image, (x, y), opacity, blend_mode)
+            elif hasattr(canvas, 'origin'):
+                blend(canvas.image, self.image, (x - canvas.origin[0], y - canvas.origin[1]),
+                      opacity, blend_mode)
+            else:
+                # Recording surfaces keep the layer to blend when replayed
+                canvas.blend(self.image, self.origin, opacity, blend_mode)
+            return
+        if mask is None and self.image.mode == 'RGBA':
+            mask = self.image
+        canvas.paste(self.image, self.origin, mask)
@@ -5,9 +5,17 @@ from dataclasses import dataclass
 from typing import Dict, List, Any, Tuple, Union, Optional
 from pathlib import Path
 
+from . import geometry
 from .exceptions import ConfigurationError, ValidationError
 
 
+# Values accepted for CanvasConfig.raster_backend
+RASTER_BACKENDS = ("numpy",)
+
+# Largest supersampling factor accepted for CanvasConfig.antialias
+MAX_ANTIALIAS = 8
+
+
 @dataclass
 class CanvasConfig:
     """Configuration for canvas properties."""
@@ -17,6 +25,14 @@ class CanvasConfig:
     line_interval: Optional[int] = None
     line_color: Optional[str] = None
     show_grid: bool = False
+    tile_size: Optional[int] = None
+    workers: Optional[int] = None
+    flatness: Optional[float] = None
+    compact_shapes: bool = False
+    raster_backend: Optional[str] = None
+    occlusion_culling: bool = False
+    antialias: Optional[int] = None
+    sprite_cache: bool = False
     
     def __post_init__(self):
         """Validate configuration after initialization."""
@@ -38,6 +54,39 @@ class CanvasConfig:
         
         if self.line_interval is not None and (not isinstance(self.line_interval, int) or self.line_interval <= 0):
             raise ValidationError("Line interval must be a positive integer")
+        
+        if self.tile_size is not None and (not isinstance(self.tile_size, int) or self.tile_size <= 0):
+            raise ValidationError("Tile size must be a positive integer")
+        
+        if self.workers is not None and (not isinstance(self.workers, int) or self.workers <= 0):
+            raise ValidationError("Workers must be a positive integer")
+        
+        if self.flatness is not None and (isinstance(self.flatness, bool) or
+                                          not isinstance(self.flatness, (int, float)) or
+                                          self.flatness <= 0):
+            raise ValidationError("Flatness must be a positive number")
+        
+        if not isinstance(self.compact_shapes, bool):
+            raise ValidationError("compact_shapes must be a boolean")
+        
+        if not isinstance(self.occlusion_culling, bool):
+            raise ValidationError("occlusion_culling must be a boolean")
+        
+        if not isinstance(self.sprite_cache, bool):
+            raise ValidationError("sprite_cache must be a boolean")
+        
+        if self.antialias is not None and (isinstance(self.antialias, bool) or
+                                           not isinstance(self.antialias, int) or
+                                           not 1 <= self.antialias <= MAX_ANTIALIAS):
+            raise ValidationError(f"Antialias must be an integer between 1 and {MAX_ANTIALIAS}")
+        
+        if self.raster_backend is not None:
+            if self.raster_backend not in RASTER_BACKENDS:
+                raise ValidationError(f"Raster backend must be one of: {', '.join(RASTER_BACKENDS)}")
+            if not geometry.has_numpy():
+                raise ValidationError("The numpy raster backend requires NumPy")
+            if self.tile_size is not None:
+                raise ValidationError("The raster backend cannot be combined with tiled rendering")
 
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'CanvasConfig':
@@ -48,7 +97,15 @@ class CanvasConfig:
                 background_color=tuple(data['background_color']),
                 line_interval=data.get('line_interval'),
                 line_color=data.get('line_color'),
-                show_grid=data.get('show_grid', bool(data.get('line_interval')))
+                show_grid=data.get('show_grid', bool(data.get('line_interval'))),
+                tile_size=data.get('tile_size'),
+                workers=data.get('workers'),
+                flatness=data.get('flatness'),
+                compact_shapes=data.get('compact_shapes', False),
+                raster_backend=data.get('raster_backend'),
+                occlusion_culling=data.get('occlusion_culling', False),
+                antialias=data.get('antialias'),
+                sprite_cache=data.get('sprite_cache', False)
             )
         except KeyError as e:
             raise ConfigurationError(f"Missing required configuration key: {e}")
@@ -87,6 +144,18 @@ class ConfigLoader:
         
         shape_type = shape_data['type']
         
+        # Batch columns hold one value per shape and are validated by the batch
+        if shape_type == 'shape_batch':
+            return
+        
+        # Instances hold one template shape, validated once for every placement
+        if shape_type == 'instances':
+            template = shape_data.get('template')
+            if not isinstance(template, dict):
+                raise ValidationError("Instances need a 'template' shape object")
+            ConfigLoader.validate_shape_data(template)
+            return
+        
         # Common validations for all shapes
         if 'fill_color' in shape_data:
             color = shape_data['fill_color']
@@ -0,0 +1,276 @@
+"""Display lists: shapes compiled to flat lists of drawing primitives."""
+
+from typing import Any, List, NamedTuple, Optional, Sequence, Tuple
+
+from PIL import Image, ImageDraw
+
+from . import raster
+from .compositing import blend
+from .tiling import to_pairs
+
+
+Point = Tuple[float, float]
+
+
+class DrawOp(NamedTuple):
+    """A single drawing primitive with resolved style."""
+
+    kind: str  # polygon, polyline, rectangle, ellipse, arc, paste, blend, sprite or shape
+    xy: Tuple[Point, ...]
+    fill: Any = None
+    outline: Any = None
+    width: int = 1
+    extra: Any = None  # (start, end) angles for arcs, (image, mask) for pastes,
+    # (image, opacity, blend mode) for blends, (image, mask, shape) for sprites,
+    # deferred shapes
+
+
+class RecordingDraw:
+    """Drawing context that records primitives instead of rasterizing them."""
+
+    def __init__(self, ops: List[DrawOp]):
+        """
+        Initialize recording context.
+
+        Args:
+            ops: List receiving the recorded primitives
+        """
+        self._ops = ops
+
+    def line(self, xy: Sequence[Any], fill: Any = None, width: int = 0, joint: Optional[str] = None) -> None:
+        """Record a line or polyline."""
+        self._ops.append(DrawOp("polyline", tuple(to_pairs(xy)), fill, None, width, joint))
+
+    def polygon(self, xy: Sequence[Any], fill: Any = None, outline: Any = None, width: int = 1) -> None:
+        """Record a polygon."""
+        self._ops.append(DrawOp("polygon", tuple(to_pairs(xy)), fill, outline, width))
+
+    def rectangle(self, xy: Sequence[Any], fill: Any = None, outline: Any = None, width: int = 1) -> None:
+        """Record a rectangle."""
+        self._ops.append(DrawOp("rectangle", tuple(to_pairs(xy)), fill, outline, width))
+
+    def ellipse(self, xy: Sequence[Any], fill: Any = None, outline: Any = None, width: int = 1) -> None:
+        """Record an ellipse."""
+        self._ops.append(DrawOp("ellipse", tuple(to_pairs(xy)), fill, outline, width))
+
+    def arc(self, xy: Sequence[Any], start: float, end: float, fill: Any = None, width: int = 1) -> None:
+        """Record an arc."""
+        self._ops.append(DrawOp("arc", tuple(to_pairs(xy)), fill, None, width, (start, end)))
+
+
+class RecordingSurface:
+    """Surface that compiles shape drawing calls into a display list."""
+
+    def __init__(self, canvas_size: Tuple[int, int], ops: Optional[List[DrawOp]] = None):
+        """
+        Initialize recording surface.
+
+        Args:
+            canvas_size: Size of the canvas the shapes are laid out on
+            ops: Existing list to append recorded primitives to
+        """
+        self.size = canvas_size
+        self.ops: List[DrawOp] = ops if ops is not None else []
+        self._draw = RecordingDraw(self.ops)
+
+    def get_draw(self) -> RecordingDraw:
+        """Get the recording drawing context."""
+        return self._draw
+
+    def paste(self, im: Image.Image, box: Sequence[int], mask: Optional[Image.Image] = None) -> None:
+        """Record an image paste."""
+        self.ops.append(DrawOp("paste", ((box[0], box[1]),), extra=(im, mask)))
+
+    def stamp(self, im: Image.Image, mask: Image.Image, box: Sequence[int], shape: Any) -> None:
+        """Record a shape stamped from its sprite."""
+        self.ops.append(DrawOp("sprite", ((box[0], box[1]),), extra=(im, mask, shape)))
+
+    def blend(self, im: Image.Image, box: Sequence[int], opacity: float, blend_mode: str) -> None:
+        """Record an RGBA image to blend onto the canvas."""
+        self.ops.append(DrawOp("blend", ((box[0], box[1]),), extra=(im, opacity, blend_mode)))
+
+
+class DisplayList:
+    """Flat list of drawing primitives for a scene, replayable at any scale."""
+
+    def __init__(self, ops: List[DrawOp], size: Tuple[int, int]):
+        """
+        Initialize display list.
+
+        Args:
+            ops: Drawing primitives in drawing order
+            size: Size of the canvas the primitives were compiled for
+        """
+        self.ops = ops
+        self.size = size
+        # Index of the first primitive of each compiled shape
+        self.offsets: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self.ops)
+
+    @property
+    def shape_count(self) -> int:
+        """Number of shapes compiled into the list."""
+        return len(self.offsets)
+
+    @classmethod
+    def compile(cls, shapes: Sequence[Any], size: Tuple[int, int]) -> 'DisplayList':
+        """
+        Compile shapes into a display list.
+
+        Args:
+            shapes: Shapes in drawing order
+            size: Size of the canvas the shapes are laid out on
+
+        Returns:
+            DisplayList instance
+        """
+        display_list = cls([], size)
+        display_list.extend(shapes)
+        return display_list
+
+    def extend(self, shapes: Sequence[Any], visible: Optional[Sequence[bool]] = None) -> None:
+        """
+        Compile more shapes onto the end of the list.
+
+        Args:
+            shapes: Shapes in drawing order
+            visible: Per-shape flags; shapes flagged False are kept as empty entries
+        """
+        surface = RecordingSurface(self.size, self.ops)
+        for i, shape in enumerate(shapes):
+            self.offsets.append(len(self.ops))
+            if visible is not None and not visible[i]:
+                continue
+            if getattr(shape, 'deferred', False):
+                # Cheaper to draw again than to keep one primitive per shape
+                self.ops.append(DrawOp("shape", (), extra=shape))
+            else:
+                shape.paint(surface)
+
+    def execute(self, image: Image.Image, scale: Tuple[float, float] = (1.0, 1.0),
+                origin: Tuple[float, float] = (0, 0), start: int = 0,
+                raster_backend: bool = False, shapes: Optional[Sequence[int]] = None,
+                centers: bool = False) -> Image.Image:
+        """
+        Replay the display list onto an image.
+
+        Args:
+            image: Target image
+            scale: Horizontal and vertical scale from canvas to image pixels
+            origin: Canvas coordinates mapped to the image's top-left pixel
+            start: Index of the first compiled shape to replay
+            raster_backend: Draw unscaled ellipses and rectangles with the raster
+                backend; the image must be an RGBX image from ``raster.new_image``
+            shapes: Indices of the compiled shapes to replay, in drawing order,
+                instead of every shape from ``start`` on
+            centers: Scale about pixel centers, as supersampling needs:
+                rectangles, ellipses and arcs, whose boxes include their edge
+                pixels, are widened to cover the scaled pixels completely
+
+        Returns:
+            The target image
+        """
+        if shapes is None:
+            first = self.offsets[start] if start < len(self.offsets) else len(self.ops)
+            ops = self.ops[first:]
+        else:
+            ends = self.offsets[1:] + [len(self.ops)]
+            ops = [op for i in shapes for op in self.ops[self.offsets[i]:ends[i]]]
+        if raster_backend and scale == (1.0, 1.0) and origin == (0.0, 0.0):
+            self._raster(ops, image)
+        else:
+            self._replay(ops, image, scale, origin, centers)
+        return image
+
+    def _raster(self, ops: Sequence[DrawOp], image: Image.Image) -> None:
+        """Draw primitives with the raster backend, using Pillow for the rest."""
+        def draw_other(pending: List[DrawOp]) -> None:
+            self._replay(pending, image, (1.0, 1.0), (0, 0))
+
+        segment: List[DrawOp] = []
+        for op in ops:
+            if op.kind != "shape":
+                segment.append(op)
+                continue
+            raster.raster_ops(image, segment, draw_other)
+            segment = []
+            # Instances of circles and rectangles draw through their batch
+            if not raster.raster_batch(image, getattr(op.extra, 'batch', op.extra)):
+                op.extra.draw(RecordingSurface(self.size, segment))
+        raster.raster_ops(image, segment, draw_other)
+
+    def _replay(self, ops: Sequence[DrawOp], image: Image.Image, scale: Tuple[float, float],
+                origin: Tuple[float, float], centers: bool = False) -> None:
+        """Draw primitives onto an image."""
+        draw = ImageDraw.Draw(image)
+        sx, sy = scale
+        ox, oy = origin
+        identity = scale == (1.0, 1.0) and origin == (0, 0)
+        width_scale = (sx + sy) / 2
+        # Half the growth of a pixel when scaled about its center
+        grow_x = (sx - 1) / 2 if centers else 0
+        grow_y = (sy - 1) / 2 if centers else 0
+
+        for op in ops:
+            if op.kind == "shape":
+                if identity:
+                    op.extra.draw(image)
+                else:
+                    recorded: List[DrawOp] = []
+                    op.extra.draw(RecordingSurface(self.size, recorded))
+                    self._replay(recorded, image, scale, origin, centers)
+                continue
+            if op.kind == "sprite":
+                if identity:
+                    (x, y), = op.xy
+                    image.paste(op.extra[0], (int(x), int(y)), op.extra[1])
+                else:
+                    # Sprites are drawn at canvas resolution; scale the shape itself
+                    recorded = []
+                    op.extra[2].draw(RecordingSurface(self.size, recorded))
+                    self._replay(recorded, image, scale, origin, centers)
+                continue
+
+            if identity:
+                xy = op.xy
+                width = op.width
+            else:
+                xy = tuple(((x - ox) * sx, (y - oy) * sy) for x, y in op.xy)
+                width = max(1, round(op.width * width_scale)) if op.width else 0
+                if centers and op.kind in ("rectangle", "ellipse", "arc") and len(xy) == 2:
+                    (x0, y0), (x1, y1) = xy
+                    xy = ((x0 - grow_x, y0 - grow_y), (x1 + grow_x, y1 + grow_y))
+
+            if op.kind == "polygon":
+                draw.polygon(xy, fill=op.fill, outline=op.outline, width=width)
+            elif op.kind == "polyline":
+                draw.line(xy, fill=op.fill, width=width, joint=op.extra)
+            elif op.kind == "rectangle":
+                draw.rectangle(xy, fill=op.fill, outline=op.outline, width=width)
+            elif op.kind == "ellipse":
+                draw.ellipse(xy, fill=op.fill, outline=op.outline, width=width)
+            elif op.kind == "arc":
+                draw.arc(xy, op.extra[0], op.extra[1], fill=op.fill, width=width)
+            elif op.kind in ("paste", "blend"):
+                position = (xy[0][0] - grow_x, xy[0][1] - grow_y)
+                self._paste(image, op, position, identity, scale)
+
+    @staticmethod
+    def _paste(image: Image.Image, op: DrawOp, position: Point, identity: bool,
+               scale: Tuple[float, float]) -> None:
+        """Replay an image paste or blend, resampling the image when scaled."""
+        im, mask = op.extra[:2]
+        if not identity:
+            size = (max(1, round(im.width * scale[0])), max(1, round(im.height * scale[1])))
+            im = im.resize(size, Image.Resampling.BILINEAR)
+            if mask is op.extra[0]:
+                mask = im
+            elif op.kind == "paste" and mask is not None:
+                mask = mask.resize(size, Image.Resampling.BILINEAR)
+        position = (round(position[0]), round(position[1]))
+        if op.kind == "blend":
+            blend(image, im, position, *op.extra[1:])
+        else:
+            image.paste(im, position, mask)
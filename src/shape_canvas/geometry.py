@@ -0,0 +1,594 @@
+"""Sampled curve geometry for ShapeCanvas shapes.
+
+Curves are sampled with NumPy when it is installed and with plain Python
+otherwise. Both backends evaluate the same formulas in the same order.
+"""
+
+import math
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Tuple
+
+# NumPy module, or None when it is not installed; typed Any so both
+# backends type-check
+np: Any
+try:
+    import numpy
+    np = numpy
+except ImportError:  # pragma: no cover - exercised by forcing the fallback in tests
+    np = None
+
+
+Point = Tuple[float, float]
+Outline = Tuple[Point, ...]
+
+# Curves with fewer samples than this are cheaper to compute in plain Python
+NUMPY_MIN_POINTS = 32
+
+# Number of distinct outlines kept by the outline cache
+OUTLINE_CACHE_SIZE = 512
+
+# Default flatness tolerance: maximum distance in pixels between a curve
+# and the polyline approximating it
+DEFAULT_FLATNESS = 0.25
+
+# Fewest segments used for any sampled curve
+MIN_SEGMENTS = 4
+
+# Largest magnitude of the second derivative of the unit heart curve
+HEART_MAX_ACCELERATION = 48.24
+
+
+def has_numpy() -> bool:
+    """Check whether the NumPy backend is available."""
+    return np is not None
+
+
+def flat_segments(acceleration: float, tolerance: float, minimum: int = MIN_SEGMENTS) -> int:
+    """
+    Get the number of uniform parameter steps that keep a curve flat enough.
+
+    A chord spanning a parameter step h deviates from the curve by at most
+    acceleration * h**2 / 8, where acceleration bounds the magnitude of the
+    second derivative of the curve parameterized over [0, 1].
+
+    Args:
+        acceleration: Bound on the curve's second derivative, in pixels
+        tolerance: Maximum allowed deviation in pixels
+        minimum: Fewest segments to return
+
+    Returns:
+        Number of segments
+    """
+    return max(minimum, math.ceil(math.sqrt(acceleration / (8 * tolerance))))
+
+
+def _vectorize(num_points: int) -> bool:
+    """Decide whether to sample a curve with NumPy."""
+    return np is not None and num_points >= NUMPY_MIN_POINTS
+
+
+def _pairs(xs: "np.ndarray", ys: "np.ndarray") -> List[Point]:
+    """Convert coordinate arrays into a list of (x, y) tuples."""
+    return list(zip(xs.tolist(), ys.tolist()))
+
+
+def wave_along_line(start: Point, end: Point, amplitude: float, frequency: float,
+                    num_points: int) -> List[Point]:
+    """
+    Sample a sine wave running along a line segment.
+
+    Args:
+        start: Start point of the line
+        end: End point of the line
+        amplitude: Wave amplitude perpendicular to the line
+        frequency: Number of full waves along the line
+        num_points: Number of segments (num_points + 1 samples)
+
+    Returns:
+        List of (x, y) points
+    """
+    dx = end[0] - start[0]
+    dy = end[1] - start[1]
+    length = math.sqrt(dx*dx + dy*dy)
+    px = -dy / length
+    py = dx / length
+
+    if _vectorize(num_points):
+        t = np.arange(num_points + 1) / num_points
+        offset = amplitude * np.sin(2 * math.pi * frequency * t)
+        return _pairs(start[0] + t * dx + offset * px, start[1] + t * dy + offset * py)
+
+    points = []
+    for i in range(num_points + 1):
+        t = i / num_points
+        offset = amplitude * math.sin(2 * math.pi * frequency * t)
+        points.append((start[0] + t * dx + offset * px, start[1] + t * dy + offset * py))
+    return points
+
+
+def sine_wave(start: Point, width: float, amplitude: float, frequency: float,
+              num_points: int) -> List[Point]:
+    """
+    Sample a horizontal sine wave.
+
+    Args:
+        start: Left end of the wave's center line
+        width: Horizontal extent of the wave
+        amplitude: Wave amplitude
+        frequency: Number of full waves across the width
+        num_points: Number of segments (num_points + 1 samples)
+
+    Returns:
+        List of (x, y) points
+    """
+    x, y = start
+    if _vectorize(num_points):
+        progress = np.arange(num_points + 1) / num_points
+        return _pairs(x + width * progress,
+                      y + amplitude * np.sin(2 * math.pi * frequency * progress))
+
+    points = []
+    for i in range(num_points + 1):
+        progress = i / num_points
+        points.append((x + width * progress,
+                       y + amplitude * math.sin(2 * math.pi * frequency * progress)))
+    return points
+
+
+def spiral(center: Point, max_radius: float, turns: float, num_points: int) -> List[Point]:
+    """
+    Sample an Archimedean spiral growing from its center.
+
+    Args:
+        center: Spiral center
+        max_radius: Radius reached after all turns
+        turns: Number of turns
+        num_points: Number of samples
+
+    Returns:
+        List of (x, y) points
+    """
+    x, y = center
+    if _vectorize(num_points):
+        i = np.arange(num_points)
+        angle = 2 * math.pi * turns * i / num_points
+        radius = max_radius * i / num_points
+        return _pairs(x + radius * np.cos(angle), y + radius * np.sin(angle))
+
+    points = []
+    for i in range(num_points):
+        angle = 2 * math.pi * turns * i / num_points
+        radius = max_radius * i / num_points
+        points.append((x + radius * math.cos(angle), y + radius * math.sin(angle)))
+    return points
+
+
+def helix(center: Point, radius: float, height: int, turns: float,
+          num_points: int) -> List[Point]:
+    """
+    Sample an orthographic side view of a helix.
+
+    Args:
+        center: Helix center
+        radius: Helix radius
+        height: Vertical extent of the helix
+        turns: Number of turns
+        num_points: Number of samples
+
+    Returns:
+        List of (x, y) points
+    """
+    x, y = center
+    top = y - height // 2
+    if _vectorize(num_points):
+        i = np.arange(num_points)
+        angle = 2 * math.pi * turns * i / num_points
+        return _pairs(x + radius * np.cos(angle), top + height * (i / num_points))
+
+    points = []
+    for i in range(num_points):
+        angle = 2 * math.pi * turns * i / num_points
+        points.append((x + radius * math.cos(angle), top + height * (i / num_points)))
+    return points
+
+
+def quadratic_bezier(p0: Point, p1: Point, p2: Point, num_points: int) -> List[Point]:
+    """
+    Sample a quadratic Bezier curve.
+
+    Args:
+        p0: Start point
+        p1: Control point
+        p2: End point
+        num_points: Number of segments (num_points + 1 samples)
+
+    Returns:
+        List of (x, y) points
+    """
+    if _vectorize(num_points):
+        t = np.arange(num_points + 1) / num_points
+        a = (1-t)**2
+        b = 2*(1-t)*t
+        c = t**2
+        return _pairs(a * p0[0] + b * p1[0] + c * p2[0], a * p0[1] + b * p1[1] + c * p2[1])
+
+    points = []
+    for i in range(num_points + 1):
+        t = i / num_points
+        # B(t) = (1-t)²P0 + 2(1-t)tP1 + t²P2
+        points.append(((1-t)**2 * p0[0] + 2*(1-t)*t * p1[0] + t**2 * p2[0],
+                       (1-t)**2 * p0[1] + 2*(1-t)*t * p1[1] + t**2 * p2[1]))
+    return points
+
+
+def heart(center: Point, size: float, rotation_angle: float, num_points: int) -> List[Point]:
+    """
+    Sample the outline of a heart curve.
+
+    Args:
+        center: Heart center
+        size: Scale factor of the curve
+        rotation_angle: Rotation around the center in degrees
+        num_points: Number of samples
+
+    Returns:
+        List of (x, y) points
+    """
+    cx, cy = center
+    angle_rad = math.radians(rotation_angle)
+    cos_a = math.cos(angle_rad)
+    sin_a = math.sin(angle_rad)
+
+    # Points are offset to the center and back before rotating, which keeps
+    # the rounding of the original per-point implementation
+    if _vectorize(num_points):
+        t = 2 * math.pi * np.arange(num_points) / num_points
+        x = size * (16 * np.sin(t)**3) + cx - cx
+        y = size * (13 * np.cos(t) - 5 * np.cos(2*t) - 2 * np.cos(3*t) - np.cos(4*t)) + cy - cy
+        return _pairs(x * cos_a - y * sin_a + cx, x * sin_a + y * cos_a + cy)
+
+    points = []
+    for i in range(num_points):
+        t = 2 * math.pi * i / num_points
+        x = size * (16 * math.sin(t)**3) + cx - cx
+        y = size * (13 * math.cos(t) - 5 * math.cos(2*t) - 2 * math.cos(3*t) - math.cos(4*t)) + cy - cy
+        points.append((x * cos_a - y * sin_a + cx, x * sin_a + y * cos_a + cy))
+    return points
+
+
+def dash_polyline(points: List[Point], dash_array: List[float], offset: float = 0) -> List[List[Point]]:
+    """
+    Split a polyline into dashes.
+
+    The dash array alternates dash and gap lengths and repeats along the
+    whole path, continuing across vertices; an odd-length array is used
+    twice, as in SVG. A positive offset starts the pattern that far in.
+
+    Args:
+        points: Polyline vertices
+        dash_array: Alternating dash and gap lengths in pixels
+        offset: Distance into the pattern at which the path starts
+
+    Returns:
+        One polyline per dash, including the vertices it passes
+    """
+    # Drop repeated vertices so every segment has a direction
+    vertices = [points[0]] + [b for a, b in zip(points, points[1:]) if a != b]
+    if len(vertices) < 2:
+        return []
+
+    pattern = list(dash_array) * (2 if len(dash_array) % 2 else 1)
+    period = sum(pattern)
+    phase = offset % period
+
+    if np is not None:
+        xy = np.array(vertices, dtype=float)
+        deltas = np.diff(xy, axis=0)
+        lengths = np.sqrt(deltas[:, 0] * deltas[:, 0] + deltas[:, 1] * deltas[:, 1])
+        units = deltas / lengths[:, None]
+        starts = np.concatenate(([0.0], np.cumsum(lengths)))
+        total = starts[-1]
+
+        # Dash start positions within one period, then every period along the path
+        edges = np.concatenate(([0.0], np.cumsum(pattern)))
+        periods = np.arange(math.ceil((total + phase) / period) + 1) * period - phase
+        begins = (periods[:, None] + edges[0:-1:2]).ravel()
+        ends = (periods[:, None] + edges[1::2]).ravel()
+        begins = np.clip(begins, 0, total)
+        ends = np.clip(ends, 0, total)
+        keep = ends > begins
+        begins, ends = begins[keep], ends[keep]
+
+        first = np.clip(np.searchsorted(starts, begins, side="right") - 1, 0, len(lengths) - 1)
+        last = np.clip(np.searchsorted(starts, ends, side="left") - 1, 0, len(lengths) - 1)
+        heads = xy[first] + (begins - starts[first])[:, None] * units[first]
+        tails = xy[last] + (ends - starts[last])[:, None] * units[last]
+        return [[head] + vertices[i + 1:j + 1] + [tail] for head, tail, i, j in
+                zip(map(tuple, heads.tolist()), map(tuple, tails.tolist()),
+                    first.tolist(), last.tolist())]
+
+    lengths = []
+    units = []
+    starts = [0.0]
+    for (x0, y0), (x1, y1) in zip(vertices, vertices[1:]):
+        dx = x1 - x0
+        dy = y1 - y0
+        length = math.sqrt(dx * dx + dy * dy)
+        lengths.append(length)
+        units.append((dx / length, dy / length))
+        starts.append(starts[-1] + length)
+    total = starts[-1]
+
+    def locate(position: float, segment: int) -> Point:
+        """Get the point at a distance along the path, on a given segment."""
+        x, y = vertices[segment]
+        ux, uy = units[segment]
+        return (x + (position - starts[segment]) * ux, y + (position - starts[segment]) * uy)
+
+    dashes = []
+    segment = 0
+    position = -phase
+    index = 0
+    while position < total:
+        begin = max(position, 0.0)
+        end = min(position + pattern[index], total)
+        if index % 2 == 0 and end > begin:
+            while segment < len(lengths) - 1 and starts[segment + 1] <= begin:
+                segment += 1
+            dash = [locate(begin, segment)]
+            while segment < len(lengths) - 1 and starts[segment + 1] < end:
+                segment += 1
+                dash.append(vertices[segment])
+            dash.append(locate(end, segment))
+            dashes.append(dash)
+        position += pattern[index]
+        index = (index + 1) % len(pattern)
+    return dashes
+
+
+def fractal_tree(base: Point, height: float, levels: int, angle: float) -> List[List[Point]]:
+    """
+    Compute the branch end points of a binary fractal tree, level by level.
+
+    Level 0 holds the trunk, growing straight up from the base. Branch k of
+    a level starts at the end of branch k // 2 of the level before and turns
+    by +angle (even k) or -angle (odd k); each level is 0.7 times as long.
+
+    Args:
+        base: Start point of the trunk
+        height: Trunk length
+        levels: Number of levels
+        angle: Turn between a branch and its children, in degrees
+
+    Returns:
+        One list of end points per level
+    """
+    ends: List[List[Point]] = []
+    length = height
+    if _vectorize(2 ** levels):
+        # End points of the previous level, where the branches of this one start
+        xs = np.array([float(base[0])])
+        ys = np.array([float(base[1])])
+        directions = np.array([90.0])
+        for level in range(levels):
+            if level:
+                xs = np.repeat(xs, 2)
+                ys = np.repeat(ys, 2)
+                directions = np.repeat(directions, 2) + np.tile([angle, -angle], len(directions))
+                length *= 0.7
+            radians = np.radians(directions)
+            xs = xs + length * np.cos(radians)
+            ys = ys - length * np.sin(radians)
+            ends.append(_pairs(xs, ys))
+        return ends
+
+    starts = [base]
+    directions_list: List[float] = [90]
+    for level in range(levels):
+        if level:
+            starts = [end for end in ends[-1] for _ in range(2)]
+            directions_list = [direction + turn for direction in directions_list
+                               for turn in (angle, -angle)]
+            length *= 0.7
+        ends.append([(x + length * math.cos(math.radians(direction)),
+                      y - length * math.sin(math.radians(direction)))
+                     for (x, y), direction in zip(starts, directions_list)])
+    return ends
+
+
+def tree_paths(base: Point, ends: List[List[Point]], first: int, last: int) -> List[List[Point]]:
+    """
+    Join the branches of a range of tree levels into polylines.
+
+    Each polyline starts at a fork and follows first children down to the
+    last level, so every branch is drawn exactly once and in the same
+    direction as on its own; Pillow rasterizes a line differently when
+    its end points are swapped. One polyline ends at each branch of the
+    last level.
+
+    Args:
+        base: Start point of the trunk
+        ends: Branch end points per level, as returned by fractal_tree()
+        first: First level to include
+        last: Last level to include
+
+    Returns:
+        List of polylines
+    """
+    if first == last:
+        if first == 0:
+            return [[base, ends[0][0]]]
+        forks = ends[first - 1]
+        return [[forks[k >> 1], end] for k, end in enumerate(ends[first])]
+
+    paths = []
+    depth = last - first
+    for leaf in range(len(ends[last])):
+        # The polyline climbs from the leaf while it is a first (even) child
+        climb = (leaf & -leaf).bit_length() - 1 if leaf else depth
+        top = last - min(climb, depth)
+        fork = ends[top - 1][leaf >> (last - top + 1)] if top else base
+        paths.append([fork] + [ends[level][leaf >> (last - level)] for level in range(top, last + 1)])
+    return paths
+
+
+class OutlineCache:
+    """
+    Bounded least-recently-used cache of origin-centred outlines.
+
+    Keys are (shape type, shape-defining parameters) tuples; values are
+    immutable tuples of vertex offsets from the shape's center.
+    """
+
+    def __init__(self, maxsize: int = OUTLINE_CACHE_SIZE):
+        """
+        Initialize empty cache.
+
+        Args:
+            maxsize: Maximum number of outlines kept
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._outlines: "OrderedDict[Hashable, Outline]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._outlines)
+
+    def get(self, key: Hashable, build: Callable[[], Outline]) -> Outline:
+        """
+        Get an outline, building and storing it on a miss.
+
+        Args:
+            key: Shape type and shape-defining parameters
+            build: Function computing the outline
+
+        Returns:
+            Cached outline
+        """
+        outline = self._outlines.get(key)
+        if outline is not None:
+            self._outlines.move_to_end(key)
+            self.hits += 1
+            return outline
+
+        self.misses += 1
+        outline = build()
+        self._outlines[key] = outline
+        while len(self._outlines) > self.maxsize:
+            self._outlines.popitem(last=False)
+            self.evictions += 1
+        return outline
+
+    def clear(self) -> None:
+        """Remove all outlines and reset the statistics."""
+        self._outlines.clear()
+        self.hits = self.misses = self.evictions = 0
+
+    def info(self) -> Dict[str, int]:
+        """Get hit, miss and eviction counts and the current size."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._outlines),
+            "maxsize": self.maxsize,
+        }
+
+
+outline_cache = OutlineCache()
+
+
+def translate(outline: Outline, center: Point) -> List[Point]:
+    """
+    Place an origin-centred outline at a center point.
+
+    Args:
+        outline: Vertex offsets from the center
+        center: Center point
+
+    Returns:
+        List of (x, y) points
+    """
+    x, y = center
+    return [(x + dx, y + dy) for dx, dy in outline]
+
+
+def regular_polygon_outline(radius: float, sides: int, rotation: float) -> Outline:
+    """
+    Get the vertices of a regular polygon around the origin.
+
+    Args:
+        radius: Distance from the center to each vertex
+        sides: Number of sides
+        rotation: Rotation in degrees
+
+    Returns:
+        Cached vertex offsets
+    """
+    def build() -> Outline:
+        rotation_radians = math.radians(rotation)
+        return tuple((radius * math.cos(2 * math.pi * i / sides + rotation_radians),
+                      radius * math.sin(2 * math.pi * i / sides + rotation_radians))
+                     for i in range(sides))
+
+    return outline_cache.get(("regular_polygon", radius, sides, rotation), build)
+
+
+def star_outline(size: float, num_points: int) -> Outline:
+    """
+    Get the vertices of a star around the origin.
+
+    Args:
+        size: Outer radius; inner vertices lie at 0.4 * size
+        num_points: Number of star points
+
+    Returns:
+        Cached vertex offsets
+    """
+    def build() -> Outline:
+        vertices = []
+        for i in range(num_points * 2):
+            angle = 2 * math.pi * i / (num_points * 2)
+            radius = size if i % 2 == 0 else size * 0.4
+            vertices.append((radius * math.cos(angle), radius * math.sin(angle)))
+        return tuple(vertices)
+
+    return outline_cache.get(("star", size, num_points), build)
+
+
+def heart_outline(size: float, rotation_angle: float, num_points: int) -> Outline:
+    """
+    Get the outline of a heart curve around the origin.
+
+    Args:
+        size: Scale factor of the curve
+        rotation_angle: Rotation in degrees
+        num_points: Number of samples
+
+    Returns:
+        Cached vertex offsets
+    """
+    return outline_cache.get(("heart", size, rotation_angle, num_points),
+                             lambda: tuple(heart((0, 0), size, rotation_angle, num_points)))
+
+
+def flower_outline(petal_size: float, num_petals: int) -> Outline:
+    """
+    Get the petal centers of a flower around the origin.
+
+    Args:
+        petal_size: Petal length
+        num_petals: Number of petals
+
+    Returns:
+        Cached petal center offsets
+    """
+    def build() -> Outline:
+        distance = petal_size * 0.7
+        return tuple((distance * math.cos(2 * math.pi * i / num_petals),
+                      distance * math.sin(2 * math.pi * i / num_petals))
+                     for i in range(num_petals))
+
+    return outline_cache.get(("flower", petal_size, num_petals), build)
@@ -0,0 +1,154 @@
+"""Cached grid overlay layers for ShapeCanvas."""
+
+from functools import lru_cache
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+from PIL import Image, ImageChops, ImageDraw, ImageFont
+
+
+# Number of distinct grid layers kept in memory
+GRID_CACHE_SIZE = 8
+
+LABEL_COLOR = (0, 0, 0)
+
+
+class GridLayer(NamedTuple):
+    """Pre-rendered grid: overlay colors and the mask they are pasted with."""
+
+    color: Image.Image
+    mask: Image.Image
+
+
+class GlyphAtlas:
+    """Per-character coverage masks of a font, rendered once and reused."""
+
+    def __init__(self, font: Optional[Any] = None):
+        """
+        Initialize glyph atlas.
+
+        Args:
+            font: Pillow font (defaults to Pillow's default font)
+        """
+        self.font = font or ImageFont.load_default()
+        self._glyphs: Dict[str, Tuple[Image.Image, Tuple[int, int], float]] = {}
+
+    def glyph(self, char: str) -> Tuple[Image.Image, Tuple[int, int], float]:
+        """
+        Get the mask of a character.
+
+        Args:
+            char: Character to render
+
+        Returns:
+            Tuple of (mask, offset of the mask from the pen position, advance)
+        """
+        if char not in self._glyphs:
+            left, top, right, bottom = map(int, self.font.getbbox(char))
+            offset = (min(left, 0), min(top, 0))
+            mask = Image.new("L", (max(right - offset[0], 1), max(bottom - offset[1], 1)), 0)
+            ImageDraw.Draw(mask).text((-offset[0], -offset[1]), char, fill=255, font=self.font)
+            self._glyphs[char] = (mask, offset, self.font.getlength(char))
+        return self._glyphs[char]
+
+    def render(self, text: str) -> Tuple[Image.Image, Tuple[int, int]]:
+        """
+        Build the coverage mask of a string from glyph masks.
+
+        Overlapping glyphs keep the larger coverage, as FreeType does when
+        rendering the string in one go.
+
+        Args:
+            text: Text to render
+
+        Returns:
+            Tuple of (mask, offset of the mask from the text position)
+        """
+        placed = []
+        pen = 0.0
+        for char in text:
+            mask, (dx, dy), advance = self.glyph(char)
+            placed.append((mask, int(pen) + dx, dy))
+            pen += advance
+
+        left = min(x for _, x, _ in placed)
+        top = min(y for _, _, y in placed)
+        right = max(x + mask.width for mask, x, _ in placed)
+        bottom = max(y + mask.height for mask, _, y in placed)
+        label = Image.new("L", (right - left, bottom - top), 0)
+        for mask, x, y in placed:
+            box = (x - left, y - top, x - left + mask.width, y - top + mask.height)
+            label.paste(ImageChops.lighter(label.crop(box), mask), box)
+        return label, (left, top)
+
+
+_atlas = GlyphAtlas()
+
+
+def _color_key(color: Any) -> Any:
+    """Make a color from a JSON configuration hashable."""
+    return tuple(color) if isinstance(color, list) else color
+
+
+def grid_layer(size: Tuple[int, int], interval: int, line_color: Any = "gray") -> GridLayer:
+    """
+    Get the grid overlay for a canvas, rendering it on first use.
+
+    Args:
+        size: Canvas size
+        interval: Grid line spacing in pixels
+        line_color: Grid line color
+
+    Returns:
+        Cached GridLayer; callers must not modify its images
+    """
+    return _render_layer(tuple(size), interval, _color_key(line_color))
+
+
+@lru_cache(maxsize=GRID_CACHE_SIZE)
+def _render_layer(size: Tuple[int, int], interval: int, line_color: Any) -> GridLayer:
+    """Render grid lines and coordinate labels into an overlay layer."""
+    width, height = size
+    color = Image.new("RGB", size, LABEL_COLOR)
+    mask = Image.new("L", size, 0)
+    color_draw = ImageDraw.Draw(color)
+    mask_draw = ImageDraw.Draw(mask)
+
+    for x in range(0, width, interval):
+        color_draw.line([(x, 0), (x, height)], fill=line_color)
+        mask_draw.line([(x, 0), (x, height)], fill=255)
+
+    for y in range(0, height, interval):
+        color_draw.line([(0, y), (width, y)], fill=line_color)
+        mask_draw.line([(0, y), (width, y)], fill=255)
+
+    # Labels blend black over the lines in the color image and add their
+    # coverage to the mask, matching text drawn straight onto the canvas
+    for x in range(0, width // interval * interval + 1, interval):
+        for y in range(0, height // interval * interval + 1, interval):
+            label, (dx, dy) = _atlas.render(f"({x},{y})")
+            position = (x + dx, y + dy)
+            color.paste(LABEL_COLOR, position, label)
+            mask.paste(255, position, label)
+
+    return GridLayer(color, mask)
+
+
+def grid_cache_info() -> Any:
+    """Get hit and miss statistics of the grid layer cache."""
+    return _render_layer.cache_info()
+
+
+def paste_grid(image: Image.Image, layer: GridLayer, origin: Tuple[int, int] = (0, 0)) -> None:
+    """
+    Composite a grid layer onto an image covering part of the canvas.
+
+    Args:
+        image: Target image
+        layer: Grid layer for the full canvas
+        origin: Canvas coordinates of the image's top-left pixel
+    """
+    if origin == (0, 0) and image.size == layer.color.size:
+        image.paste(layer.color, (0, 0), layer.mask)
+        return
+    box = (origin[0], origin[1], origin[0] + image.width, origin[1] + image.height)
+    image.paste(layer.color.crop(box), (0, 0), layer.mask.crop(box))
@@ -0,0 +1,228 @@
+"""Instances: one template shape placed at many offsets.
+
+The template is validated and parsed once. Each placement is a copy of it
+moved by an offset, optionally with its own fill color or rotation, made
+from the parsed parameters without validating again.
+
+Circles and rectangles are turned into a ShapeBatch once and drawn from its
+columns. Every other template draws its placements one by one: copies of
+shapes with a sprite anchor are stamped from the sprite cache when the
+instances object uses sprites (the canvas's ``sprite_cache`` setting), and
+are drawn in full otherwise, like templates without an anchor.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from PIL import Image
+
+from .batch import ShapeBatch
+from .compositing import surface_area
+from .exceptions import DrawingError, InvalidShapeError, ValidationError
+from .shapes import BaseShape, ShapeFactory, ShapeType
+from .tiling import unclipped_extents
+
+
+Box = Tuple[float, float, float, float]
+
+# Parameters a per-instance rotation may set, in order of preference
+ROTATION_FIELDS = ("rotation", "rotation_angle")
+
+# Keys an instances object may hold besides the ones every shape parses
+INSTANCES_KEYS = {"type", "template", "offsets", "fill_colors", "rotations", "opacity", "blend_mode"}
+
+# Template types drawn as a batch, with their point parameters
+BATCH_TEMPLATES = {"circle": ("center",), "rectangle": ("start", "end")}
+
+
+def _is_number(value: Any) -> bool:
+    """Check a coordinate: any real number except a bool."""
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _as_list(value: Any, name: str) -> List[Any]:
+    """Get a per-instance array as a list, accepting NumPy arrays."""
+    if hasattr(value, 'tolist'):
+        value = value.tolist()
+    if not isinstance(value, (list, tuple)):
+        raise ValidationError(f"Instances {name} must be a list")
+    return list(value)
+
+
+class ShapeInstances(BaseShape):
+    """Template shape drawn once per offset."""
+
+    __slots__ = ('_placements', 'batch')
+
+    def __init__(self, data: Dict[str, Any]):
+        """Initialize instances with data, measuring each placement once."""
+        super().__init__(data)
+        self._placements = self._measure()
+        # Circles and rectangles are drawn from columns instead of copies
+        self.batch = self._make_batch()
+
+    def __len__(self) -> int:
+        return len(self.params.offsets)
+
+    def validate(self) -> None:
+        """Validate the template once, then the per-instance arrays."""
+        data = self._data if self._data is not None else self.data
+        template = data.get('template')
+        if not isinstance(template, dict):
+            raise ValidationError("Instances need a 'template' shape object")
+        if template.get('type') in (ShapeType.INSTANCES.value, ShapeType.SHAPE_BATCH.value):
+            raise ValidationError(f"Instances cannot use {template['type']!r} as a template")
+        try:
+            shape = ShapeFactory.create_shape(template)
+        except (InvalidShapeError, DrawingError) as e:
+            raise ValidationError(f"Invalid instances template: {e}")
+        # Copies share the template's parsed parameters
+        shape.compact()
+        self._parsing['template'] = shape
+        fields = shape.params._fields
+
+        offsets = _as_list(data.get('offsets', []), 'offsets')
+        for offset in offsets:
+            if not isinstance(offset, (list, tuple)) or len(offset) != 2 or not all(
+                    _is_number(x) for x in offset):
+                raise ValidationError("Each instance offset must be a [dx, dy] pair")
+        self._parsing['offsets'] = tuple(tuple(offset) for offset in offsets)
+
+        fill_colors = data.get('fill_colors')
+        if fill_colors is not None:
+            if 'fill_color' not in fields:
+                raise ValidationError(f"Template {template['type']} has no fill_color to override")
+            fill_colors = _as_list(fill_colors, 'fill_colors')
+            self._check_count('fill_colors', fill_colors, len(offsets))
+            for color in fill_colors:
+                if not (isinstance(color, (list, tuple)) and len(color) == 3 and all(
+                        isinstance(x, int) and not isinstance(x, bool) and 0 <= x <= 255 for x in color)):
+                    raise ValidationError("Instance fill colors must be 3 integers between 0 and 255")
+            fill_colors = tuple(tuple(color) for color in fill_colors)
+        self._parsing['fill_colors'] = fill_colors
+
+        rotations = data.get('rotations')
+        if rotations is not None:
+            if not any(field in fields for field in ROTATION_FIELDS):
+                raise ValidationError(f"Template {template['type']} cannot be rotated")
+            rotations = _as_list(rotations, 'rotations')
+            self._check_count('rotations', rotations, len(offsets))
+            if not all(isinstance(x, int) and not isinstance(x, bool) for x in rotations):
+                raise ValidationError("Instance rotations must be integers")
+            rotations = tuple(rotations)
+        self._parsing['rotations'] = rotations
+
+        unknown = set(data) - INSTANCES_KEYS
+        if unknown:
+            raise ValidationError(f"Unknown instances keys: {', '.join(sorted(unknown))}")
+
+    @staticmethod
+    def _check_count(name: str, values: List[Any], count: int) -> None:
+        """Check that a per-instance array has one value per offset."""
+        if len(values) != count:
+            raise ValidationError(f"Instances need one of {name} per offset, got {len(values)} for {count}")
+
+    def instance(self, index: int) -> BaseShape:
+        """
+        Get the shape placed at one offset.
+
+        Args:
+            index: Index of the offset
+
+        Returns:
+            Copy of the template, moved and with its overrides applied
+        """
+        params = self.params
+        overrides: Dict[str, Any] = {}
+        if params.fill_colors is not None:
+            overrides['fill_color'] = params.fill_colors[index]
+        if params.rotations is not None:
+            field = next(name for name in ROTATION_FIELDS if name in params.template.params._fields)
+            overrides[field] = params.rotations[index]
+        dx, dy = params.offsets[index]
+        shape: BaseShape = params.template.moved(dx, dy, **overrides)
+        if self.flatness is not None:
+            shape.flatness = self.flatness
+        shape.use_sprites = self.use_sprites
+        return shape
+
+    @property
+    def deferred(self) -> bool:
+        """Display lists keep instances drawn as a batch, like the batch itself."""
+        return self.batch is not None and self._get_opacity() >= 1 and self._get_blend_mode() == "normal"
+
+    def _make_batch(self) -> Optional[ShapeBatch]:
+        """Build the batch of every placement of an opaque circle or rectangle template."""
+        params = self.params
+        template = params.template
+        shape_type = template.data.get('type')
+        if shape_type not in BATCH_TEMPLATES or not params.offsets:
+            return None
+        if template._get_opacity() < 1 or template._get_blend_mode() != "normal":
+            return None
+        columns: Dict[str, Any] = {
+            'type': ShapeType.SHAPE_BATCH.value, 'shape': shape_type,
+            'fill_color': params.fill_colors or template._get_color('fill_color'),
+            'outline_color': template._get_color('outline_color'),
+            'border_width': template._get_int('border_width', 1),
+        }
+        for name in BATCH_TEMPLATES[shape_type]:
+            x, y = getattr(template.params, name)
+            columns[name] = [(x + dx, y + dy) for dx, dy in params.offsets]
+        if shape_type == "circle":
+            columns['radius'] = template._get_int('radius')
+        return ShapeBatch(columns)
+
+    def _measure(self) -> Optional[List[Box]]:
+        """Get the extent of each placement, or None when the template's is unknown."""
+        params = self.params
+        if params.rotations is not None:
+            boxes: List[Box] = []
+            for i in range(len(self)):
+                placed = self.instance(i).bounds()
+                if placed is None:
+                    return None
+                boxes.append(placed)
+            return boxes
+        box = params.template.bounds()
+        if box is None:
+            return None
+        left, top, right, bottom = box
+        return [(left + dx, top + dy, right + dx, bottom + dy) for dx, dy in params.offsets]
+
+    def bounds(self) -> Optional[Box]:
+        """Get the extent of every placement together."""
+        boxes = self._placements
+        if not boxes:
+            return None
+        return (min(box[0] for box in boxes), min(box[1] for box in boxes),
+                max(box[2] for box in boxes), max(box[3] for box in boxes))
+
+    def unclipped_parts(self, canvas_size: Tuple[int, int], min_size: float) -> Optional[List[Box]]:
+        """Get the placements that must be drawn unclipped, measuring only the large ones."""
+        if self.batch is not None:
+            return self.batch.unclipped_parts(canvas_size, min_size)
+        boxes = self._placements
+        if boxes is None:
+            return None
+        parts: List[Box] = []
+        for i, box in enumerate(boxes):
+            if box[2] - box[0] > min_size or box[3] - box[1] > min_size:
+                parts.extend(unclipped_extents(self.instance(i), box, canvas_size))
+        return parts
+
+    def draw(self, canvas: Image.Image) -> Image.Image:
+        """Draw every placement touching the area the surface covers, in order."""
+        if self.batch is not None:
+            return self.batch.draw(canvas)
+        boxes = self._placements
+        area = surface_area(canvas)
+        for i in range(len(self)):
+            if boxes is not None:
+                box = boxes[i]
+                if not (box[0] < area[2] and box[2] >= area[0] and box[1] < area[3] and box[3] >= area[1]):
+                    continue
+            self.instance(i).paint(canvas)
+        return canvas
+
+
+ShapeFactory.register_shape(ShapeType.INSTANCES, ShapeInstances)
@@ -0,0 +1,216 @@
+"""Rendering of many configuration files in a pool of warm worker processes.
+
+Each worker process imports Pillow and the shape classes once, then renders
+config after config, so a run over thousands of files pays the start-up cost
+once per worker instead of once per file. Every job yields a result record
+with its timings, or the error that stopped it; one failing config does not
+stop the others.
+"""
+
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Union
+
+from PIL import Image
+
+from .canvas import Canvas
+from .exceptions import ConfigurationError
+
+
+# File suffix of the images written for each output format
+FORMAT_SUFFIXES = {"PNG": ".png", "JPEG": ".jpg", "BMP": ".bmp", "TIFF": ".tiff"}
+
+# Name of the results manifest written next to the images by default
+MANIFEST_NAME = "manifest.jsonl"
+
+_GLOB_CHARS = "*?["
+
+
+class Job(NamedTuple):
+    """One configuration file to render."""
+
+    # Position in the run; ``index`` would shadow tuple.index
+    number: int
+    config: Path
+    output: Path
+
+
+# Options shared by every job of a worker process
+_options: Dict[str, Any] = {}
+
+
+def find_configs(sources: Iterable[Union[str, Path]]) -> List[Path]:
+    """
+    Collect the configuration files to render.
+
+    Args:
+        sources: Directories (their ``*.json`` files), glob patterns
+            (``**`` matches sub-directories), JSON configuration files, or
+            manifests listing one configuration path per line; manifest
+            paths are relative to the manifest and ``#`` starts a comment
+
+    Returns:
+        Configuration paths in the order given, each directory and pattern
+        sorted, without duplicates
+    """
+    configs: List[Path] = []
+    for source in sources:
+        source = str(source)
+        path = Path(source)
+        if any(char in source for char in _GLOB_CHARS) and not path.exists():
+            found = [Path(match) for match in sorted(glob.glob(source, recursive=True))]
+        elif path.is_dir():
+            found = sorted(path.glob("*.json"))
+        elif path.suffix.lower() == ".json":
+            found = [path]
+        elif path.is_file():
+            found = []
+            for line in path.read_text(encoding="utf-8").splitlines():
+                line = line.split("#", 1)[0].strip()
+                if line:
+                    found.append(path.parent / line)
+        else:
+            raise ConfigurationError(f"No configuration files at {source}")
+        configs.extend(found)
+    return list(dict.fromkeys(configs))
+
+
+def plan_jobs(configs: Sequence[Path], output_dir: Union[str, Path], format: str = "PNG") -> List[Job]:
+    """
+    Pair each configuration with its output image.
+
+    Images keep the configurations' paths relative to the directory they
+    all share, so configs of the same name in different directories do not
+    overwrite each other's images.
+
+    Args:
+        configs: Configuration files
+        output_dir: Directory receiving the images
+        format: One of FORMAT_SUFFIXES
+
+    Returns:
+        Jobs in configuration order
+    """
+    if not configs:
+        return []
+    suffix = FORMAT_SUFFIXES[format]
+    resolved = [Path(config).resolve() for config in configs]
+    base = Path(os.path.commonpath([str(config.parent) for config in resolved]))
+    return [Job(i, Path(config), Path(output_dir) / path.relative_to(base).with_suffix(suffix))
+            for i, (config, path) in enumerate(zip(configs, resolved))]
+
+
+def _init_worker(options: Dict[str, Any]) -> None:
+    """Keep the run's options and load Pillow's image plugins once per worker."""
+    _options.update(options)
+    Image.init()
+
+
+def render_job(job: Job, options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Render one configuration file to its output image.
+
+    Tiled rendering is turned off: the worker pool already keeps every
+    core busy.
+
+    Args:
+        job: Configuration and output paths
+        options: Options of the run; defaults to the ones the worker
+            process was started with
+
+    Returns:
+        Result record: the paths, ``status`` ("ok" or "error"), the error
+        and its type, the worker's process id, canvas size, shape count and
+        load, render, save and total times in milliseconds
+    """
+    if options is None:
+        options = _options
+    result: Dict[str, Any] = {
+        "index": job.number, "config": str(job.config), "output": str(job.output),
+        "status": "ok", "error": None, "error_type": None, "worker": os.getpid(),
+    }
+    start = time.perf_counter()
+    stage = "load"
+    try:
+        canvas = Canvas.from_file(job.config).set_tiling(None)
+        if options.get("no_grid"):
+            canvas.config.show_grid = False
+        loaded = time.perf_counter()
+        result["load_ms"] = round((loaded - start) * 1000, 3)
+
+        stage = "render"
+        canvas.add_grid().load_shapes_from_config().render()
+        rendered = time.perf_counter()
+        result["render_ms"] = round((rendered - loaded) * 1000, 3)
+
+        stage = "save"
+        job.output.parent.mkdir(parents=True, exist_ok=True)
+        canvas.save(job.output, format=options.get("format"))
+        result["save_ms"] = round((time.perf_counter() - rendered) * 1000, 3)
+
+        info = canvas.get_canvas_info()
+        result["size"] = list(info["size"])
+        result["shapes"] = info["shapes_count"]
+    except Exception as e:
+        result.update(status="error", error=f"{stage}: {e}", error_type=type(e).__name__, output=None)
+    result["total_ms"] = round((time.perf_counter() - start) * 1000, 3)
+    return result
+
+
+def run_jobs(jobs: Sequence[Job], workers: Optional[int] = None, format: Optional[str] = None,
+             no_grid: bool = False,
+             on_result: Optional[Callable[[Dict[str, Any]], None]] = None) -> List[Dict[str, Any]]:
+    """
+    Render jobs in a pool of long-lived worker processes.
+
+    Args:
+        jobs: Jobs to render
+        workers: Number of worker processes (defaults to the CPU count);
+            1 renders in this process
+        format: Image format of the outputs (from the file suffix if None)
+        no_grid: Disable the grid even where a config asks for it
+        on_result: Called with each result record as its job finishes
+
+    Returns:
+        Result records in job order
+    """
+    options = {"format": format, "no_grid": no_grid}
+    results: List[Optional[Dict[str, Any]]] = [None] * len(jobs)
+
+    def finish(position: int, result: Dict[str, Any]) -> None:
+        results[position] = result
+        if on_result is not None:
+            on_result(result)
+
+    max_workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if max_workers <= 1:
+        # Options are passed to each job, leaving this process's defaults alone
+        Image.init()
+        for position, job in enumerate(jobs):
+            finish(position, render_job(job, options))
+        return _completed(results)
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                             initargs=(options,)) as pool:
+        futures = {pool.submit(render_job, job): position for position, job in enumerate(jobs)}
+        for future in as_completed(futures):
+            position = futures[future]
+            try:
+                result = future.result()
+            except BrokenProcessPool as e:
+                # A worker died (e.g. killed for memory); its job has no record of its own
+                job = jobs[position]
+                result = {"index": job.number, "config": str(job.config), "output": None,
+                          "status": "error", "error": f"worker: {e}", "error_type": type(e).__name__,
+                          "worker": None, "total_ms": None}
+            finish(position, result)
+    return _completed(results)
+
+
+def _completed(results: List[Optional[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Get the result records once every job has filled its slot."""
+    return [result for result in results if result is not None]
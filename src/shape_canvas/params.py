@@ -0,0 +1,68 @@
+"""Typed parameter records holding shape data parsed once at construction."""
+
+from collections import namedtuple
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Dict, Tuple, Type
+
+
+# Marks parameters a record does not hold
+UNPARSED: Any = object()
+
+
+class ShapeParams(tuple):
+    """
+    Immutable record of the validated parameters of one shape.
+
+    Each shape class gets its own named-tuple subclass with one field per
+    parameter its ``validate()`` reads. A field holds the parsed value, or
+    None when the shape data leaves the parameter out and callers fall back
+    to their own default.
+    """
+
+    __slots__ = ()
+
+    # Field names, set by each record class
+    _fields: Tuple[str, ...] = ()
+
+    if TYPE_CHECKING:
+        def __getattr__(self, name: str) -> Any:
+            """Fields are created per shape class at runtime."""
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        # Record classes are created at runtime, so pickle them by their fields
+        return make_params, (type(self).__name__, dict(zip(self._fields, self)))
+
+
+# Record of a shape whose data is still being validated
+NO_PARAMS = ShapeParams()
+
+
+@lru_cache(maxsize=None)
+def params_type(name: str, fields: Tuple[str, ...]) -> Type[ShapeParams]:
+    """
+    Get the record class with the given name and fields, creating it on first use.
+
+    Args:
+        name: Class name, e.g. ``StraightLineParams``
+        fields: Parameter names in validation order
+
+    Returns:
+        ShapeParams subclass with one field per parameter
+    """
+    # The record's name and fields are only known at runtime
+    base = namedtuple(name, fields)  # type: ignore[misc]
+    return type(name, (base, ShapeParams), {"__slots__": ()})
+
+
+def make_params(name: str, values: Dict[str, Any]) -> ShapeParams:
+    """
+    Build a parameter record.
+
+    Args:
+        name: Record class name
+        values: Parsed parameter values by name
+
+    Returns:
+        ShapeParams instance
+    """
+    return tuple.__new__(params_type(name, tuple(values)), values.values())
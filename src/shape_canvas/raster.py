@@ -0,0 +1,459 @@
+"""NumPy raster backend for ShapeCanvas.
+
+The canvas is an ordinary RGBX Pillow image. Filled ellipses and rectangles
+are drawn by copying the part of the canvas they cover into a NumPy array,
+writing packed 32-bit pixels into their bounding boxes and pasting the
+array back; runs of equally sized shapes and columnar batches are drawn
+with one array operation. Only the box a run of primitives covers is
+copied, so the cost follows the shapes' area rather than the canvas area;
+batches are drawn tile by tile, so large canvases are copied in small parts.
+Output matches ``ImageDraw`` pixel for pixel.
+"""
+
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from PIL import Image, ImageDraw
+
+from . import geometry
+from .exceptions import DrawingError
+
+
+# Consecutive shapes of one size drawn together as a single array operation
+VECTOR_MIN = 16
+
+# Pixels composited at once when drawing many shapes; bounds memory use
+CHUNK_PIXELS = 1 << 22
+
+# Side of the square canvas tiles a batch is drawn through; copying a few
+# small tiles is faster than copying one large box, and skips empty ones
+TILE_SIZE = 1024
+
+# Copying a window of the canvas costs about as much as copying this many
+# pixels, whatever its size; scattered primitives share a window while its
+# box spans less than this per primitive
+WINDOW_COST_PIXELS = 1 << 14
+
+# Otherwise a window grows while its box spans at most this many times the
+# pixels its primitives cover
+WINDOW_SLACK = 4
+
+# Number of packed colors remembered
+PACKED_CACHE_SIZE = 1 << 16
+
+_packed: Dict[Any, int] = {}
+
+# Display list primitive as drawn by the backend:
+# ((kind, width, height, border, unfilled), left, top, fill, outline)
+Style = Tuple[Tuple[str, int, int, int, bool], int, int, Optional[int], int]
+
+
+def new_image(size: Tuple[int, int], color: Tuple[int, int, int]) -> Image.Image:
+    """
+    Create a canvas image the backend can draw on.
+
+    Args:
+        size: Image size
+        color: Background color
+
+    Returns:
+        RGBX image, whose pixels are 32-bit words
+    """
+    if geometry.np is None:
+        raise DrawingError("The raster backend requires NumPy")
+    return Image.new("RGBX", size, tuple(color) + (255,))
+
+
+def _read(image: Image.Image, box: Tuple[int, int, int, int]) -> Any:
+    """Copy a box of an RGBX image into a writable (height, width, 4) uint8 array."""
+    return geometry.np.array(image.crop(box))
+
+
+def _write(image: Image.Image, pixels: Any, box: Tuple[int, int, int, int]) -> None:
+    """Paste pixels read with ``_read`` back into their box."""
+    height, width = pixels.shape[:2]
+    image.paste(Image.frombuffer("RGBX", (width, height), pixels, "raw", "RGBX", 0, 1), box[:2])
+
+
+def _words(pixels: Any) -> Any:
+    """View an RGBX pixel array as one 32-bit word per pixel."""
+    return pixels.view(geometry.np.dtype('<u4'))[..., 0]
+
+
+def _pack(color: Any) -> Any:
+    """
+    Pack an RGB color into the 32-bit word of an RGBX pixel.
+
+    Returns:
+        Packed color, None for no ink, or False when the color needs Pillow
+    """
+    try:
+        return _packed[color]
+    except (KeyError, TypeError):
+        pass
+    if color is None:
+        return None
+    if not (isinstance(color, tuple) and len(color) == 3 and
+            all(type(x) is int and 0 <= x <= 255 for x in color)):
+        return False
+    if len(_packed) >= PACKED_CACHE_SIZE:
+        _packed.clear()
+    packed = _packed[color] = color[0] | color[1] << 8 | color[2] << 16 | 0xFF000000
+    return packed
+
+
+def _pack_column(colors: Any) -> Any:
+    """Pack a (count, 3) uint8 color column into 32-bit words."""
+    np = geometry.np
+    colors = colors.astype(np.uint32)
+    return colors[:, 0] | colors[:, 1] << 8 | colors[:, 2] << 16 | np.uint32(0xFF000000)
+
+
+def _style(op: Any) -> Optional[Style]:
+    """Get how the backend draws a display list primitive, or None when it needs Pillow."""
+    if op.kind not in ("ellipse", "rectangle") or len(op.xy) != 2:
+        return None
+    (x0, y0), (x1, y1) = op.xy
+    if type(x0) is not int or type(y0) is not int or type(x1) is not int or type(y1) is not int \
+            or x1 < x0 or y1 < y0:
+        return None
+    fill = _pack(op.fill)
+    outline = _pack(op.outline)
+    if fill is False or outline is False:
+        return None
+    # Pillow only draws an outline distinct from the fill
+    border = op.width if outline is not None and outline != fill else 0
+    width, height = x1 - x0 + 1, y1 - y0 + 1
+    # Pillow draws outlines wider than half a rectangle irregularly; leave those to it
+    if op.kind == "rectangle" and 2 * border > min(width, height):
+        return None
+    return (op.kind, width, height, border, fill is None), x0, y0, fill, outline if border else 0
+
+
+@lru_cache(maxsize=1024)
+def _mask(kind: str, width: int, height: int, border: int, unfilled: bool) -> Tuple[Any, Any]:
+    """
+    Get the pixels a shape covers inside its bounding box.
+
+    Ellipse masks are drawn by Pillow once per size, so shapes drawn with
+    them match ``ImageDraw`` pixel for pixel.
+
+    Returns:
+        Tuple of (covered, outline) boolean arrays of the box's shape
+    """
+    np = geometry.np
+    if kind == "rectangle":
+        ys, xs = np.ogrid[0:height, 0:width]
+        inside = np.ones((height, width), dtype=bool)
+        ring = (xs < border) | (xs >= width - border) | (ys < border) | (ys >= height - border)
+    else:
+        image = Image.new("L", (width, height), 0)
+        ImageDraw.Draw(image).ellipse([(0, 0), (width - 1, height - 1)], fill=1,
+                                      outline=2 if border else None, width=border)
+        values = np.asarray(image)
+        inside = values != 0
+        ring = values == 2
+    if unfilled:
+        inside = ring
+    inside.flags.writeable = False
+    ring.flags.writeable = False
+    return inside, ring
+
+
+def _draw_one(words: Any, style: Style) -> None:
+    """Draw a single primitive into its bounding box."""
+    (kind, width, height, border, unfilled), x0, y0, fill, outline = style
+    rows, cols = words.shape
+    left, top = max(x0, 0), max(y0, 0)
+    right, bottom = min(x0 + width, cols), min(y0 + height, rows)
+    if left >= right or top >= bottom:
+        return
+    if kind == "rectangle":
+        if fill is not None:
+            # Outline over the whole box, then the fill inside it
+            words[top:bottom, left:right] = outline if border else fill
+            if border:
+                il, it = max(x0 + border, left), max(y0 + border, top)
+                ir, ib = min(x0 + width - border, right), min(y0 + height - border, bottom)
+                if il < ir and it < ib:
+                    words[it:ib, il:ir] = fill
+            return
+        # Outline bands in box coordinates, clipped to the canvas
+        for band in ((0, 0, width, border), (0, height - border, width, height),
+                     (0, 0, border, height), (width - border, 0, width, height)):
+            bl, bt = max(x0 + band[0], left), max(y0 + band[1], top)
+            br, bb = min(x0 + band[2], right), min(y0 + band[3], bottom)
+            if bl < br and bt < bb:
+                words[bt:bb, bl:br] = outline
+        return
+    target = words[top:bottom, left:right]
+    inside, ring = _mask(kind, width, height, border, unfilled)
+    window = (slice(top - y0, bottom - y0), slice(left - x0, right - x0))
+    if fill is not None:
+        target[inside[window]] = fill
+    if border:
+        target[ring[window]] = outline
+
+
+def _cover(words: Any, key: Tuple[str, int, int, int, bool], left: Any, top: Any, fill: Any,
+           outline: Any, order: Any) -> Tuple[Any, Any, Any]:
+    """
+    Get the pixels covered by primitives of one size.
+
+    Args:
+        words: Target pixel words
+        key: Shared (kind, width, height, border, unfilled) of the primitives
+        left: Column of box left edges
+        top: Column of box top edges
+        fill: Column of packed fill colors (ignored when unfilled)
+        outline: Column of packed outline colors
+        order: Column of drawing order positions
+
+    Returns:
+        Tuple of (flat pixel indices, drawing order, packed colors) inside the target
+    """
+    np = geometry.np
+    inside, ring = _mask(*key)
+    ys, xs = np.nonzero(inside)
+    rows, cols = words.shape
+    # Pixel indices fit 32 bits for any image Pillow allocates
+    px = left.astype(np.int32)[:, None] + xs.astype(np.int32)
+    py = top.astype(np.int32)[:, None] + ys.astype(np.int32)
+    if key[4]:
+        color = np.broadcast_to(outline[:, None], px.shape)
+    else:
+        color = np.where(ring[ys, xs], outline[:, None], fill[:, None])
+    flat = py * np.int32(cols) + px
+    order = np.broadcast_to(order.astype(np.int32)[:, None], px.shape)
+    if left.min() >= 0 and top.min() >= 0 and left.max() + key[1] <= cols \
+            and top.max() + key[2] <= rows:
+        return flat.reshape(-1), order.reshape(-1), color.reshape(-1)
+    keep = (px >= 0) & (px < cols) & (py >= 0) & (py < rows)
+    return flat[keep], order[keep], color[keep]
+
+
+def _composite(words: Any, pieces: List[Tuple[Any, Any, Any]]) -> None:
+    """Write covered pixels, keeping the latest primitive where several overlap."""
+    np = geometry.np
+    flat, order, color = (np.concatenate(column) for column in zip(*pieces))
+    if not flat.size:
+        return
+    # Fancy assignment leaves repeated indices in no defined order, so find
+    # the last primitive covering every pixel first
+    last = np.full(words.size, -1, dtype=np.int32)
+    np.maximum.at(last, flat, order)
+    top = last[flat] == order
+    words.reshape(-1)[flat[top]] = color[top]
+
+
+def _draw_many(words: Any, styles: List[Style]) -> None:
+    """Draw primitives of one size with a single array operation, in order."""
+    np = geometry.np
+    _, left, top, fill, outline = zip(*styles)
+    if styles[0][0][4]:
+        fill = (0,) * len(styles)
+    _composite(words, [_cover(words, styles[0][0], np.array(left), np.array(top),
+                              np.array(fill, dtype=np.uint32), np.array(outline, dtype=np.uint32),
+                              np.arange(len(styles)))])
+
+
+def _draw_window(image: Image.Image, styles: List[Style], box: Tuple[int, int, int, int]) -> None:
+    """Draw primitives in order through a copy of the box they cover."""
+    left, top = max(box[0], 0), max(box[1], 0)
+    box = (left, top, min(box[2], image.width), min(box[3], image.height))
+    pixels = _read(image, box)
+    words = _words(pixels)
+
+    run: List[Style] = []
+
+    def flush() -> None:
+        if len(run) >= VECTOR_MIN:
+            _draw_many(words, run)
+        else:
+            for style in run:
+                _draw_one(words, style)
+        run.clear()
+
+    for key, x0, y0, fill, outline in styles:
+        if run and run[0][0] != key:
+            flush()
+        run.append((key, x0 - left, y0 - top, fill, outline))
+    flush()
+    _write(image, pixels, box)
+
+
+def _area(box: Tuple[int, int, int, int]) -> int:
+    """Get the number of pixels in a box."""
+    return (box[2] - box[0]) * (box[3] - box[1])
+
+
+def _union(a: Tuple[int, int, int, int], b: Tuple[int, int, int, int]) -> Tuple[int, int, int, int]:
+    """Get the box covering two boxes."""
+    return (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+
+
+def _draw_segment(image: Image.Image, styles: List[Style]) -> None:
+    """
+    Draw consecutive primitives through as few canvas windows as pay off.
+
+    The whole run shares one window unless its box is much larger than the
+    primitives need; then consecutive primitives lying close together share
+    one, so scattered primitives do not copy the untouched pixels between them.
+    """
+    boxes = [(x0, y0, x0 + key[1], y0 + key[2]) for key, x0, y0, _, _ in styles]
+    lefts, tops, rights, bottoms = zip(*boxes)
+    span = (min(lefts), min(tops), max(rights), max(bottoms))
+    covered = sum(_area(box) for box in boxes)
+    if _area(span) <= WINDOW_COST_PIXELS * len(styles) + covered:
+        _draw_window(image, styles, span)
+        return
+
+    start = 0
+    span, covered = boxes[0], _area(boxes[0])
+    for i in range(1, len(styles)):
+        union = _union(span, boxes[i])
+        if _area(union) > WINDOW_SLACK * (covered + _area(boxes[i])) + WINDOW_COST_PIXELS:
+            _draw_window(image, styles[start:i], span)
+            start, union, covered = i, boxes[i], 0
+        span = union
+        covered += _area(boxes[i])
+    _draw_window(image, styles[start:], span)
+
+
+def raster_ops(image: Image.Image, ops: Sequence[Any], draw_other: Any) -> None:
+    """
+    Draw display list primitives, rasterizing ellipses and rectangles with NumPy.
+
+    Args:
+        image: RGBX target image
+        ops: Primitives in drawing order, in image coordinates
+        draw_other: Callable drawing a list of primitives the backend cannot handle
+    """
+    segment: List[Style] = []
+    segment_ops: List[Any] = []
+    pending: List[Any] = []
+    for op in ops:
+        style = _style(op)
+        if style is None:
+            if len(segment) >= VECTOR_MIN:
+                _draw_segment(image, segment)
+            else:
+                # Too few to repay copying a window; Pillow draws the same pixels
+                pending.extend(segment_ops)
+            segment, segment_ops = [], []
+            pending.append(op)
+            continue
+        if pending:
+            draw_other(pending)
+            pending = []
+        (_, width, height, border, _), x0, y0, fill, _ = style
+        if fill is None and not border:
+            # Neither fill nor outline
+            continue
+        if x0 + width <= 0 or y0 + height <= 0 or x0 >= image.width or y0 >= image.height:
+            continue
+        segment.append(style)
+        segment_ops.append(op)
+    if len(segment) >= VECTOR_MIN:
+        _draw_segment(image, segment)
+    else:
+        pending.extend(segment_ops)
+    if pending:
+        draw_other(pending)
+
+
+def raster_batch(image: Image.Image, batch: Any) -> bool:
+    """
+    Draw a batch of circles or rectangles straight from its columns.
+
+    The canvas under the visible shapes is copied one tile of at most
+    TILE_SIZE pixels square at a time, skipping tiles no shape touches, so
+    copies stay small on large canvases.
+
+    Args:
+        image: RGBX target image
+        batch: ShapeBatch to draw
+
+    Returns:
+        True if the batch was drawn, False if it needs drawing shape by shape
+    """
+    np = geometry.np
+    params = batch.params
+    if not len(batch):
+        return True
+    if params.shape not in ("circle", "rectangle") or isinstance(params.fill_color, list):
+        return False
+    if params.shape == "circle":
+        if not np.issubdtype(params.center.dtype, np.integer):
+            return False
+        center = params.center.astype(np.int64)
+        radius = params.radius.astype(np.int64)
+        x0, y0 = center[:, 0] - radius, center[:, 1] - radius
+        x1, y1 = center[:, 0] + radius, center[:, 1] + radius
+        kind = "ellipse"
+    else:
+        start, end = params.start, params.end
+        if not (np.issubdtype(start.dtype, np.integer) and np.issubdtype(end.dtype, np.integer)) \
+                or (end < start).any():
+            return False
+        x0, y0 = start[:, 0].astype(np.int64), start[:, 1].astype(np.int64)
+        x1, y1 = end[:, 0].astype(np.int64), end[:, 1].astype(np.int64)
+        kind = "rectangle"
+
+    fill = _pack_column(params.fill_color)
+    outline = _pack_column(params.outline_color)
+    border = np.where(outline != fill, params.border_width, 0)
+    width, height = x1 - x0 + 1, y1 - y0 + 1
+    if kind == "rectangle" and (2 * border > np.minimum(width, height)).any():
+        return False
+
+    cols, rows = image.size
+    visible = np.flatnonzero((x1 >= 0) & (x0 < cols) & (y1 >= 0) & (y0 < rows))
+    if not visible.size:
+        return True
+    columns = (kind, x0, y0, width, height, border, fill, outline)
+    right, bottom = min(int(x1[visible].max()) + 1, cols), min(int(y1[visible].max()) + 1, rows)
+    # Shapes crossing a tile edge are drawn, clipped, in every tile they touch
+    for tile_top in range(max(int(y0[visible].min()), 0), bottom, TILE_SIZE):
+        band = visible[(y1[visible] >= tile_top) & (y0[visible] < tile_top + TILE_SIZE)]
+        for tile_left in range(max(int(x0[visible].min()), 0), right, TILE_SIZE):
+            index = band[(x1[band] >= tile_left) & (x0[band] < tile_left + TILE_SIZE)]
+            if not index.size:
+                continue
+            box = (max(int(x0[index].min()), tile_left), max(int(y0[index].min()), tile_top),
+                   min(int(x1[index].max()) + 1, tile_left + TILE_SIZE, right),
+                   min(int(y1[index].max()) + 1, tile_top + TILE_SIZE, bottom))
+            _draw_tile(image, box, index, columns)
+    return True
+
+
+def _draw_tile(image: Image.Image, box: Tuple[int, int, int, int], index: Any,
+               columns: Tuple[Any, ...]) -> None:
+    """Draw the batch shapes touching one tile, in order, through a copy of the tile."""
+    np = geometry.np
+    kind, x0, y0, width, height, border, fill, outline = columns
+    pixels = _read(image, box)
+    words = _words(pixels)
+    x0, y0 = x0 - box[0], y0 - box[1]
+    # Split the shapes into chunks of about CHUNK_PIXELS covered pixels
+    area = np.cumsum(width[index] * height[index])
+    splits = np.searchsorted(area, np.arange(CHUNK_PIXELS, area[-1], CHUNK_PIXELS))
+    for chunk in np.split(index, splits):
+        if not chunk.size:
+            continue
+        # Draw each distinct size with one mask, keeping the batch order
+        keys = (width[chunk] * (height.max() + 1) + height[chunk]) * (border.max() + 1) + border[chunk]
+        if keys.min() == keys.max():
+            groups = [chunk]
+        else:
+            by_key = np.argsort(keys, kind="stable")
+            _, starts = np.unique(keys[by_key], return_index=True)
+            groups = [chunk[members] for members in np.split(by_key, starts[1:])]
+        pieces = []
+        for members in groups:
+            first = members[0]
+            key = (kind, int(width[first]), int(height[first]), int(border[first]), False)
+            pieces.append(_cover(words, key, x0[members], y0[members], fill[members], outline[members],
+                                 members))
+        _composite(words, pieces)
+    _write(image, pixels, box)
@@ -3,10 +3,27 @@
 import math
 from abc import ABC, abstractmethod
 from enum import Enum
-from typing import Dict, Any, List, Tuple, Optional
+from types import MappingProxyType
+from typing import Dict, Any, List, Mapping, Tuple, Type, Optional, cast
 from PIL import Image, ImageDraw
 
+from . import geometry
+from .compositing import BLEND_MODES, Layer
+from .sprites import SPRITE_MAX_PIXELS, Sprite, sprite_cache
 from .exceptions import InvalidShapeError, DrawingError, ValidationError
+from .params import NO_PARAMS, UNPARSED, ShapeParams, make_params
+
+
+# Extra pixels added around shape bounds to cover rounding in Pillow
+BOUNDS_MARGIN = 2
+
+# Default limit on the number of branches a fractal tree may draw
+FRACTAL_BRANCH_BUDGET = 2 ** 16
+
+# Consecutive dashes share one coverage mask while its box spans at most
+# this many pixels, or this many times the pixels they cover
+DASH_MASK_PIXELS = 1 << 14
+DASH_MASK_SLACK = 4
 
 
 class ShapeType(Enum):
@@ -81,15 +98,178 @@ class ShapeType(Enum):
     HELIX = "helix"
     SINE_WAVE_PATTERN = "sine_wave_pattern"
     FRACTAL_TREE = "fractal_tree"
+    
+    # Columnar batches of simple shapes
+    SHAPE_BATCH = "shape_batch"
+    
+    # One template shape placed at many offsets
+    INSTANCES = "instances"
+
+
+# Shape types by their configuration name
+_SHAPE_TYPES = {shape_type.value: shape_type for shape_type in ShapeType}
+
+
+def _to_json(value: Any) -> Any:
+    """Convert a parsed parameter back to its JSON form."""
+    if isinstance(value, tuple):
+        return [_to_json(item) for item in value]
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    if isinstance(value, BaseShape):
+        return value.data
+    return value
+
+
+def _dash_runs(dashes: List[List[Tuple[float, float]]], width: int) -> List[List[List[Tuple[float, float]]]]:
+    """Group consecutive dashes whose common box stays close to the pixels they cover."""
+    runs: List[List[List[Tuple[float, float]]]] = []
+    box = (0.0, 0.0, 0.0, 0.0)
+    covered = 0.0
+    for dash in dashes:
+        xs = [x for x, _ in dash]
+        ys = [y for _, y in dash]
+        length = sum(math.dist(a, b) for a, b in zip(dash, dash[1:]))
+        grown = (min(xs), min(ys), max(xs), max(ys))
+        if runs:
+            grown = (min(grown[0], box[0]), min(grown[1], box[1]),
+                     max(grown[2], box[2]), max(grown[3], box[3]))
+            area = (grown[2] - grown[0] + width) * (grown[3] - grown[1] + width)
+            if area <= max(DASH_MASK_PIXELS, DASH_MASK_SLACK * (covered + (length + 1) * width)):
+                runs[-1].append(dash)
+                box = grown
+                covered += (length + 1) * width
+                continue
+        runs.append([dash])
+        box = (min(xs), min(ys), max(xs), max(ys))
+        covered = (length + 1) * width
+    return runs
 
 
 class BaseShape(ABC):
     """Abstract base class for all shapes."""
     
+    __slots__ = ('_data', '_extra', 'params', 'flatness', 'use_sprites', '_parsing')
+    
+    # Parameter placing the shape; when set, copies differing only in it
+    # are stamped from a cached sprite
+    sprite_anchor: Optional[str] = None
+    
+    # Class name of the shape's parameter record
+    _params_name = "BaseShapeParams"
+    
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        cls._params_name = f"{cls.__name__}Params"
+    
     def __init__(self, data: Dict[str, Any]):
-        """Initialize shape with data."""
-        self.data = data
+        """
+        Initialize shape with data.
+
+        The data is validated and parsed once into ``params``; later changes
+        to ``data`` do not affect the shape.
+        """
+        self._data: Optional[Dict[str, Any]] = data
+        self._extra: Optional[Mapping[str, Any]] = None
+        self.params: ShapeParams = NO_PARAMS
+        # Canvas-wide flatness tolerance, used when the shape data sets none
+        self.flatness: Optional[float] = None
+        # Stamp copies of the shape from the sprite cache
+        self.use_sprites = False
+        self._parsing: Dict[str, Any] = {}
         self.validate()
+        if 'opacity' in data:
+            self._get_opacity()
+        if 'blend_mode' in data:
+            self._get_blend_mode()
+        self.params = make_params(self._params_name, self._parsing)
+        del self._parsing
+    
+    @property
+    def data(self) -> Dict[str, Any]:
+        """Shape data: the original dictionary, or one rebuilt from ``params`` once compacted."""
+        if self._data is not None:
+            return self._data
+        data = dict(self._extra or {})
+        for name, value in zip(self.params._fields, self.params):
+            if value is not None:
+                data[name] = _to_json(value)
+        return data
+    
+    def compact(self, shared: Optional[Dict[Any, Any]] = None) -> 'BaseShape':
+        """
+        Release the source data, keeping only the parsed parameters.
+        
+        Integers and colors are replaced by equal objects from ``shared``,
+        so shapes compacted with the same table reuse them. Keys the shape
+        does not parse (such as ``type``) are kept aside for ``data``.
+        
+        Args:
+            shared: Table of values to share between shapes
+            
+        Returns:
+            Self
+        """
+        if self._data is None:
+            return self
+        if shared is None:
+            shared = {}
+        
+        values = []
+        for name, value in zip(self.params._fields, self.params):
+            if type(value) is int:
+                value = shared.setdefault(value, value)
+            elif type(value) is tuple and name.endswith('color'):
+                value = shared.setdefault(value, value)
+            elif type(value) is tuple and all(type(x) is int for x in value):
+                value = tuple([shared.setdefault(x, x) for x in value])
+            values.append(value)
+        self.params = tuple.__new__(type(self.params), values)
+        
+        extra = {key: value for key, value in self._data.items() if key not in self.params._fields}
+        try:
+            key = ('extra',) + tuple(extra.items())
+            self._extra = shared.setdefault(key, MappingProxyType(extra))
+        except TypeError:
+            # Unhashable values: keep a private copy
+            self._extra = extra
+        self._data = None
+        return self
+    
+    def moved(self, dx: float, dy: float, **overrides: Any) -> 'BaseShape':
+        """
+        Get a copy of the shape moved by an offset, without validating again.
+        
+        Every point parameter and polygon coordinate is translated; the
+        copy shares the other parsed parameters. Overrides replace parsed
+        parameters and must already be valid.
+        
+        Args:
+            dx: Horizontal offset
+            dy: Vertical offset
+            **overrides: Parsed parameter values to replace
+        
+        Returns:
+            New shape of the same class
+        """
+        values = []
+        for name, value in zip(self.params._fields, self.params):
+            if name in overrides:
+                value = overrides[name]
+            elif name == 'coordinates':
+                value = tuple((x + dx, y + dy) for x, y in value)
+            elif type(value) is tuple and len(value) == 2 and name != 'dash_array':
+                value = (value[0] + dx, value[1] + dy)
+            values.append(value)
+        
+        shape = object.__new__(type(self))
+        shape._data = None
+        shape._extra = self._extra if self._data is None else {
+            key: value for key, value in self._data.items() if key not in self.params._fields}
+        shape.params = tuple.__new__(type(self.params), values)
+        shape.flatness = self.flatness
+        shape.use_sprites = self.use_sprites
+        return shape
     
     @abstractmethod
     def validate(self) -> None:
@@ -100,60 +280,375 @@ class BaseShape(ABC):
     def draw(self, canvas: Image.Image) -> Image.Image:
         """Draw the shape on the canvas."""
         pass
+
+    def paint(self, canvas: Image.Image) -> Image.Image:
+        """
+        Draw the shape, compositing it with its opacity and blend mode.
+        
+        Opaque shapes with the normal blend mode are drawn directly, or
+        stamped from a cached sprite when ``use_sprites`` is set. Others are
+        drawn into a layer covering their bounds, which is then blended onto
+        that part of the canvas only.
+        
+        Args:
+            canvas: Image or drawing surface
+            
+        Returns:
+            The canvas
+        """
+        opacity = self._get_opacity()
+        blend_mode = self._get_blend_mode()
+        if opacity >= 1 and blend_mode == "normal":
+            if not (self.use_sprites and self.sprite_anchor is not None and self._stamp(canvas)):
+                self.draw(canvas)
+            return canvas
+        if opacity > 0:
+            layer = Layer(canvas, self.bounds())
+            # Layers draw in canvas coordinates like an image
+            self.draw(cast(Image.Image, layer))
+            layer.composite(canvas, opacity=opacity, blend_mode=blend_mode)
+        return canvas
     
+    def _stamp(self, canvas: Image.Image) -> bool:
+        """
+        Draw the shape by pasting its cached sprite.
+        
+        Sprites are keyed by every parameter except the anchor point and
+        drawn once with the anchor at a fixed position in the tile, so every
+        copy moved by whole pixels gets exactly the same pixels. Copies may
+        differ from the shape drawn in place by single edge pixels where a
+        vertex falls halfway between pixels. Shapes anchored between pixels
+        or larger than SPRITE_MAX_PIXELS are drawn.
+        
+        Args:
+            canvas: Image or drawing surface
+            
+        Returns:
+            True if the sprite was pasted, False if the shape must be drawn
+        """
+        anchor_name = self.sprite_anchor
+        box = self.bounds()
+        if anchor_name is None or box is None:
+            return False
+        x, y = self._get_point(anchor_name)
+        if type(x) is not int or type(y) is not int:
+            return False
+        left, top, right, bottom = box
+        origin = (math.floor(left), math.floor(top))
+        size = (math.ceil(right) + 1 - origin[0], math.ceil(bottom) + 1 - origin[1])
+        if size[0] * size[1] > SPRITE_MAX_PIXELS:
+            return False
+        key = (type(self).__name__, self.flatness) + tuple(
+            value for name, value in zip(self.params._fields, self.params) if name != anchor_name)
+        try:
+            hash(key)
+        except TypeError:
+            return False
+        
+        def build() -> Sprite:
+            # The anchor's place in the tile is the same for every copy
+            anchor = (x - origin[0], y - origin[1])
+            sprite = type(self)(dict(self.data, **{anchor_name: list(anchor)}))
+            sprite.flatness = self.flatness
+            image = Image.new('RGBA', size, (0, 0, 0, 0))
+            sprite.draw(image)
+            # Trim the margin the bounds leave, so each paste covers fewer pixels
+            box = image.getchannel('A').getbbox() or (0, 0, 1, 1)
+            image = image.crop(box)
+            return image.convert('RGB'), image.getchannel('A'), (box[0] - anchor[0], box[1] - anchor[1])
+        
+        tile, mask, (dx, dy) = sprite_cache.get(key, build)
+        if hasattr(canvas, 'stamp'):
+            canvas.stamp(tile, mask, (x + dx, y + dy), self)
+        else:
+            canvas.paste(tile, (x + dx, y + dy), mask)
+        return True
+    
+    def is_opaque(self) -> bool:
+        """Check whether the shape replaces the pixels it covers."""
+        return self._get_opacity() >= 1 and self._get_blend_mode() == "normal"
+
+    def bounds(self) -> Optional[Tuple[float, float, float, float]]:
+        """
+        Get the extent of the shape in canvas coordinates.
+
+        The box is conservative: it covers every pixel the shape draws,
+        including stroke width and arrowheads.
+
+        Returns:
+            (left, top, right, bottom) box, or None when the extent is unknown
+        """
+        return None
+
+    def interior(self) -> Optional[Tuple[int, int, int, int]]:
+        """
+        Get a box the shape covers completely with opaque color.
+
+        The box is conservative: every pixel in it is painted by the shape,
+        so anything drawn earlier and lying inside it cannot be seen.
+
+        Returns:
+            Inclusive (left, top, right, bottom) pixel box, or None when the
+            shape has no such area
+        """
+        return None
+
+    def unclipped_parts(self, canvas_size: Tuple[int, int],
+                        min_size: float) -> Optional[List[Tuple[float, float, float, float]]]:
+        """
+        Get the parts of a composite shape that must be drawn unclipped.
+
+        Pillow rasterizes polygons, wide lines and fractional coordinates
+        slightly differently when a window edge cuts them, so tiled
+        rendering draws such parts whole and clips everything else.
+
+        Args:
+            canvas_size: Size of the canvas the shape is drawn on
+            min_size: Parts no wider and no taller than this are left out
+
+        Returns:
+            Extents of the parts, or None for shapes drawn as one piece
+        """
+        return None
+
+    def _filled_box(self, start: Tuple[float, float], end: Tuple[float, float]) -> Tuple[int, int, int, int]:
+        """Get the pixels a filled rectangle between two corners paints, rounding inwards."""
+        return (math.ceil(min(start[0], end[0])), math.ceil(min(start[1], end[1])),
+                math.floor(max(start[0], end[0])), math.floor(max(start[1], end[1])))
+
+    def _box(self, points: List[Tuple[float, float]], pad: float = 0) -> Tuple[float, float, float, float]:
+        """Get the padded bounding box of a list of points."""
+        xs = [point[0] for point in points]
+        ys = [point[1] for point in points]
+        pad += BOUNDS_MARGIN
+        return (min(xs) - pad, min(ys) - pad, max(xs) + pad, max(ys) + pad)
+
+    def _radial_box(self, center: Tuple[int, int], radius: float,
+                    pad: float = 0) -> Tuple[float, float, float, float]:
+        """Get the padded bounding box of a circle."""
+        x, y = center
+        return self._box([(x - radius, y - radius), (x + radius, y + radius)], pad)
+
+    def _arrowhead_reach(self) -> float:
+        """Get how far an arrowhead extends from its tip."""
+        # Arrowhead corners sit arrow_size back and arrow_size / 2 sideways
+        return self._get_int('arrow_size', 10) * math.sqrt(1.25)
+
+    def _get_draw(self, canvas: Any) -> ImageDraw.ImageDraw:
+        """Get a drawing context for a canvas image or tile surface."""
+        if isinstance(canvas, Image.Image):
+            return ImageDraw.Draw(canvas)
+        draw: ImageDraw.ImageDraw = canvas.get_draw()
+        return draw
+
+    def _draw_polyline(self, canvas: Any, points: List[Tuple[float, float]],
+                       fill: Tuple[int, int, int], width: int) -> None:
+        """
+        Draw connected line segments, rounding the joints of wide strokes.
+
+        The path is drawn in one call, or as dashes when the shape sets a
+        dash pattern.
+        """
+        pattern = self._get_dash_pattern()
+        if pattern is None:
+            self._get_draw(canvas).line(points, fill=fill, width=width, joint="curve")
+            return
+        self._draw_dashes(canvas, geometry.dash_polyline(points, *pattern), fill, width, "curve")
+
+    def _draw_dashes(self, canvas: Any, dashes: List[List[Tuple[float, float]]],
+                     fill: Tuple[int, int, int], width: int, joint: Optional[str] = None) -> None:
+        """
+        Draw dashes into coverage masks and paste the color through each once.
+
+        Consecutive dashes share an ``L`` mask until its box would outgrow
+        both DASH_MASK_PIXELS and DASH_MASK_SLACK times the pixels they
+        cover, so a long diagonal stroke does not allocate a mask of its
+        whole bounding box. Surfaces
+        that record drawing calls rather than pixels get one line per dash,
+        which display lists can replay at any scale.
+        """
+        if not (isinstance(canvas, Image.Image) or hasattr(canvas, 'image')):
+            draw = self._get_draw(canvas)
+            for dash in dashes:
+                draw.line(dash, fill=fill, width=width, joint=joint)
+            return
+        for run in _dash_runs(dashes, width):
+            layer = Layer(canvas, self._box([point for dash in run for point in dash], width), 'L')
+            if layer.empty:
+                continue
+            ox, oy = layer.origin
+            mask = ImageDraw.Draw(layer.image)
+            for dash in run:
+                mask.line([(x - ox, y - oy) for x, y in dash], fill=255, width=width, joint=joint)
+            canvas.paste(Image.new('RGB', layer.image.size, fill), layer.origin, layer.image)
+
     def _get_color(self, key: str, default: Tuple[int, int, int] = (0, 0, 0)) -> Tuple[int, int, int]:
         """Get color from data with validation."""
-        color = self.data.get(key, default)
+        if self.params is not NO_PARAMS:
+            color = getattr(self.params, key, UNPARSED)
+            if color is not UNPARSED:
+                return default if color is None else color
+        data = self._data if self._data is not None else self.data
+        color = data.get(key, default)
         if isinstance(color, (list, tuple)) and len(color) == 3:
             # Validate that all color values are integers in the range 0-255
-            if all(isinstance(x, int) and 0 <= x <= 255 for x in color):
-                return tuple(color)
+            r, g, b = color
+            if (isinstance(r, int) and isinstance(g, int) and isinstance(b, int)
+                    and 0 <= r <= 255 and 0 <= g <= 255 and 0 <= b <= 255):
+                color = (r, g, b)
+                if self.params is NO_PARAMS:
+                    self._parsing[key] = color if key in data else None
+                return color
             else:
                 raise ValidationError(f"Color values for {key} must be integers between 0 and 255")
         raise ValidationError(f"Invalid color format for {key}")
     
     def _get_point(self, key: str) -> Tuple[int, int]:
         """Get point coordinates from data with validation."""
-        point = self.data.get(key)
+        if self.params is not NO_PARAMS:
+            parsed: Optional[Tuple[int, int]] = getattr(self.params, key, None)
+            if parsed is not None:
+                return parsed
+        data = self._data if self._data is not None else self.data
+        point = data.get(key)
         if point and isinstance(point, (list, tuple)) and len(point) == 2:
-            return tuple(point)
+            point = tuple(point)
+            if self.params is NO_PARAMS:
+                self._parsing[key] = point
+            return point
         raise ValidationError(f"Invalid point format for {key}")
     
     def _get_int(self, key: str, default: int = 0, min_val: Optional[int] = None) -> int:
         """Get integer value from data with validation."""
-        value = self.data.get(key, default)
+        if self.params is not NO_PARAMS:
+            value = getattr(self.params, key, UNPARSED)
+            if value is not UNPARSED:
+                return default if value is None else value
+        data = self._data if self._data is not None else self.data
+        value = data.get(key, default)
         if not isinstance(value, int):
             raise ValidationError(f"Invalid integer value for {key}")
         if min_val is not None and value < min_val:
             raise ValidationError(f"Value for {key} must be >= {min_val}")
+        if self.params is NO_PARAMS:
+            self._parsing[key] = value if key in data else None
+        return value
+
+    def _get_flatness(self) -> float:
+        """Get the flatness tolerance in pixels for sampling curves."""
+        default = self.flatness if self.flatness is not None else geometry.DEFAULT_FLATNESS
+        if self.params is not NO_PARAMS:
+            value = getattr(self.params, 'flatness', UNPARSED)
+            if value is not UNPARSED:
+                return default if value is None else value
+        data = self._data if self._data is not None else self.data
+        value = data.get('flatness', default)
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0:
+            raise ValidationError("Flatness must be a positive number")
+        if self.params is NO_PARAMS:
+            self._parsing['flatness'] = value if 'flatness' in data else None
+        return value
+
+    def _get_opacity(self) -> float:
+        """Get the opacity the shape is composited with, from 0 to 1."""
+        if self.params is not NO_PARAMS:
+            value = getattr(self.params, 'opacity', None)
+            return 1.0 if value is None else value
+        data = self._data if self._data is not None else self.data
+        if 'opacity' not in data:
+            return 1.0
+        value = data['opacity']
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not 0 <= value <= 1:
+            raise ValidationError("Opacity must be a number between 0 and 1")
+        self._parsing['opacity'] = value
+        return value
+
+    def _get_blend_mode(self) -> str:
+        """Get the mode the shape's colors are blended with the canvas in."""
+        if self.params is not NO_PARAMS:
+            mode: Optional[str] = getattr(self.params, 'blend_mode', None)
+            return "normal" if mode is None else mode
+        data = self._data if self._data is not None else self.data
+        if 'blend_mode' not in data:
+            return "normal"
+        value: str = data['blend_mode']
+        if value not in BLEND_MODES:
+            raise ValidationError(f"Blend mode must be one of {', '.join(BLEND_MODES)}")
+        self._parsing['blend_mode'] = value
         return value
 
+    def _get_dash_pattern(self, default: Optional[List[float]] = None) -> Optional[Tuple[List[float], float]]:
+        """
+        Get the dash pattern of a stroked shape.
+
+        Args:
+            default: Dash array used when the shape data sets none
+
+        Returns:
+            Tuple of (dash array, dash offset), or None for a solid stroke
+        """
+        dash_array = getattr(self.params, 'dash_array', UNPARSED)
+        if dash_array is UNPARSED:
+            data = self._data if self._data is not None else self.data
+            dash_array = data.get('dash_array')
+            if dash_array is not None:
+                if (not isinstance(dash_array, (list, tuple)) or not dash_array
+                        or any(isinstance(x, bool) or not isinstance(x, (int, float)) or x < 0
+                               for x in dash_array)
+                        or sum(dash_array) <= 0):
+                    raise ValidationError("dash_array must be a non-empty list of non-negative "
+                                          "numbers with a positive sum")
+                dash_array = tuple(dash_array)
+            dash_offset = data.get('dash_offset', 0)
+            if isinstance(dash_offset, bool) or not isinstance(dash_offset, (int, float)):
+                raise ValidationError("dash_offset must be a number")
+            if self.params is NO_PARAMS:
+                self._parsing['dash_array'] = dash_array
+                self._parsing['dash_offset'] = dash_offset
+            if dash_array is None:
+                dash_array = default
+        else:
+            dash_array = default if dash_array is None else dash_array
+            dash_offset = self.params.dash_offset
+        if dash_array is None:
+            return None
+        return list(dash_array), dash_offset
+
 
 class StraightLine(BaseShape):
     """Straight line shape."""
     
+    __slots__ = ()
+    
     def validate(self) -> None:
         """Validate straight line data."""
         self._get_point('start')
         self._get_point('end')
         self._get_color('fill_color')
         self._get_int('border_width', min_val=1)
+        self._get_dash_pattern()
+    
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """Get the extent of the straight line."""
+        return self._box([self._get_point('start'), self._get_point('end')],
+                         self._get_int('border_width', 1))
     
     def draw(self, canvas: Image.Image) -> Image.Image:
         """Draw straight line on canvas."""
-        draw = ImageDraw.Draw(canvas)
         start = self._get_point('start')
         end = self._get_point('end')
         fill_color = self._get_color('fill_color')
         border_width = self._get_int('border_width', 1)
         
-        draw.line([start, end], fill=fill_color, width=border_width)
+        self._draw_polyline(canvas, [start, end], fill_color, border_width)
         return canvas
 
 
 class DashedLine(BaseShape):
     """Dashed line shape."""
     
+    __slots__ = ()
+    
     def validate(self) -> None:
         """Validate dashed line data."""
         self._get_point('start')
@@ -161,48 +656,25 @@ class DashedLine(BaseShape):
         self._get_color('fill_color')
         self._get_int('border_width', min_val=1)
         self._get_int('dash_length', 10, min_val=1)
+        self._get_dash_pattern()
+    
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """Get the extent of the dashed line."""
+        return self._box([self._get_point('start'), self._get_point('end')],
+                         self._get_int('border_width', 1))
     
     def draw(self, canvas: Image.Image) -> Image.Image:
         """Draw dashed line on canvas."""
-        draw = ImageDraw.Draw(canvas)
         start = self._get_point('start')
         end = self._get_point('end')
         fill_color = self._get_color('fill_color')
         border_width = self._get_int('border_width', 1)
         dash_length = self._get_int('dash_length', 10)
         
-        is_drawing_dash = True
-        current_position = start
-        
-        # Calculate direction vector
-        dx = end[0] - start[0]
-        dy = end[1] - start[1]
-        distance = math.sqrt(dx**2 + dy**2)
-        
-        if distance == 0:
-            return canvas
-            
-        # Normalize direction
-        unit_x = dx / distance
-        unit_y = dy / distance
-        
-        current_distance = 0
-        
-        while current_distance < distance:
-            remaining_distance = distance - current_distance
-            segment_length = min(dash_length, remaining_distance)
-            
-            next_position = (
-                start[0] + (current_distance + segment_length) * unit_x,
-                start[1] + (current_distance + segment_length) * unit_y
-            )
-            
-            if is_drawing_dash:
-                draw.line([current_position, next_position], fill=fill_color, width=border_width)
-            
-            current_position = next_position
-            current_distance += segment_length
-            is_drawing_dash = not is_drawing_dash
+        # A single dash length gives equal dashes and gaps
+        dash_array, dash_offset = self._get_dash_pattern([dash_length]) or ([dash_length], 0)
+        self._draw_dashes(canvas, geometry.dash_polyline([start, end], dash_array, dash_offset),
+                          fill_color, border_width)
         
         return canvas
 
@@ -210,6 +682,8 @@ class DashedLine(BaseShape):
 class Rectangle(BaseShape):
     """Rectangle shape."""
     
+    __slots__ = ()
+    
     def validate(self) -> None:
         """Validate rectangle data."""
         self._get_point('start')
@@ -218,9 +692,18 @@ class Rectangle(BaseShape):
         self._get_color('outline_color')
         self._get_int('border_width', min_val=0)
     
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """Get the extent of the rectangle, including a border wider than the rectangle."""
+        return self._box([self._get_point('start'), self._get_point('end')],
+                         self._get_int('border_width', 1))
+    
+    def interior(self) -> Tuple[int, int, int, int]:
+        """Get the filled area of the rectangle."""
+        return self._filled_box(self._get_point('start'), self._get_point('end'))
+    
     def draw(self, canvas: Image.Image) -> Image.Image:
         """Draw rectangle on canvas."""
-        draw = ImageDraw.Draw(canvas)
+        draw = self._get_draw(canvas)
         start = self._get_point('start')
         end = self._get_point('end')
         fill_color = self._get_color('fill_color')
@@ -234,6 +717,8 @@ class Rectangle(BaseShape):
 class Circle(BaseShape):
     """Circle shape."""
     
+    __slots__ = ()
+    
     def validate(self) -> None:
         """Validate circle data."""
         self._get_point('center')
@@ -242,9 +727,21 @@ class Circle(BaseShape):
         self._get_color('outline_color')
         self._get_int('border_width', min_val=0)
     
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """Get the extent of the circle."""
+        return self._radial_box(self._get_point('center'), self._get_int('radius'))
+    
+    def interior(self) -> Optional[Tuple[int, int, int, int]]:
+        """Get the square inscribed in the circle, one pixel inside its edge."""
+        x, y = self._get_point('center')
+        half = self._get_int('radius') / math.sqrt(2) - 1
+        if half < 0:
+            return None
+        return self._filled_box((x - half, y - half), (x + half, y + half))
+    
     def draw(self, canvas: Image.Image) -> Image.Image:
         """Draw circle on canvas."""
-        draw = ImageDraw.Draw(canvas)
+        draw = self._get_draw(canvas)
         center = self._get_point('center')
         radius = self._get_int('radius')
         fill_color = self._get_color('fill_color')
@@ -262,6 +759,10 @@ class Circle(BaseShape):
 class Heart(BaseShape):
     """Heart shape."""
     
+    __slots__ = ()
+    
+    sprite_anchor = 'center'
+    
     def validate(self) -> None:
         """Validate heart data."""
         self._get_point('center')
@@ -270,34 +771,34 @@ class Heart(BaseShape):
         self._get_color('outline_color')
         self._get_int('border_width', min_val=0)
         self._get_int('rotation_angle', 0)
+        self._get_flatness()
+        self._parsing['num_points'] = self.data.get('num_points')
+    
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """Get the extent of the heart."""
+        x, y = self._get_point('center')
+        size = self._get_int('size')
+        if self._get_int('rotation_angle', 0) % 360:
+            # The curve stays within 17 * size of the center
+            return self._radial_box((x, y), 17 * size)
+        return self._box([(x - 16 * size, y - 17 * size), (x + 16 * size, y + 12 * size)])
     
     def draw(self, canvas: Image.Image) -> Image.Image:
         """Draw heart on canvas."""
-        draw = ImageDraw.Draw(canvas)
+        draw = self._get_draw(canvas)
         center = self._get_point('center')
         size = self._get_int('size')
         fill_color = self._get_color('fill_color')
         outline_color = self._get_color('outline_color')
         border_width = self._get_int('border_width', 1)
         rotation_angle = self._get_int('rotation_angle', 0)
-        num_points = self.data.get('num_points', 100)
-        
-        def rotate_point(point: Tuple[float, float], angle_degrees: float, center_point: Tuple[int, int]) -> Tuple[float, float]:
-            """Rotate a point around a center."""
-            angle_rad = math.radians(angle_degrees)
-            x, y = point
-            cx, cy = center_point
-            new_x = (x - cx) * math.cos(angle_rad) - (y - cy) * math.sin(angle_rad) + cx
-            new_y = (x - cx) * math.sin(angle_rad) + (y - cy) * math.cos(angle_rad) + cy
-            return (new_x, new_y)
-        
-        def heart_equation(t: float) -> Tuple[float, float]:
-            """Calculate heart shape coordinates."""
-            x = size * (16 * math.sin(t)**3)
-            y = size * (13 * math.cos(t) - 5 * math.cos(2*t) - 2 * math.cos(3*t) - math.cos(4*t))
-            return rotate_point((x + center[0], y + center[1]), rotation_angle, center)
-        
-        points = [heart_equation(2 * math.pi * t / num_points) for t in range(num_points)]
+        num_points = self.params.num_points
+        if num_points is None:
+            # The curve is parameterized over 2 * pi
+            acceleration = size * geometry.HEART_MAX_ACCELERATION * (2 * math.pi) ** 2
+            num_points = geometry.flat_segments(acceleration, self._get_flatness(), minimum=8)
+        
+        points = geometry.translate(geometry.heart_outline(size, rotation_angle, num_points), center)
         draw.polygon(points, fill=fill_color, outline=outline_color, width=border_width)
         
         return canvas
@@ -306,6 +807,10 @@ class Heart(BaseShape):
 class Star(BaseShape):
     """Star shape."""
     
+    __slots__ = ()
+    
+    sprite_anchor = 'center'
+    
     def validate(self) -> None:
         """Validate star data."""
         self._get_point('center')
@@ -315,9 +820,13 @@ class Star(BaseShape):
         self._get_int('border_width', min_val=0)
         self._get_int('num_points', 5, min_val=3)
     
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """Get the extent of the star."""
+        return self._radial_box(self._get_point('center'), self._get_int('size'))
+    
     def draw(self, canvas: Image.Image) -> Image.Image:
         """Draw star on canvas."""
-        draw = ImageDraw.Draw(canvas)
+        draw = self._get_draw(canvas)
         center = self._get_point('center')
         size = self._get_int('size')
         fill_color = self._get_color('fill_color')
@@ -325,14 +834,7 @@ class Star(BaseShape):
         border_width = self._get_int('border_width', 1)
         num_points = self._get_int('num_points', 5)
         
-        x, y = center
-        points = []
-        
-        for i in range(num_points * 2):
-            angle = 2 * math.pi * i / (num_points * 2)
-            radius = size if i % 2 == 0 else size * 0.4
-            points.extend([x + radius * math.cos(angle), y + radius * math.sin(angle)])
-        
+        points = geometry.translate(geometry.star_outline(size, num_points), center)
         draw.polygon(points, fill=fill_color, outline=outline_color, width=border_width)
         return canvas
 
@@ -340,6 +842,8 @@ class Star(BaseShape):
 class Ellipse(BaseShape):
     """Ellipse shape."""
     
+    __slots__ = ()
+    
     def validate(self) -> None:
         """Validate ellipse data."""
         self._get_point('start')
@@ -348,9 +852,13 @@ class Ellipse(BaseShape):
         self._get_color('outline_color')
         self._get_int('border_width', min_val=0)
     
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """Get the extent of the ellipse."""
+        return self._box([self._get_point('start'), self._get_point('end')])
+    
     def draw(self, canvas: Image.Image) -> Image.Image:
         """Draw ellipse on canvas."""
-        draw = ImageDraw.Draw(canvas)
+        draw = self._get_draw(canvas)
         start = self._get_point('start')
         end = self._get_point('end')
         fill_color = self._get_color('fill_color')
@@ -365,6 +873,8 @@ class Ellipse(BaseShape):
 class Diamond(BaseShape):
     """Diamond shape."""
     
+    __slots__ = ()
+    
     def validate(self) -> None:
         """Validate diamond data."""
         self._get_point('center')
@@ -373,9 +883,13 @@ class Diamond(BaseShape):
         self._get_color('outline_color')
         self._get_int('border_width', min_val=0)
     
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """Get the extent of the diamond."""
+        return self._radial_box(self._get_point('center'), self._get_int('size'))
+    
     def draw(self, canvas: Image.Image) -> Image.Image:
         """Draw diamond on canvas."""
-        draw = ImageDraw.Draw(canvas)
+        draw = self._get_draw(canvas)
         center = self._get_point('center')
         size = self._get_int('size')
         fill_color = self._get_color('fill_color')
@@ -398,6 +912,8 @@ class Diamond(BaseShape):
 class Square(BaseShape):
     """Square shape."""
     
+    __slots__ = ()
+    
     def validate(self) -> None:
         """Validate square data."""
         self._get_point('start')
@@ -406,9 +922,21 @@ class Square(BaseShape):
         self._get_color('outline_color')
         self._get_int('border_width', min_val=0)
     
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """Get the extent of the square, including a border wider than the square."""
+        start = self._get_point('start')
+        size = self._get_int('size')
+        return self._box([start, (start[0] + size, start[1] + size)], self._get_int('border_width', 1))
+    
+    def interior(self) -> Tuple[int, int, int, int]:
+        """Get the filled area of the square."""
+        start = self._get_point('start')
+        size = self._get_int('size')
+        return self._filled_box(start, (start[0] + size, start[1] + size))
+    
     def draw(self, canvas: Image.Image) -> Image.Image:
         """Draw square on canvas."""
-        draw = ImageDraw.Draw(canvas)
+        draw = self._get_draw(canvas)
         start = self._get_point('start')
         size = self._get_int('size')
         fill_color = self._get_color('fill_color')
@@ -423,6 +951,8 @@ class Square(BaseShape):
 class Cloud(BaseShape):
     """Cloud shape."""
     
+    __slots__ = ()
+    
     def validate(self) -> None:
         """Validate cloud data."""
         self._get_point('center')
@@ -431,9 +961,15 @@ class Cloud(BaseShape):
         self._get_color('outline_color')
         self._get_int('border_width', min_val=0)
     
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """Get the extent of the cloud."""
+        x, y = self._get_point('center')
+        size = self._get_int('size')
+        return self._box([(x - size, y - size), (x + size, y + size // 2)])
+    
     def draw(self, canvas: Image.Image) -> Image.Image:
         """Draw cloud on canvas."""
-        draw = ImageDraw.Draw(canvas)
+        draw = self._get_draw(canvas)
         center = self._get_point('center')
         size = self._get_int('size')
         fill_color = self._get_color('fill_color')
@@ -465,6 +1001,8 @@ class Cloud(BaseShape):
 class ZigzagLine(BaseShape):
     """Zigzag line shape."""
     
+    __slots__ = ()
+    
     def validate(self) -> None:
         """Validate zigzag line data."""
         self._get_point('start')
@@ -473,10 +1011,15 @@ class ZigzagLine(BaseShape):
         self._get_int('border_width', min_val=1)
         self._get_int('zigzag_height', 10, min_val=1)
         self._get_int('zigzag_frequency', 5, min_val=1)
+        self._get_dash_pattern()
+    
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """Get the extent of the zigzag line."""
+        return self._box([self._get_point('start'), self._get_point('end')],
+                         self._get_int('zigzag_height', 10) + self._get_int('border_width', 1))
     
     def draw(self, canvas: Image.Image) -> Image.Image:
         """Draw zigzag line on canvas."""
-        draw = ImageDraw.Draw(canvas)
         start = self._get_point('start')
         end = self._get_point('end')
         fill_color = self._get_color('fill_color')
@@ -500,7 +1043,7 @@ class ZigzagLine(BaseShape):
         px = -uy
         py = ux
         
-        points = [start]
+        points: List[Tuple[float, float]] = [start]
         
         for i in range(1, zigzag_frequency):
             t = i / zigzag_frequency
@@ -517,8 +1060,7 @@ class ZigzagLine(BaseShape):
         points.append(end)
         
         # Draw the zigzag
-        for i in range(len(points) - 1):
-            draw.line([points[i], points[i + 1]], fill=fill_color, width=border_width)
+        self._draw_polyline(canvas, points, fill_color, border_width)
         
         return canvas
 
@@ -526,6 +1068,8 @@ class ZigzagLine(BaseShape):
 class WavyLine(BaseShape):
     """Wavy line shape."""
     
+    __slots__ = ()
+    
     def validate(self) -> None:
         """Validate wavy line data."""
         self._get_point('start')
@@ -534,10 +1078,16 @@ class WavyLine(BaseShape):
         self._get_int('border_width', min_val=1)
         self._get_int('wave_amplitude', 10, min_val=1)
         self._get_int('wave_frequency', 3, min_val=1)
+        self._get_flatness()
+        self._get_dash_pattern()
+    
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """Get the extent of the wavy line."""
+        return self._box([self._get_point('start'), self._get_point('end')],
+                         self._get_int('wave_amplitude', 10) + self._get_int('border_width', 1))
     
     def draw(self, canvas: Image.Image) -> Image.Image:
         """Draw wavy line on canvas."""
-        draw = ImageDraw.Draw(canvas)
         start = self._get_point('start')
         end = self._get_point('end')
         fill_color = self._get_color('fill_color')
@@ -553,32 +1103,14 @@ class WavyLine(BaseShape):
         if length == 0:
             return canvas
             
-        # Unit vector along the line
-        ux = dx / length
-        uy = dy / length
-        
-        # Perpendicular unit vector
-        px = -uy
-        py = ux
-        
-        points = []
-        num_points = max(20, int(length / 5))  # More points for smoother waves
-        
-        for i in range(num_points + 1):
-            t = i / num_points
-            base_x = start[0] + t * dx
-            base_y = start[1] + t * dy
-            
-            # Sine wave offset
-            wave_offset = wave_amplitude * math.sin(2 * math.pi * wave_frequency * t)
-            wave_x = base_x + wave_offset * px
-            wave_y = base_y + wave_offset * py
-            
-            points.append((wave_x, wave_y))
+        # The wave's second derivative peaks at amplitude * omega^2
+        omega = 2 * math.pi * wave_frequency
+        num_points = geometry.flat_segments(wave_amplitude * omega ** 2, self._get_flatness(),
+                                            minimum=4 * wave_frequency)
+        points = geometry.wave_along_line(start, end, wave_amplitude, wave_frequency, num_points)
         
         # Draw the wave
-        for i in range(len(points) - 1):
-            draw.line([points[i], points[i + 1]], fill=fill_color, width=border_width)
+        self._draw_polyline(canvas, points, fill_color, border_width)
         
         return canvas
 
@@ -586,6 +1118,8 @@ class WavyLine(BaseShape):
 class LineWithArrowhead(BaseShape):
     """Line with arrowhead shape."""
     
+    __slots__ = ()
+    
     def validate(self) -> None:
         """Validate line with arrowhead data."""
         self._get_point('start')
@@ -594,9 +1128,14 @@ class LineWithArrowhead(BaseShape):
         self._get_int('border_width', min_val=1)
         self._get_int('arrow_size', 10, min_val=1)
     
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """Get the extent of the line including arrowheads."""
+        return self._box([self._get_point('start'), self._get_point('end')],
+                         max(self._get_int('border_width', 1), self._arrowhead_reach()))
+    
     def draw(self, canvas: Image.Image) -> Image.Image:
         """Draw line with arrowhead on canvas."""
-        draw = ImageDraw.Draw(canvas)
+        draw = self._get_draw(canvas)
         start = self._get_point('start')
         end = self._get_point('end')
         fill_color = self._get_color('fill_color')
@@ -635,6 +1174,8 @@ class LineWithArrowhead(BaseShape):
 class RegularPolygon(BaseShape):
     """Regular polygon shape."""
     
+    __slots__ = ()
+    
     def validate(self) -> None:
         """Validate regular polygon data."""
         self._get_point('center')
@@ -645,9 +1186,13 @@ class RegularPolygon(BaseShape):
         self._get_int('border_width', min_val=0)
         self._get_int('rotation', 0)
     
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """Get the extent of the regular polygon."""
+        return self._radial_box(self._get_point('center'), self._get_int('radius'))
+    
     def draw(self, canvas: Image.Image) -> Image.Image:
         """Draw regular polygon on canvas."""
-        draw = ImageDraw.Draw(canvas)
+        draw = self._get_draw(canvas)
         center = self._get_point('center')
         radius = self._get_int('radius')
         n_sides = self._get_int('n_sides', 6)
@@ -656,15 +1201,7 @@ class RegularPolygon(BaseShape):
         outline_color = self._get_color('outline_color')
         border_width = self._get_int('border_width', 1)
         
-        x, y = center
-        points = []
-        rotation_radians = math.radians(rotation)
-        
-        for i in range(n_sides):
-            angle = 2 * math.pi * i / n_sides + rotation_radians
-            px = x + radius * math.cos(angle)
-            py = y + radius * math.sin(angle)
-            points.append((px, py))
+        points = geometry.translate(geometry.regular_polygon_outline(radius, n_sides, rotation), center)
         
         draw.polygon(points, fill=fill_color, outline=outline_color, width=border_width)
         return canvas
@@ -673,6 +1210,8 @@ class RegularPolygon(BaseShape):
 class SpeechBubbleRectangle(BaseShape):
     """Speech bubble rectangle shape."""
     
+    __slots__ = ()
+    
     def validate(self) -> None:
         """Validate speech bubble rectangle data."""
         self._get_point('start')
@@ -682,9 +1221,18 @@ class SpeechBubbleRectangle(BaseShape):
         self._get_int('border_width', min_val=0)
         self._get_int('tail_size', 10, min_val=1)
     
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """Get the extent of the speech bubble including its tail."""
+        start = self._get_point('start')
+        end = self._get_point('end')
+        tail_size = self._get_int('tail_size', 10)
+        center_x = (start[0] + end[0]) // 2
+        return self._box([start, end, (center_x - tail_size, end[1] + tail_size),
+                          (center_x + tail_size, end[1])], self._get_int('border_width', 1))
+    
     def draw(self, canvas: Image.Image) -> Image.Image:
         """Draw speech bubble rectangle on canvas."""
-        draw = ImageDraw.Draw(canvas)
+        draw = self._get_draw(canvas)
         start = self._get_point('start')
         end = self._get_point('end')
         fill_color = self._get_color('fill_color')
@@ -710,6 +1258,8 @@ class SpeechBubbleRectangle(BaseShape):
 class PolygonWithCoordinates(BaseShape):
     """Polygon with custom coordinates shape."""
     
+    __slots__ = ()
+    
     def validate(self) -> None:
         """Validate polygon with coordinates data."""
         coordinates = self.data.get('coordinates')
@@ -718,21 +1268,23 @@ class PolygonWithCoordinates(BaseShape):
         for point in coordinates:
             if not isinstance(point, (list, tuple)) or len(point) != 2:
                 raise ValidationError("Each coordinate must be a [x, y] pair")
+        self._parsing['coordinates'] = tuple(tuple(point) for point in coordinates)
         self._get_color('fill_color')
         self._get_color('outline_color')
         self._get_int('border_width', min_val=0)
     
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """Get the extent of the polygon."""
+        return self._box(self.params.coordinates)
+    
     def draw(self, canvas: Image.Image) -> Image.Image:
         """Draw polygon with coordinates on canvas."""
-        draw = ImageDraw.Draw(canvas)
-        coordinates = self.data.get('coordinates')
+        draw = self._get_draw(canvas)
+        points = self.params.coordinates
         fill_color = self._get_color('fill_color')
         outline_color = self._get_color('outline_color')
         border_width = self._get_int('border_width', 1)
         
-        # Convert coordinates to tuples
-        points = [tuple(point) for point in coordinates]
-        
         draw.polygon(points, fill=fill_color, outline=outline_color, width=border_width)
         return canvas
 
@@ -740,6 +1292,8 @@ class PolygonWithCoordinates(BaseShape):
 class LineWithDoubleArrowhead(BaseShape):
     """Line with double arrowhead shape."""
     
+    __slots__ = ()
+    
     def validate(self) -> None:
         """Validate line with double arrowhead data."""
         self._get_point('start')
@@ -748,9 +1302,14 @@ class LineWithDoubleArrowhead(BaseShape):
         self._get_int('border_width', min_val=1)
         self._get_int('arrow_size', 10, min_val=1)
     
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """Get the extent of the line including arrowheads."""
+        return self._box([self._get_point('start'), self._get_point('end')],
+                         max(self._get_int('border_width', 1), self._arrowhead_reach()))
+    
     def draw(self, canvas: Image.Image) -> Image.Image:
         """Draw line with double arrowhead on canvas."""
-        draw = ImageDraw.Draw(canvas)
+        draw = self._get_draw(canvas)
         start = self._get_point('start')
         end = self._get_point('end')
         fill_color = self._get_color('fill_color')
@@ -800,16 +1359,23 @@ class LineWithDoubleArrowhead(BaseShape):
 class ElbowConnector(BaseShape):
     """Elbow connector shape."""
     
+    __slots__ = ()
+    
     def validate(self) -> None:
         """Validate elbow connector data."""
         self._get_point('start')
         self._get_point('end')
         self._get_color('fill_color')
         self._get_int('border_width', min_val=1)
+        self._get_dash_pattern()
+    
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """Get the extent of the elbow connector."""
+        return self._box([self._get_point('start'), self._get_point('end')],
+                         self._get_int('border_width', 1))
     
     def draw(self, canvas: Image.Image) -> Image.Image:
         """Draw elbow connector on canvas."""
-        draw = ImageDraw.Draw(canvas)
         start = self._get_point('start')
         end = self._get_point('end')
         fill_color = self._get_color('fill_color')
@@ -819,9 +1385,8 @@ class ElbowConnector(BaseShape):
         # Middle point creates the 90-degree turn
         middle = (end[0], start[1])  # Horizontal first, then vertical
         
-        # Draw two line segments
-        draw.line([start, middle], fill=fill_color, width=border_width)
-        draw.line([middle, end], fill=fill_color, width=border_width)
+        # Draw both segments as one polyline
+        self._draw_polyline(canvas, [start, middle, end], fill_color, border_width)
         
         return canvas
 
@@ -829,6 +1394,8 @@ class ElbowConnector(BaseShape):
 class ElbowConnectorWithArrowhead(BaseShape):
     """Elbow connector with arrowhead shape."""
     
+    __slots__ = ()
+    
     def validate(self) -> None:
         """Validate elbow connector with arrowhead data."""
         self._get_point('start')
@@ -836,10 +1403,16 @@ class ElbowConnectorWithArrowhead(BaseShape):
         self._get_color('fill_color')
         self._get_int('border_width', min_val=1)
         self._get_int('arrow_size', 10, min_val=1)
+        self._get_dash_pattern()
+    
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """Get the extent of the elbow connector including arrowheads."""
+        return self._box([self._get_point('start'), self._get_point('end')],
+                         max(self._get_int('border_width', 1), self._arrowhead_reach()))
     
     def draw(self, canvas: Image.Image) -> Image.Image:
         """Draw elbow connector with arrowhead on canvas."""
-        draw = ImageDraw.Draw(canvas)
+        draw = self._get_draw(canvas)
         start = self._get_point('start')
         end = self._get_point('end')
         fill_color = self._get_color('fill_color')
@@ -849,9 +1422,8 @@ class ElbowConnectorWithArrowhead(BaseShape):
         # Create elbow: start -> middle -> end
         middle = (end[0], start[1])  # Horizontal first, then vertical
         
-        # Draw two line segments
-        draw.line([start, middle], fill=fill_color, width=border_width)
-        draw.line([middle, end], fill=fill_color, width=border_width)
+        # Draw both segments as one polyline
+        self._draw_polyline(canvas, [start, middle, end], fill_color, border_width)
         
         # Add arrowhead at the end
         # Calculate direction from middle to end
@@ -883,6 +1455,8 @@ class ElbowConnectorWithArrowhead(BaseShape):
 class ElbowConnectorWithDoubleArrowhead(BaseShape):
     """Elbow connector with double arrowhead shape."""
     
+    __slots__ = ()
+    
     def validate(self) -> None:
         """Validate elbow connector with double arrowhead data."""
         self._get_point('start')
@@ -890,10 +1464,16 @@ class ElbowConnectorWithDoubleArrowhead(BaseShape):
         self._get_color('fill_color')
         self._get_int('border_width', min_val=1)
         self._get_int('arrow_size', 10, min_val=1)
+        self._get_dash_pattern()
+    
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """Get the extent of the elbow connector including arrowheads."""
+        return self._box([self._get_point('start'), self._get_point('end')],
+                         max(self._get_int('border_width', 1), self._arrowhead_reach()))
     
     def draw(self, canvas: Image.Image) -> Image.Image:
         """Draw elbow connector with double arrowhead on canvas."""
-        draw = ImageDraw.Draw(canvas)
+        draw = self._get_draw(canvas)
         start = self._get_point('start')
         end = self._get_point('end')
         fill_color = self._get_color('fill_color')
@@ -903,9 +1483,8 @@ class ElbowConnectorWithDoubleArrowhead(BaseShape):
         # Create elbow: start -> middle -> end
         middle = (end[0], start[1])  # Horizontal first, then vertical
         
-        # Draw two line segments
-        draw.line([start, middle], fill=fill_color, width=border_width)
-        draw.line([middle, end], fill=fill_color, width=border_width)
+        # Draw both segments as one polyline
+        self._draw_polyline(canvas, [start, middle, end], fill_color, border_width)
         
         # Add arrowhead at the start (direction from start to middle)
         dx1 = middle[0] - start[0]
@@ -955,6 +1534,8 @@ class ElbowConnectorWithDoubleArrowhead(BaseShape):
 class Triangle(BaseShape):
     """Triangle shape."""
     
+    __slots__ = ()
+    
     def validate(self) -> None:
         """Validate triangle data."""
         self._get_point('point1')
@@ -964,9 +1545,14 @@ class Triangle(BaseShape):
         self._get_color('outline_color')
         self._get_int('border_width', min_val=0)
     
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """Get the extent of the triangle."""
+        return self._box([self._get_point('point1'), self._get_point('point2'),
+                          self._get_point('point3')])
+    
     def draw(self, canvas: Image.Image) -> Image.Image:
         """Draw triangle on canvas."""
-        draw = ImageDraw.Draw(canvas)
+        draw = self._get_draw(canvas)
         point1 = self._get_point('point1')
         point2 = self._get_point('point2')
         point3 = self._get_point('point3')
@@ -982,6 +1568,8 @@ class Triangle(BaseShape):
 class Pentagon(BaseShape):
     """Pentagon shape."""
     
+    __slots__ = ()
+    
     def validate(self) -> None:
         """Validate pentagon data."""
         self._get_point('center')
@@ -991,9 +1579,13 @@ class Pentagon(BaseShape):
         self._get_int('border_width', min_val=0)
         self._get_int('rotation', 0)
     
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """Get the extent of the pentagon."""
+        return self._radial_box(self._get_point('center'), self._get_int('radius'))
+    
     def draw(self, canvas: Image.Image) -> Image.Image:
         """Draw pentagon on canvas."""
-        draw = ImageDraw.Draw(canvas)
+        draw = self._get_draw(canvas)
         center = self._get_point('center')
         radius = self._get_int('radius')
         rotation = self._get_int('rotation', 0)
@@ -1001,15 +1593,7 @@ class Pentagon(BaseShape):
         outline_color = self._get_color('outline_color')
         border_width = self._get_int('border_width', 1)
         
-        x, y = center
-        points = []
-        rotation_radians = math.radians(rotation)
-        
-        for i in range(5):
-            angle = 2 * math.pi * i / 5 + rotation_radians
-            px = x + radius * math.cos(angle)
-            py = y + radius * math.sin(angle)
-            points.append((px, py))
+        points = geometry.translate(geometry.regular_polygon_outline(radius, 5, rotation), center)
         
         draw.polygon(points, fill=fill_color, outline=outline_color, width=border_width)
         return canvas
@@ -1018,6 +1602,8 @@ class Pentagon(BaseShape):
 class Hexagon(BaseShape):
     """Hexagon shape."""
     
+    __slots__ = ()
+    
     def validate(self) -> None:
         """Validate hexagon data."""
         self._get_point('center')
@@ -1027,9 +1613,13 @@ class Hexagon(BaseShape):
         self._get_int('border_width', min_val=0)
         self._get_int('rotation', 0)
     
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """Get the extent of the hexagon."""
+        return self._radial_box(self._get_point('center'), self._get_int('radius'))
+    
     def draw(self, canvas: Image.Image) -> Image.Image:
         """Draw hexagon on canvas."""
-        draw = ImageDraw.Draw(canvas)
+        draw = self._get_draw(canvas)
         center = self._get_point('center')
         radius = self._get_int('radius')
         rotation = self._get_int('rotation', 0)
@@ -1037,15 +1627,7 @@ class Hexagon(BaseShape):
         outline_color = self._get_color('outline_color')
         border_width = self._get_int('border_width', 1)
         
-        x, y = center
-        points = []
-        rotation_radians = math.radians(rotation)
-        
-        for i in range(6):
-            angle = 2 * math.pi * i / 6 + rotation_radians
-            px = x + radius * math.cos(angle)
-            py = y + radius * math.sin(angle)
-            points.append((px, py))
+        points = geometry.translate(geometry.regular_polygon_outline(radius, 6, rotation), center)
         
         draw.polygon(points, fill=fill_color, outline=outline_color, width=border_width)
         return canvas
@@ -1054,6 +1636,8 @@ class Hexagon(BaseShape):
 class Octagon(BaseShape):
     """Octagon shape."""
     
+    __slots__ = ()
+    
     def validate(self) -> None:
         """Validate octagon data."""
         self._get_point('center')
@@ -1063,9 +1647,13 @@ class Octagon(BaseShape):
         self._get_int('border_width', min_val=0)
         self._get_int('rotation', 0)
     
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """Get the extent of the octagon."""
+        return self._radial_box(self._get_point('center'), self._get_int('radius'))
+    
     def draw(self, canvas: Image.Image) -> Image.Image:
         """Draw octagon on canvas."""
-        draw = ImageDraw.Draw(canvas)
+        draw = self._get_draw(canvas)
         center = self._get_point('center')
         radius = self._get_int('radius')
         rotation = self._get_int('rotation', 0)
@@ -1073,15 +1661,7 @@ class Octagon(BaseShape):
         outline_color = self._get_color('outline_color')
         border_width = self._get_int('border_width', 1)
         
-        x, y = center
-        points = []
-        rotation_radians = math.radians(rotation)
-        
-        for i in range(8):
-            angle = 2 * math.pi * i / 8 + rotation_radians
-            px = x + radius * math.cos(angle)
-            py = y + radius * math.sin(angle)
-            points.append((px, py))
+        points = geometry.translate(geometry.regular_polygon_outline(radius, 8, rotation), center)
         
         draw.polygon(points, fill=fill_color, outline=outline_color, width=border_width)
         return canvas
@@ -1090,6 +1670,8 @@ class Octagon(BaseShape):
 class Rhombus(BaseShape):
     """Rhombus shape."""
     
+    __slots__ = ()
+    
     def validate(self) -> None:
         """Validate rhombus data."""
         self._get_point('center')
@@ -1100,9 +1682,18 @@ class Rhombus(BaseShape):
         self._get_int('border_width', min_val=0)
         self._get_int('rotation', 0)
     
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """Get the extent of the rhombus."""
+        x, y = self._get_point('center')
+        half_width = self._get_int('width') // 2
+        half_height = self._get_int('height') // 2
+        if self._get_int('rotation', 0) % 360:
+            return self._radial_box((x, y), max(half_width, half_height))
+        return self._box([(x - half_width, y - half_height), (x + half_width, y + half_height)])
+    
     def draw(self, canvas: Image.Image) -> Image.Image:
         """Draw rhombus on canvas."""
-        draw = ImageDraw.Draw(canvas)
+        draw = self._get_draw(canvas)
         center = self._get_point('center')
         width = self._get_int('width')
         height = self._get_int('height')
@@ -1113,7 +1704,7 @@ class Rhombus(BaseShape):
         
         x, y = center
         # Rhombus points: top, right, bottom, left
-        points = [
+        points: List[Tuple[float, float]] = [
             (x, y - height // 2),      # top
             (x + width // 2, y),       # right
             (x, y + height // 2),      # bottom
@@ -1125,7 +1716,7 @@ class Rhombus(BaseShape):
             rotation_radians = math.radians(rotation)
             cos_r = math.cos(rotation_radians)
             sin_r = math.sin(rotation_radians)
-            rotated_points = []
+            rotated_points: List[Tuple[float, float]] = []
             for px, py in points:
                 rx = (px - x) * cos_r - (py - y) * sin_r + x
                 ry = (px - x) * sin_r + (py - y) * cos_r + y
@@ -1139,6 +1730,8 @@ class Rhombus(BaseShape):
 class Parallelogram(BaseShape):
     """Parallelogram shape."""
     
+    __slots__ = ()
+    
     def validate(self) -> None:
         """Validate parallelogram data."""
         self._get_point('start')
@@ -1149,9 +1742,18 @@ class Parallelogram(BaseShape):
         self._get_color('outline_color')
         self._get_int('border_width', min_val=0)
     
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """Get the extent of the parallelogram."""
+        x, y = self._get_point('start')
+        width = self._get_int('width')
+        height = self._get_int('height')
+        skew = self._get_int('skew', 0)
+        return self._box([(x + skew, y), (x + width + skew, y), (x, y + height),
+                          (x + width, y + height)])
+    
     def draw(self, canvas: Image.Image) -> Image.Image:
         """Draw parallelogram on canvas."""
-        draw = ImageDraw.Draw(canvas)
+        draw = self._get_draw(canvas)
         start = self._get_point('start')
         width = self._get_int('width')
         height = self._get_int('height')
@@ -1176,6 +1778,8 @@ class Parallelogram(BaseShape):
 class Trapezoid(BaseShape):
     """Trapezoid shape."""
     
+    __slots__ = ()
+    
     def validate(self) -> None:
         """Validate trapezoid data."""
         self._get_point('start')
@@ -1186,9 +1790,18 @@ class Trapezoid(BaseShape):
         self._get_color('outline_color')
         self._get_int('border_width', min_val=0)
     
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """Get the extent of the trapezoid."""
+        x, y = self._get_point('start')
+        bottom_width = self._get_int('bottom_width')
+        top_width = self._get_int('top_width')
+        top_offset = (bottom_width - top_width) // 2
+        return self._box([(x + top_offset, y), (x + top_offset + top_width, y),
+                          (x, y + self._get_int('height')), (x + bottom_width, y)])
+    
     def draw(self, canvas: Image.Image) -> Image.Image:
         """Draw trapezoid on canvas."""
-        draw = ImageDraw.Draw(canvas)
+        draw = self._get_draw(canvas)
         start = self._get_point('start')
         bottom_width = self._get_int('bottom_width')
         top_width = self._get_int('top_width')
@@ -1218,6 +1831,8 @@ class Trapezoid(BaseShape):
 class BlockArrow(BaseShape):
     """Block arrow shape."""
     
+    __slots__ = ()
+    
     def validate(self) -> None:
         """Validate block arrow data."""
         self._get_point('start')
@@ -1228,9 +1843,14 @@ class BlockArrow(BaseShape):
         self._get_color('outline_color')
         self._get_int('border_width', min_val=0)
     
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """Get the extent of the block arrow."""
+        half_width = max(self._get_int('shaft_width'), self._get_int('head_width')) / 2
+        return self._box([self._get_point('start'), self._get_point('end')], half_width)
+    
     def draw(self, canvas: Image.Image) -> Image.Image:
         """Draw block arrow on canvas."""
-        draw = ImageDraw.Draw(canvas)
+        draw = self._get_draw(canvas)
         start = self._get_point('start')
         end = self._get_point('end')
         shaft_width = self._get_int('shaft_width')
@@ -1283,6 +1903,8 @@ class BlockArrow(BaseShape):
 class CurvedArrow(BaseShape):
     """Curved arrow shape."""
     
+    __slots__ = ()
+    
     def validate(self) -> None:
         """Validate curved arrow data."""
         self._get_point('start')
@@ -1291,10 +1913,22 @@ class CurvedArrow(BaseShape):
         self._get_int('arrow_size', 10, min_val=1)
         self._get_color('fill_color')
         self._get_int('border_width', min_val=1)
+        self._get_flatness()
+        self._get_dash_pattern()
+    
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """Get the extent of the curved arrow including its arrowhead."""
+        start = self._get_point('start')
+        end = self._get_point('end')
+        # The Bezier curve stays inside the hull of its control points
+        control = ((start[0] + end[0]) // 2,
+                   (start[1] + end[1]) // 2 - self._get_int('curve_height'))
+        return self._box([start, control, end],
+                         max(self._get_int('border_width', 1), self._arrowhead_reach()))
     
     def draw(self, canvas: Image.Image) -> Image.Image:
         """Draw curved arrow on canvas."""
-        draw = ImageDraw.Draw(canvas)
+        draw = self._get_draw(canvas)
         start = self._get_point('start')
         end = self._get_point('end')
         curve_height = self._get_int('curve_height')
@@ -1306,19 +1940,14 @@ class CurvedArrow(BaseShape):
         mid_x = (start[0] + end[0]) // 2
         mid_y = (start[1] + end[1]) // 2 - curve_height
         
-        # Generate curve points using quadratic Bezier
-        points = []
-        num_points = 50
-        for i in range(num_points + 1):
-            t = i / num_points
-            # Quadratic Bezier formula: B(t) = (1-t)²P0 + 2(1-t)tP1 + t²P2
-            x = (1-t)**2 * start[0] + 2*(1-t)*t * mid_x + t**2 * end[0]
-            y = (1-t)**2 * start[1] + 2*(1-t)*t * mid_y + t**2 * end[1]
-            points.append((x, y))
+        # Generate curve points using quadratic Bezier, whose second
+        # derivative is the constant 2 * (P0 - 2 * P1 + P2)
+        acceleration = 2 * math.hypot(start[0] - 2 * mid_x + end[0], start[1] - 2 * mid_y + end[1])
+        num_points = geometry.flat_segments(acceleration, self._get_flatness())
+        points = geometry.quadratic_bezier(start, (mid_x, mid_y), end, num_points)
         
         # Draw the curved line
-        for i in range(len(points) - 1):
-            draw.line([points[i], points[i + 1]], fill=fill_color, width=border_width)
+        self._draw_polyline(canvas, points, fill_color, border_width)
         
         # Add arrowhead at the end
         dx = points[-1][0] - points[-2][0]
@@ -1346,6 +1975,8 @@ class CurvedArrow(BaseShape):
 class CircularArrow(BaseShape):
     """Circular arrow shape."""
     
+    __slots__ = ()
+    
     def validate(self) -> None:
         """Validate circular arrow data."""
         self._get_point('center')
@@ -1356,9 +1987,14 @@ class CircularArrow(BaseShape):
         self._get_color('fill_color')
         self._get_int('border_width', min_val=1)
     
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """Get the extent of the circular arrow including its arrowhead."""
+        return self._radial_box(self._get_point('center'), self._get_int('radius'),
+                                max(self._get_int('border_width', 1), self._arrowhead_reach()))
+    
     def draw(self, canvas: Image.Image) -> Image.Image:
         """Draw circular arrow on canvas."""
-        draw = ImageDraw.Draw(canvas)
+        draw = self._get_draw(canvas)
         center = self._get_point('center')
         radius = self._get_int('radius')
         start_angle = self._get_int('start_angle', 0)
@@ -1403,6 +2039,8 @@ class CircularArrow(BaseShape):
 class CalloutBubble(BaseShape):
     """Callout bubble shape."""
     
+    __slots__ = ()
+    
     def validate(self) -> None:
         """Validate callout bubble data."""
         self._get_point('center')
@@ -1413,9 +2051,17 @@ class CalloutBubble(BaseShape):
         self._get_color('outline_color')
         self._get_int('border_width', min_val=0)
     
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """Get the extent of the callout bubble including its pointer."""
+        x, y = self._get_point('center')
+        width = self._get_int('width')
+        height = self._get_int('height')
+        return self._box([(x - width // 2, y - height // 2), (x + width // 2, y + height // 2),
+                          self._get_point('pointer_tip')])
+    
     def draw(self, canvas: Image.Image) -> Image.Image:
         """Draw callout bubble on canvas."""
-        draw = ImageDraw.Draw(canvas)
+        draw = self._get_draw(canvas)
         center = self._get_point('center')
         width = self._get_int('width')
         height = self._get_int('height')
@@ -1458,6 +2104,8 @@ class CalloutBubble(BaseShape):
 class ThoughtBubble(BaseShape):
     """Thought bubble shape."""
     
+    __slots__ = ()
+    
     def validate(self) -> None:
         """Validate thought bubble data."""
         self._get_point('center')
@@ -1468,9 +2116,28 @@ class ThoughtBubble(BaseShape):
         self._get_color('outline_color')
         self._get_int('border_width', min_val=0)
     
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """Get the extent of the thought bubble including its trail."""
+        x, y = self._get_point('center')
+        width = self._get_int('width')
+        height = self._get_int('height')
+        points: List[Tuple[float, float]] = [(x - width // 2, y - height // 2),
+                                             (x + width // 2, y + height // 2)]
+        
+        pointer_direction = self._get_point('pointer_direction')
+        dx = pointer_direction[0] - x
+        dy = pointer_direction[1] - y
+        distance = math.sqrt(dx*dx + dy*dy)
+        if distance > 0:
+            # Furthest trail circle, padded by the largest circle size
+            trail = (width // 2) + 60
+            points.append((x + dx / distance * trail - 8, y + dy / distance * trail - 8))
+            points.append((x + dx / distance * trail + 8, y + dy / distance * trail + 8))
+        return self._box(points)
+    
     def draw(self, canvas: Image.Image) -> Image.Image:
         """Draw thought bubble on canvas."""
-        draw = ImageDraw.Draw(canvas)
+        draw = self._get_draw(canvas)
         center = self._get_point('center')
         width = self._get_int('width')
         height = self._get_int('height')
@@ -1520,6 +2187,8 @@ class ThoughtBubble(BaseShape):
 class BannerRibbon(BaseShape):
     """Banner ribbon shape."""
     
+    __slots__ = ()
+    
     def validate(self) -> None:
         """Validate banner ribbon data."""
         self._get_point('start')
@@ -1530,9 +2199,17 @@ class BannerRibbon(BaseShape):
         self._get_color('outline_color')
         self._get_int('border_width', min_val=0)
     
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """Get the extent of the banner ribbon."""
+        x, y = self._get_point('start')
+        width = self._get_int('width')
+        # A tail longer than the width reaches back past the start
+        tail_start = x + width - self._get_int('tail_length')
+        return self._box([(min(x, tail_start), y), (x + width, y + self._get_int('height'))])
+    
     def draw(self, canvas: Image.Image) -> Image.Image:
         """Draw banner ribbon on canvas."""
-        draw = ImageDraw.Draw(canvas)
+        draw = self._get_draw(canvas)
         start = self._get_point('start')
         width = self._get_int('width')
         height = self._get_int('height')
@@ -1577,6 +2254,10 @@ class BannerRibbon(BaseShape):
 class Flower(BaseShape):
     """Flower shape."""
     
+    __slots__ = ()
+    
+    sprite_anchor = 'center'
+    
     def validate(self) -> None:
         """Validate flower data."""
         self._get_point('center')
@@ -1587,9 +2268,14 @@ class Flower(BaseShape):
         self._get_color('center_color', (255, 255, 0))  # Default yellow center
         self._get_int('border_width', min_val=0)
     
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """Get the extent of the flower."""
+        petal_size = self._get_int('petal_size')
+        return self._radial_box(self._get_point('center'), petal_size * 0.7 + petal_size // 2)
+    
     def draw(self, canvas: Image.Image) -> Image.Image:
         """Draw flower on canvas."""
-        draw = ImageDraw.Draw(canvas)
+        draw = self._get_draw(canvas)
         center = self._get_point('center')
         petal_size = self._get_int('petal_size')
         num_petals = self._get_int('num_petals', 6)
@@ -1601,11 +2287,8 @@ class Flower(BaseShape):
         x, y = center
         
         # Draw petals as ellipses
-        for i in range(num_petals):
-            angle = 2 * math.pi * i / num_petals
-            petal_center_x = x + (petal_size * 0.7) * math.cos(angle)
-            petal_center_y = y + (petal_size * 0.7) * math.sin(angle)
-            
+        for petal_center_x, petal_center_y in geometry.translate(
+                geometry.flower_outline(petal_size, num_petals), center):
             # Petal ellipse bbox
             petal_bbox = [
                 petal_center_x - petal_size//3,
@@ -1627,6 +2310,8 @@ class Flower(BaseShape):
 class Butterfly(BaseShape):
     """Butterfly shape."""
     
+    __slots__ = ()
+    
     def validate(self) -> None:
         """Validate butterfly data."""
         self._get_point('center')
@@ -1636,9 +2321,18 @@ class Butterfly(BaseShape):
         self._get_color('body_color', (0, 0, 0))  # Default black body
         self._get_int('border_width', min_val=0)
     
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """Get the extent of the butterfly including body and antennae."""
+        x, y = self._get_point('center')
+        wing_size = self._get_int('wing_size')
+        wing_span = wing_size + wing_size // 2
+        body_width = max(3, self._get_int('border_width', 1) + 1)
+        return self._box([(x - wing_span, y - wing_size - wing_size // 3),
+                          (x + wing_span, y + wing_size // 2 + 5)], body_width)
+    
     def draw(self, canvas: Image.Image) -> Image.Image:
         """Draw butterfly on canvas."""
-        draw = ImageDraw.Draw(canvas)
+        draw = self._get_draw(canvas)
         center = self._get_point('center')
         wing_size = self._get_int('wing_size')
         fill_color = self._get_color('fill_color')
@@ -1690,6 +2384,8 @@ class Butterfly(BaseShape):
 class Tree(BaseShape):
     """Tree shape."""
     
+    __slots__ = ()
+    
     def validate(self) -> None:
         """Validate tree data."""
         self._get_point('base')
@@ -1700,9 +2396,20 @@ class Tree(BaseShape):
         self._get_color('outline_color')
         self._get_int('border_width', min_val=0)
     
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """Get the extent of the tree."""
+        x, y = self._get_point('base')
+        crown_width = self._get_int('crown_width')
+        trunk_height = self._get_int('height') // 3
+        crown_center_y = y - trunk_height - crown_width // 3
+        half_width = max(crown_width // 2, crown_width // 6)
+        # A crown wider than twice the height hangs below the base
+        bottom = max(y, crown_center_y + crown_width // 2)
+        return self._box([(x - half_width, crown_center_y - crown_width // 2), (x + half_width, bottom)])
+    
     def draw(self, canvas: Image.Image) -> Image.Image:
         """Draw tree on canvas."""
-        draw = ImageDraw.Draw(canvas)
+        draw = self._get_draw(canvas)
         base = self._get_point('base')
         height = self._get_int('height')
         crown_width = self._get_int('crown_width')
@@ -1753,6 +2460,10 @@ class Tree(BaseShape):
 class Sun(BaseShape):
     """Sun shape."""
     
+    __slots__ = ()
+    
+    sprite_anchor = 'center'
+    
     def validate(self) -> None:
         """Validate sun data."""
         self._get_point('center')
@@ -1763,9 +2474,15 @@ class Sun(BaseShape):
         self._get_color('outline_color')
         self._get_int('border_width', min_val=0)
     
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """Get the extent of the sun including its rays."""
+        reach = self._get_int('radius') + self._get_int('ray_length')
+        return self._radial_box(self._get_point('center'), reach,
+                                max(2, self._get_int('border_width', 1)))
+    
     def draw(self, canvas: Image.Image) -> Image.Image:
         """Draw sun on canvas."""
-        draw = ImageDraw.Draw(canvas)
+        draw = self._get_draw(canvas)
         center = self._get_point('center')
         radius = self._get_int('radius')
         num_rays = self._get_int('num_rays', 8)
@@ -1801,6 +2518,8 @@ class Sun(BaseShape):
 class Moon(BaseShape):
     """Moon shape."""
     
+    __slots__ = ()
+    
     def validate(self) -> None:
         """Validate moon data."""
         self._get_point('center')
@@ -1810,9 +2529,17 @@ class Moon(BaseShape):
         self._get_color('outline_color')
         self._get_int('border_width', min_val=0)
     
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """Get the extent of the moon including its shadow."""
+        x, y = self._get_point('center')
+        radius = self._get_int('radius')
+        shadow_x = x + (abs(self._get_int('phase_offset', 0)) * radius // 100)
+        return self._box([(min(x, shadow_x) - radius, y - radius),
+                          (max(x, shadow_x) + radius, y + radius)])
+    
     def draw(self, canvas: Image.Image) -> Image.Image:
         """Draw moon on canvas."""
-        draw = ImageDraw.Draw(canvas)
+        draw = self._get_draw(canvas)
         center = self._get_point('center')
         radius = self._get_int('radius')
         phase_offset = self._get_int('phase_offset', 0)
@@ -1830,9 +2557,9 @@ class Moon(BaseShape):
             # Crescent moon - create by overlapping circles
             main_bbox = [x - radius, y - radius, x + radius, y + radius]
             
-            # Create a temporary image for masking
-            temp_img = Image.new('RGBA', canvas.size, (0, 0, 0, 0))
-            temp_draw = ImageDraw.Draw(temp_img)
+            # Create a temporary image for masking, covering only the moon
+            layer = Layer(canvas, self.bounds())
+            temp_draw = layer.get_draw()
             
             # Draw full moon
             temp_draw.ellipse(main_bbox, fill=fill_color + (255,), outline=outline_color + (255,), width=border_width)
@@ -1846,7 +2573,7 @@ class Moon(BaseShape):
             temp_draw.ellipse(shadow_bbox, fill=(0, 0, 0, 200))
             
             # Paste the temp image onto the main canvas
-            canvas.paste(temp_img, (0, 0), temp_img)
+            layer.composite(canvas)
         
         return canvas
 
@@ -1854,6 +2581,8 @@ class Moon(BaseShape):
 class LightningBolt(BaseShape):
     """Lightning bolt shape."""
     
+    __slots__ = ()
+    
     def validate(self) -> None:
         """Validate lightning bolt data."""
         self._get_point('start')
@@ -1863,9 +2592,15 @@ class LightningBolt(BaseShape):
         self._get_color('outline_color')
         self._get_int('border_width', min_val=0)
     
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """Get the extent of the lightning bolt."""
+        x, y = self._get_point('start')
+        width = self._get_int('width')
+        return self._box([(x - width // 3, y), (x + width // 2, y + self._get_int('height'))])
+    
     def draw(self, canvas: Image.Image) -> Image.Image:
         """Draw lightning bolt on canvas."""
-        draw = ImageDraw.Draw(canvas)
+        draw = self._get_draw(canvas)
         start = self._get_point('start')
         height = self._get_int('height')
         width = self._get_int('width')
@@ -1900,6 +2635,8 @@ class LightningBolt(BaseShape):
 class OvalCallout(BaseShape):
     """Oval callout shape."""
     
+    __slots__ = ()
+    
     def validate(self) -> None:
         """Validate oval callout data."""
         self._get_point('center')
@@ -1910,9 +2647,20 @@ class OvalCallout(BaseShape):
         self._get_color('outline_color')
         self._get_int('border_width', min_val=0)
     
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """Get the extent of the oval callout including its pointer."""
+        x, y = self._get_point('center')
+        width = self._get_int('width')
+        height = self._get_int('height')
+        callout_point = self._get_point('callout_point')
+        return self._box([(x - width // 2, y - height // 2), (x + width // 2, y + height // 2),
+                          (callout_point[0] - 3, callout_point[1] - 3),
+                          (callout_point[0] + 3, callout_point[1] + 3)],
+                         self._get_int('border_width', 1))
+    
     def draw(self, canvas: Image.Image) -> Image.Image:
         """Draw oval callout on canvas."""
-        draw = ImageDraw.Draw(canvas)
+        draw = self._get_draw(canvas)
         center = self._get_point('center')
         width = self._get_int('width')
         height = self._get_int('height')
@@ -1942,6 +2690,8 @@ class OvalCallout(BaseShape):
 class Cross(BaseShape):
     """Cross shape."""
     
+    __slots__ = ()
+    
     def validate(self) -> None:
         """Validate cross data."""
         self._get_point('center')
@@ -1951,9 +2701,14 @@ class Cross(BaseShape):
         self._get_color('outline_color')
         self._get_int('border_width', min_val=0)
     
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """Get the extent of the cross."""
+        reach = max(self._get_int('size'), self._get_int('thickness') // 2)
+        return self._radial_box(self._get_point('center'), reach)
+    
     def draw(self, canvas: Image.Image) -> Image.Image:
         """Draw cross on canvas."""
-        draw = ImageDraw.Draw(canvas)
+        draw = self._get_draw(canvas)
         center = self._get_point('center')
         size = self._get_int('size')
         thickness = self._get_int('thickness')
@@ -1987,6 +2742,8 @@ class Cross(BaseShape):
 class PlusSign(BaseShape):
     """Plus sign shape."""
     
+    __slots__ = ()
+    
     def validate(self) -> None:
         """Validate plus sign data."""
         self._get_point('center')
@@ -1995,9 +2752,14 @@ class PlusSign(BaseShape):
         self._get_color('fill_color')
         self._get_int('border_width', min_val=1)
     
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """Get the extent of the plus sign."""
+        return self._radial_box(self._get_point('center'), self._get_int('size'),
+                                self._get_int('thickness'))
+    
     def draw(self, canvas: Image.Image) -> Image.Image:
         """Draw plus sign on canvas."""
-        draw = ImageDraw.Draw(canvas)
+        draw = self._get_draw(canvas)
         center = self._get_point('center')
         size = self._get_int('size')
         thickness = self._get_int('thickness')
@@ -2018,6 +2780,8 @@ class PlusSign(BaseShape):
 class MinusSign(BaseShape):
     """Minus sign shape."""
     
+    __slots__ = ()
+    
     def validate(self) -> None:
         """Validate minus sign data."""
         self._get_point('center')
@@ -2026,9 +2790,14 @@ class MinusSign(BaseShape):
         self._get_color('fill_color')
         self._get_int('border_width', min_val=1)
     
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """Get the extent of the minus sign."""
+        return self._radial_box(self._get_point('center'), self._get_int('size'),
+                                self._get_int('thickness'))
+    
     def draw(self, canvas: Image.Image) -> Image.Image:
         """Draw minus sign on canvas."""
-        draw = ImageDraw.Draw(canvas)
+        draw = self._get_draw(canvas)
         center = self._get_point('center')
         size = self._get_int('size')
         thickness = self._get_int('thickness')
@@ -2046,6 +2815,8 @@ class MinusSign(BaseShape):
 class MultiplicationSign(BaseShape):
     """Multiplication sign shape."""
     
+    __slots__ = ()
+    
     def validate(self) -> None:
         """Validate multiplication sign data."""
         self._get_point('center')
@@ -2054,9 +2825,14 @@ class MultiplicationSign(BaseShape):
         self._get_color('fill_color')
         self._get_int('border_width', min_val=1)
     
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """Get the extent of the multiplication sign."""
+        return self._radial_box(self._get_point('center'), self._get_int('size'),
+                                self._get_int('thickness'))
+    
     def draw(self, canvas: Image.Image) -> Image.Image:
         """Draw multiplication sign on canvas."""
-        draw = ImageDraw.Draw(canvas)
+        draw = self._get_draw(canvas)
         center = self._get_point('center')
         size = self._get_int('size')
         thickness = self._get_int('thickness')
@@ -2079,6 +2855,8 @@ class MultiplicationSign(BaseShape):
 class Spiral(BaseShape):
     """Spiral shape."""
     
+    __slots__ = ()
+    
     def validate(self) -> None:
         """Validate spiral data."""
         self._get_point('center')
@@ -2086,33 +2864,31 @@ class Spiral(BaseShape):
         self._get_int('turns', 3, min_val=1)
         self._get_color('fill_color')
         self._get_int('border_width', min_val=1)
+        self._get_flatness()
+        self._get_dash_pattern()
+    
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """Get the extent of the spiral."""
+        return self._radial_box(self._get_point('center'), self._get_int('max_radius'),
+                                self._get_int('border_width', 1))
     
     def draw(self, canvas: Image.Image) -> Image.Image:
         """Draw spiral on canvas."""
-        draw = ImageDraw.Draw(canvas)
         center = self._get_point('center')
         max_radius = self._get_int('max_radius')
         turns = self._get_int('turns', 3)
         fill_color = self._get_color('fill_color')
         border_width = self._get_int('border_width', 1)
         
-        x, y = center
-        
-        # Generate spiral points
-        points = []
-        num_points = turns * 50  # More points for smoother spiral
-        
-        for i in range(num_points):
-            angle = 2 * math.pi * turns * i / num_points
-            radius = max_radius * i / num_points
-            
-            px = x + radius * math.cos(angle)
-            py = y + radius * math.sin(angle)
-            points.append((px, py))
+        # Generate spiral points; the second derivative of
+        # r(s) * (cos, sin)(omega * s) is bounded by r * (2 * omega + omega^2)
+        omega = 2 * math.pi * turns
+        num_points = geometry.flat_segments(max_radius * (2 * omega + omega ** 2),
+                                            self._get_flatness(), minimum=8 * turns)
+        points = geometry.spiral(center, max_radius, turns, num_points)
         
-        # Draw spiral as connected line segments
-        for i in range(len(points) - 1):
-            draw.line([points[i], points[i + 1]], fill=fill_color, width=border_width)
+        # Draw spiral as one polyline
+        self._draw_polyline(canvas, points, fill_color, border_width)
         
         return canvas
 
@@ -2120,6 +2896,8 @@ class Spiral(BaseShape):
 class Helix(BaseShape):
     """Helix shape."""
     
+    __slots__ = ()
+    
     def validate(self) -> None:
         """Validate helix data."""
         self._get_point('center')
@@ -2128,10 +2906,19 @@ class Helix(BaseShape):
         self._get_int('turns', 3, min_val=1)
         self._get_color('fill_color')
         self._get_int('border_width', min_val=1)
+        self._get_flatness()
+        self._get_dash_pattern()
+    
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """Get the extent of the helix."""
+        x, y = self._get_point('center')
+        radius = self._get_int('radius')
+        height = self._get_int('height')
+        return self._box([(x - radius, y - height // 2), (x + radius, y - height // 2 + height)],
+                         self._get_int('border_width', 1))
     
     def draw(self, canvas: Image.Image) -> Image.Image:
         """Draw helix on canvas."""
-        draw = ImageDraw.Draw(canvas)
         center = self._get_point('center')
         radius = self._get_int('radius')
         height = self._get_int('height')
@@ -2139,24 +2926,15 @@ class Helix(BaseShape):
         fill_color = self._get_color('fill_color')
         border_width = self._get_int('border_width', 1)
         
-        x, y = center
-        
-        # Generate helix points
-        points = []
-        num_points = turns * 30  # Points per turn
-        
-        for i in range(num_points):
-            angle = 2 * math.pi * turns * i / num_points
-            z_progress = i / num_points  # Progress along height
-            
-            # 3D to 2D projection (simple orthographic)
-            px = x + radius * math.cos(angle)
-            py = y - height//2 + height * z_progress
-            points.append((px, py))
+        # Generate helix points (simple orthographic projection); the second
+        # derivative peaks at radius * omega^2
+        omega = 2 * math.pi * turns
+        num_points = geometry.flat_segments(radius * omega ** 2, self._get_flatness(),
+                                            minimum=4 * turns)
+        points = geometry.helix(center, radius, height, turns, num_points)
         
-        # Draw helix as connected line segments
-        for i in range(len(points) - 1):
-            draw.line([points[i], points[i + 1]], fill=fill_color, width=border_width)
+        # Draw helix as one polyline
+        self._draw_polyline(canvas, points, fill_color, border_width)
         
         return canvas
 
@@ -2164,6 +2942,8 @@ class Helix(BaseShape):
 class SineWavePattern(BaseShape):
     """Sine wave pattern shape."""
     
+    __slots__ = ()
+    
     def validate(self) -> None:
         """Validate sine wave pattern data."""
         self._get_point('start')
@@ -2172,10 +2952,18 @@ class SineWavePattern(BaseShape):
         self._get_int('frequency', 1, min_val=1)
         self._get_color('fill_color')
         self._get_int('border_width', min_val=1)
+        self._get_flatness()
+        self._get_dash_pattern()
+    
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """Get the extent of the sine wave pattern."""
+        x, y = self._get_point('start')
+        amplitude = self._get_int('amplitude')
+        return self._box([(x, y - amplitude), (x + self._get_int('width'), y + amplitude)],
+                         self._get_int('border_width', 1))
     
     def draw(self, canvas: Image.Image) -> Image.Image:
         """Draw sine wave pattern on canvas."""
-        draw = ImageDraw.Draw(canvas)
         start = self._get_point('start')
         width = self._get_int('width')
         amplitude = self._get_int('amplitude')
@@ -2183,21 +2971,15 @@ class SineWavePattern(BaseShape):
         fill_color = self._get_color('fill_color')
         border_width = self._get_int('border_width', 1)
         
-        x, y = start
-        
-        # Generate sine wave points
-        points = []
-        num_points = width  # One point per pixel width
+        # Generate sine wave points; the second derivative peaks at
+        # amplitude * omega^2
+        omega = 2 * math.pi * frequency
+        num_points = geometry.flat_segments(amplitude * omega ** 2, self._get_flatness(),
+                                            minimum=4 * frequency)
+        points = geometry.sine_wave(start, width, amplitude, frequency, num_points)
         
-        for i in range(num_points + 1):
-            progress = i / num_points
-            wave_x = x + width * progress
-            wave_y = y + amplitude * math.sin(2 * math.pi * frequency * progress)
-            points.append((wave_x, wave_y))
-        
-        # Draw sine wave as connected line segments
-        for i in range(len(points) - 1):
-            draw.line([points[i], points[i + 1]], fill=fill_color, width=border_width)
+        # Draw sine wave as one polyline
+        self._draw_polyline(canvas, points, fill_color, border_width)
         
         return canvas
 
@@ -2205,18 +2987,35 @@ class SineWavePattern(BaseShape):
 class FractalTree(BaseShape):
     """Fractal tree shape."""
     
+    __slots__ = ()
+    
     def validate(self) -> None:
         """Validate fractal tree data."""
         self._get_point('base')
         self._get_int('height', min_val=1)
-        self._get_int('levels', 4, min_val=1)
+        levels = self._get_int('levels', 4, min_val=1)
         self._get_int('angle', 45, min_val=1)
         self._get_color('fill_color')
         self._get_int('border_width', min_val=1)
+        
+        # A tree with n levels has 2^n - 1 branches
+        max_branches = self._get_int('max_branches', FRACTAL_BRANCH_BUDGET, min_val=1)
+        if levels > (max_branches + 1).bit_length() - 1:
+            raise ValidationError(
+                f"Fractal tree with {levels} levels needs 2^{levels} - 1 branches, more than "
+                f"the budget of {max_branches}; lower 'levels' or raise 'max_branches'"
+            )
+    
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """Get the extent of the fractal tree."""
+        # Branch lengths shrink by 0.7 per level, bounding the total reach
+        levels = self._get_int('levels', 4)
+        reach = self._get_int('height') * (1 - 0.7 ** levels) / 0.3
+        return self._radial_box(self._get_point('base'), reach, self._get_int('border_width', 1))
     
     def draw(self, canvas: Image.Image) -> Image.Image:
         """Draw fractal tree on canvas."""
-        draw = ImageDraw.Draw(canvas)
+        draw = self._get_draw(canvas)
         base = self._get_point('base')
         height = self._get_int('height')
         levels = self._get_int('levels', 4)
@@ -2224,27 +3023,21 @@ class FractalTree(BaseShape):
         fill_color = self._get_color('fill_color')
         border_width = self._get_int('border_width', 1)
         
-        def draw_branch(start_point, direction_angle, length, level):
-            """Recursively draw fractal tree branches."""
-            if level <= 0:
-                return
-            
-            # Calculate end point
-            end_x = start_point[0] + length * math.cos(math.radians(direction_angle))
-            end_y = start_point[1] - length * math.sin(math.radians(direction_angle))
-            end_point = (end_x, end_y)
-            
-            # Draw branch
-            draw.line([start_point, end_point], fill=fill_color, width=max(1, border_width - level + 1))
-            
-            # Recursively draw sub-branches
-            if level > 1:
-                new_length = length * 0.7  # Reduce length for sub-branches
-                draw_branch(end_point, direction_angle + angle, new_length, level - 1)
-                draw_branch(end_point, direction_angle - angle, new_length, level - 1)
-        
-        # Start drawing from base, going upward (90 degrees)
-        draw_branch(base, 90, height, levels)
+        def branch_width(depth: int) -> int:
+            """Get the line width of branches at a depth (0 is the trunk)."""
+            return max(1, border_width - (levels - depth) + 1)
+        
+        # Build all branches level by level, then draw each run of levels
+        # sharing a line width as polylines
+        ends = geometry.fractal_tree(base, height, levels, angle)
+        first = 0
+        for depth in range(levels):
+            width = branch_width(depth)
+            if depth + 1 < levels and branch_width(depth + 1) == width:
+                continue
+            for path in geometry.tree_paths(base, ends, first, depth):
+                draw.line(path, fill=fill_color, width=width)
+            first = depth + 1
         
         return canvas
 
@@ -2252,7 +3045,7 @@ class FractalTree(BaseShape):
 class ShapeFactory:
     """Factory class for creating shape instances."""
     
-    _shape_registry: Dict[ShapeType, type] = {
+    _shape_registry: Dict[ShapeType, Type['BaseShape']] = {
         # Existing shapes
         ShapeType.STRAIGHT_LINE: StraightLine,
         ShapeType.DASHED_LINE: DashedLine,
@@ -2326,16 +3119,14 @@ class ShapeFactory:
         
         shape_type_str = shape_data['type']
         
-        try:
-            shape_type = ShapeType(shape_type_str)
-        except ValueError:
+        shape_type = _SHAPE_TYPES.get(shape_type_str) if isinstance(shape_type_str, str) else None
+        if shape_type is None:
             raise InvalidShapeError(f"Unknown shape type: {shape_type_str}")
         
-        if shape_type not in cls._shape_registry:
+        shape_class = cls._shape_registry.get(shape_type)
+        if shape_class is None:
             raise InvalidShapeError(f"Shape type {shape_type_str} is not implemented yet")
         
-        shape_class = cls._shape_registry[shape_type]
-        
         try:
             return shape_class(shape_data)
         except Exception as e:
@@ -0,0 +1,167 @@
+"""Spatial index over shape bounds for ShapeCanvas."""
+
+import math
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+
+Bounds = Tuple[float, float, float, float]
+
+# Default edge length of a grid cell in pixels
+DEFAULT_CELL_SIZE = 128
+
+# Shapes covering more cells than this are kept in a separate list
+MAX_CELLS_PER_ITEM = 64
+
+
+def intersects(bounds: Optional[Bounds], box: Tuple[float, float, float, float]) -> bool:
+    """Check whether shape bounds touch a pixel box with exclusive right/bottom edges."""
+    if bounds is None:
+        return False
+    left, top, right, bottom = bounds
+    return left < box[2] and right >= box[0] and top < box[3] and bottom >= box[1]
+
+
+class SpatialIndex:
+    """
+    Uniform grid index over item bounds.
+
+    Items are integer ids, typically positions in a shape list. Queries
+    return ids in ascending order so results keep drawing order, and their
+    cost depends on the cells and items touched rather than the total
+    number of items.
+    """
+
+    def __init__(self, cell_size: int = DEFAULT_CELL_SIZE):
+        """
+        Initialize an empty index.
+
+        Args:
+            cell_size: Edge length of a grid cell in pixels
+        """
+        self.cell_size = cell_size
+        self._cells: Dict[Tuple[int, int], List[int]] = {}
+        self._bounds: Dict[int, Optional[Bounds]] = {}
+        self._large: List[int] = []
+        self._unbounded: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self._bounds)
+
+    def _cell_range(self, box: Bounds) -> Tuple[int, int, int, int]:
+        """Get the inclusive range of cells covered by a box."""
+        size = self.cell_size
+        return (math.floor(box[0] / size), math.floor(box[1] / size),
+                math.floor(box[2] / size), math.floor(box[3] / size))
+
+    def insert(self, item: int, bounds: Optional[Bounds]) -> None:
+        """
+        Add an item to the index.
+
+        Args:
+            item: Item id
+            bounds: Item bounds, or None if unknown (matches every query)
+        """
+        self._bounds[item] = bounds
+        if bounds is None:
+            self._unbounded.append(item)
+            return
+
+        x0, y0, x1, y1 = self._cell_range(bounds)
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > MAX_CELLS_PER_ITEM:
+            self._large.append(item)
+            return
+
+        for cy in range(y0, y1 + 1):
+            for cx in range(x0, x1 + 1):
+                self._cells.setdefault((cx, cy), []).append(item)
+
+    def clear(self) -> None:
+        """Remove all items."""
+        self._cells.clear()
+        self._bounds.clear()
+        self._large.clear()
+        self._unbounded.clear()
+
+    def query(self, box: Tuple[float, float, float, float]) -> List[int]:
+        """
+        Find items whose bounds intersect a box.
+
+        Args:
+            box: (left, top, right, bottom) box, right and bottom exclusive
+
+        Returns:
+            Matching item ids in ascending order
+        """
+        found: Set[int] = set(self._unbounded)
+        x0, y0, x1, y1 = self._cell_range((box[0], box[1], box[2] - 1, box[3] - 1))
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > len(self._cells):
+            # Box spans more cells than are occupied: walk the occupied ones
+            cells = [items for (cx, cy), items in self._cells.items()
+                     if x0 <= cx <= x1 and y0 <= cy <= y1]
+        else:
+            cells = [self._cells.get((cx, cy), []) for cy in range(y0, y1 + 1)
+                     for cx in range(x0, x1 + 1)]
+
+        for items in cells:
+            for item in items:
+                if item not in found and intersects(self._bounds[item], box):
+                    found.add(item)
+        found.update(item for item in self._large if intersects(self._bounds[item], box))
+        return sorted(found)
+
+    def query_point(self, x: float, y: float) -> List[int]:
+        """
+        Find items whose bounds contain a point.
+
+        Args:
+            x: Point x coordinate
+            y: Point y coordinate
+
+        Returns:
+            Matching item ids in ascending order
+        """
+        def contains(bounds: Optional[Bounds]) -> bool:
+            return bounds is None or (bounds[0] <= x <= bounds[2] and bounds[1] <= y <= bounds[3])
+
+        size = self.cell_size
+        candidates = self._cells.get((math.floor(x / size), math.floor(y / size)), [])
+        found = {item for item in candidates if contains(self._bounds[item])}
+        found.update(item for item in self._large if contains(self._bounds[item]))
+        found.update(self._unbounded)
+        return sorted(found)
+
+
+def find_occluded(bounds: Sequence[Optional[Bounds]],
+                  interiors: Sequence[Optional[Tuple[int, int, int, int]]]) -> List[int]:
+    """
+    Find items hidden under the opaque interior of an item drawn after them.
+
+    Args:
+        bounds: Item bounds in drawing order; None for items that are never hidden
+        interiors: Opaque interior boxes in drawing order; None for items that
+            hide nothing
+
+    Returns:
+        Positions of the hidden items in ascending order
+    """
+    occluders = SpatialIndex()
+    occluded = []
+    for i in range(len(bounds) - 1, -1, -1):
+        box = bounds[i]
+        if box is not None:
+            # An interior containing the box contains its center
+            center = ((box[0] + box[2]) / 2, (box[1] + box[3]) / 2)
+            covering = (interiors[j] for j in occluders.query_point(*center))
+            if any(interior is not None and _contains(interior, box) for interior in covering):
+                occluded.append(i)
+                # Whatever it would hide is hidden by its occluder as well
+                continue
+        if interiors[i] is not None:
+            occluders.insert(i, interiors[i])
+    occluded.reverse()
+    return occluded
+
+
+def _contains(outer: Bounds, inner: Bounds) -> bool:
+    """Check whether a box lies completely inside another."""
+    return outer[0] <= inner[0] and outer[1] <= inner[1] and inner[2] <= outer[2] and inner[3] <= outer[3]
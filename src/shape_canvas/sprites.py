@@ -0,0 +1,102 @@
+"""Raster sprite cache for shapes repeated at many positions.
+
+A shape drawn many times with the same parameters, only moved to other
+whole-pixel positions, covers the same pixels relative to its anchor point
+each time. Its first drawing is kept as a color tile and an ``L`` mask, and
+later copies are stamped with a single masked paste instead of computing
+and rasterizing the geometry again.
+"""
+
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from PIL import Image
+
+
+# Bytes of tile and mask pixels the cache may hold
+SPRITE_CACHE_BYTES = 64 * 1024 * 1024
+
+# Largest sprite kept, in pixels; bigger shapes are drawn directly
+SPRITE_MAX_PIXELS = 256 * 256
+
+# Color tile, mask and offset of the tile's top-left pixel from the anchor
+Sprite = Tuple[Image.Image, Image.Image, Tuple[int, int]]
+
+
+class SpriteCache:
+    """
+    Least-recently-used cache of shape sprites bounded by pixel memory.
+
+    Keys are (shape class, non-positional parameters) tuples.
+    """
+
+    def __init__(self, max_bytes: int = SPRITE_CACHE_BYTES):
+        """
+        Initialize empty cache.
+
+        Args:
+            max_bytes: Maximum bytes of tile and mask pixels kept
+        """
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._sprites: "OrderedDict[Hashable, Sprite]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._sprites)
+
+    def get(self, key: Hashable, build: Callable[[], Sprite]) -> Sprite:
+        """
+        Get a sprite, building and storing it on a miss.
+
+        Args:
+            key: Shape class and non-positional parameters
+            build: Function drawing the sprite
+
+        Returns:
+            Cached sprite
+        """
+        sprite = self._sprites.get(key)
+        if sprite is not None:
+            self._sprites.move_to_end(key)
+            self.hits += 1
+            return sprite
+
+        self.misses += 1
+        sprite = build()
+        self._sprites[key] = sprite
+        self.bytes += _sprite_bytes(sprite)
+        while self.bytes > self.max_bytes and len(self._sprites) > 1:
+            _, evicted = self._sprites.popitem(last=False)
+            self.bytes -= _sprite_bytes(evicted)
+            self.evictions += 1
+        return sprite
+
+    def clear(self) -> None:
+        """Remove all sprites and reset the statistics."""
+        self._sprites.clear()
+        self.bytes = self.hits = self.misses = self.evictions = 0
+
+    def info(self) -> Dict[str, Any]:
+        """Get hit, miss and eviction counts, hit rate and the current size."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": len(self._sprites),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+
+def _sprite_bytes(sprite: Sprite) -> int:
+    """Get the pixel memory of a sprite's tile and mask."""
+    tile, mask, _ = sprite
+    return tile.width * tile.height * (len(tile.getbands()) + 1)
+
+
+sprite_cache = SpriteCache()
@@ -0,0 +1,194 @@
+"""Incremental reading of shape lists too large to load at once.
+
+Shapes are read one at a time from either a JSON configuration, whose
+``shapes`` array is parsed element by element, or an NDJSON file holding one
+shape object per line. Only the shape being read and one buffer of text are
+held in memory, whatever the number of shapes.
+"""
+
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterator, TextIO, Union
+
+from .exceptions import ConfigurationError
+
+
+# Characters read from the file at a time
+CHUNK_SIZE = 1 << 16
+
+# File suffixes read as one JSON value per line
+NDJSON_SUFFIXES = (".ndjson", ".jsonl")
+
+_WHITESPACE = " \t\r\n"
+
+
+class _JSONReader:
+    """Reader decoding JSON values one by one from a text file."""
+
+    def __init__(self, file: TextIO, chunk_size: int = CHUNK_SIZE):
+        """
+        Initialize reader.
+
+        Args:
+            file: Text file positioned at the start of the document
+            chunk_size: Characters to read at a time
+        """
+        self._file = file
+        self._chunk_size = chunk_size
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+        self._decoder = json.JSONDecoder()
+
+    def _fill(self, size: int) -> bool:
+        """Append more text to the buffer, dropping what has been consumed."""
+        if self._eof:
+            return False
+        text = self._file.read(max(size, self._chunk_size))
+        if not text:
+            self._eof = True
+            return False
+        self._buffer = self._buffer[self._pos:] + text
+        self._pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Get the next character that is not whitespace, or "" at the end."""
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buffer) or not self._fill(self._chunk_size):
+                return self._buffer[self._pos:self._pos + 1]
+
+    def expect(self, char: str) -> None:
+        """Consume the next character, which must be ``char``."""
+        found = self.peek()
+        if found != char:
+            raise ConfigurationError(f"Invalid JSON in shape file: expected {char!r}, "
+                                     f"found {found or 'end of file'!r}")
+        self._pos += 1
+
+    def value(self) -> Any:
+        """Decode the next JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError as e:
+                # Read on until the value is complete; reading as much again
+                # as is buffered keeps large values linear to decode
+                if self._fill(len(self._buffer)):
+                    continue
+                raise ConfigurationError(f"Invalid JSON in shape file: {e}")
+            # A number may continue in the next chunk
+            if end == len(self._buffer) and self._fill(len(self._buffer)):
+                continue
+            self._pos = end
+            return value
+
+    def items(self) -> Iterator[Any]:
+        """Decode the elements of a JSON array one by one."""
+        self.expect("[")
+        if self.peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.peek() == "]":
+                self._pos += 1
+                return
+            self.expect(",")
+
+    def members(self) -> Iterator[str]:
+        """
+        Iterate over the keys of a JSON object.
+
+        The caller reads each member's value with ``value()`` or ``items()``
+        before asking for the next key.
+        """
+        self.expect("{")
+        if self.peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            key = self.value()
+            if not isinstance(key, str):
+                raise ConfigurationError("Invalid JSON in shape file: object keys must be strings")
+            self.expect(":")
+            yield key
+            if self.peek() == "}":
+                self._pos += 1
+                return
+            self.expect(",")
+
+
+def _is_ndjson(path: Path) -> bool:
+    """Check whether a file holds one JSON value per line."""
+    return path.suffix.lower() in NDJSON_SUFFIXES
+
+
+def iter_shapes(path: Union[str, Path], chunk_size: int = CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """
+    Read shapes from a file one at a time.
+
+    Args:
+        path: NDJSON file (``.ndjson`` or ``.jsonl``) with one shape per
+            line, or JSON file holding a configuration with a ``shapes``
+            array or a bare array of shapes
+        chunk_size: Characters to read at a time
+
+    Yields:
+        Shape data dictionaries in file order
+    """
+    path = Path(path)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            if _is_ndjson(path):
+                for number, line in enumerate(f, 1):
+                    if line.strip():
+                        try:
+                            yield json.loads(line)
+                        except json.JSONDecodeError as e:
+                            raise ConfigurationError(f"Invalid JSON on line {number} of {path}: {e}")
+                return
+
+            reader = _JSONReader(f, chunk_size)
+            if reader.peek() == "[":
+                yield from reader.items()
+                return
+            for key in reader.members():
+                if key == "shapes":
+                    yield from reader.items()
+                else:
+                    reader.value()
+    except FileNotFoundError:
+        raise ConfigurationError(f"Shape file not found: {path}")
+
+
+def load_settings(path: Union[str, Path], chunk_size: int = CHUNK_SIZE) -> Dict[str, Any]:
+    """
+    Load a JSON configuration without its shapes.
+
+    The ``shapes`` array is parsed and discarded element by element, so the
+    file can be far larger than memory.
+
+    Args:
+        path: JSON configuration file
+        chunk_size: Characters to read at a time
+
+    Returns:
+        Configuration dictionary without the ``shapes`` key
+    """
+    settings: Dict[str, Any] = {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            reader = _JSONReader(f, chunk_size)
+            for key in reader.members():
+                if key == "shapes":
+                    for _ in reader.items():
+                        pass
+                else:
+                    settings[key] = reader.value()
+    except FileNotFoundError:
+        raise ConfigurationError(f"Configuration file not found: {path}")
+    return settings
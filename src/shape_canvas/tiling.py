@@ -0,0 +1,393 @@
+"""Tiled, multi-process rendering for ShapeCanvas."""
+
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, List, Optional, Sequence, Tuple
+
+from PIL import Image, ImageDraw
+
+from .exceptions import DrawingError
+from .spatial import Bounds, SpatialIndex
+
+
+Box = Tuple[int, int, int, int]
+
+# Extra pixels added around measured extents to cover rounding in Pillow
+EXTENT_MARGIN = 2
+
+# Pixels of neighbouring canvas drawn around each tile; shapes are clipped to
+# it unless they must be drawn with their full geometry
+TILE_MARGIN = 64
+
+# Shapes handed to each worker process once, by the pool initializer
+_worker_shapes: List[Any] = []
+
+
+def to_pairs(xy: Sequence[Any]) -> List[Tuple[float, float]]:
+    """Normalize flat or paired coordinates to a list of (x, y) pairs."""
+    if xy and isinstance(xy[0], (int, float)):
+        return [(xy[i], xy[i + 1]) for i in range(0, len(xy), 2)]
+    return [(point[0], point[1]) for point in xy]
+
+
+def _integral(points: List[Tuple[float, float]]) -> bool:
+    """Check that every coordinate lies on a whole pixel."""
+    return all(float(x).is_integer() and float(y).is_integer() for x, y in points)
+
+
+class TranslatedDraw:
+    """ImageDraw wrapper that maps canvas coordinates onto a tile."""
+
+    def __init__(self, draw: ImageDraw.ImageDraw, origin: Tuple[int, int]):
+        """
+        Initialize translated drawing context.
+
+        Args:
+            draw: Drawing context of the tile image
+            origin: Canvas coordinates of the tile's top-left pixel
+        """
+        self._draw = draw
+        self._origin = origin
+
+    def _translate(self, xy: Sequence[Any]) -> List[Tuple[float, float]]:
+        """Translate flat or paired coordinates into tile space."""
+        ox, oy = self._origin
+        return [(x - ox, y - oy) for x, y in to_pairs(xy)]
+
+    def line(self, xy: Sequence[Any], **kwargs: Any) -> None:
+        """Draw a line or polyline."""
+        self._draw.line(self._translate(xy), **kwargs)
+
+    def polygon(self, xy: Sequence[Any], **kwargs: Any) -> None:
+        """Draw a polygon."""
+        self._draw.polygon(self._translate(xy), **kwargs)
+
+    def rectangle(self, xy: Sequence[Any], **kwargs: Any) -> None:
+        """Draw a rectangle."""
+        self._draw.rectangle(self._translate(xy), **kwargs)
+
+    def ellipse(self, xy: Sequence[Any], **kwargs: Any) -> None:
+        """Draw an ellipse."""
+        self._draw.ellipse(self._translate(xy), **kwargs)
+
+    def arc(self, xy: Sequence[Any], start: float, end: float, **kwargs: Any) -> None:
+        """Draw an arc."""
+        self._draw.arc(self._translate(xy), start, end, **kwargs)
+
+    def text(self, xy: Tuple[float, float], text: str, **kwargs: Any) -> None:
+        """Draw text."""
+        self._draw.text(self._translate(xy)[0], text, **kwargs)
+
+
+class TileSurface:
+    """
+    Drawing surface covering one tile of a larger canvas.
+
+    Shapes draw on it in canvas coordinates; ``size`` reports the full
+    canvas size so shapes behave exactly as on the untiled canvas.
+    """
+
+    def __init__(self, image: Image.Image, origin: Tuple[int, int], canvas_size: Tuple[int, int]):
+        """
+        Initialize tile surface.
+
+        Args:
+            image: Tile image receiving the pixels
+            origin: Canvas coordinates of the tile's top-left pixel
+            canvas_size: Size of the full canvas
+        """
+        self.image = image
+        self.origin = origin
+        self.size = canvas_size
+
+    def get_draw(self) -> TranslatedDraw:
+        """Get a drawing context in canvas coordinates."""
+        return TranslatedDraw(ImageDraw.Draw(self.image), self.origin)
+
+    def paste(self, im: Image.Image, box: Sequence[int], mask: Optional[Image.Image] = None) -> None:
+        """Paste an image given in canvas coordinates onto the tile."""
+        ox, oy = self.origin
+        self.image.paste(im, (box[0] - ox, box[1] - oy), mask)
+
+
+class ExtentDraw:
+    """
+    Drawing context that only records the extent of what is drawn.
+
+    It also records whether every call draws the same pixels when a window
+    edge clips it: Pillow rasterizes polygons, lines wider than a pixel and
+    fractional coordinates slightly differently once clipped.
+    """
+
+    def __init__(self) -> None:
+        """Initialize empty extent."""
+        self.extent: Optional[Bounds] = None
+        self.clip_safe = True
+
+    def add(self, xy: Sequence[Any], pad: float = 0, clip_safe: bool = True) -> None:
+        """Grow the extent to cover the given points plus padding."""
+        points = to_pairs(xy)
+        if not points:
+            return
+        if not (clip_safe and _integral(points)):
+            self.clip_safe = False
+        xs = [x for x, _ in points]
+        ys = [y for _, y in points]
+        box = (min(xs) - pad, min(ys) - pad, max(xs) + pad, max(ys) + pad)
+        if self.extent is not None:
+            box = (min(box[0], self.extent[0]), min(box[1], self.extent[1]),
+                   max(box[2], self.extent[2]), max(box[3], self.extent[3]))
+        self.extent = box
+
+    def line(self, xy: Sequence[Any], fill: Any = None, width: int = 1, **kwargs: Any) -> None:
+        """Record a line or polyline."""
+        self.add(xy, width + EXTENT_MARGIN, clip_safe=width <= 1)
+
+    def polygon(self, xy: Sequence[Any], fill: Any = None, outline: Any = None,
+                width: int = 1, **kwargs: Any) -> None:
+        """Record a polygon."""
+        self.add(xy, EXTENT_MARGIN, clip_safe=False)
+
+    def rectangle(self, xy: Sequence[Any], fill: Any = None, outline: Any = None,
+                  width: int = 1, **kwargs: Any) -> None:
+        """Record a rectangle."""
+        self.add(xy, EXTENT_MARGIN)
+
+    def ellipse(self, xy: Sequence[Any], fill: Any = None, outline: Any = None,
+                width: int = 1, **kwargs: Any) -> None:
+        """Record an ellipse."""
+        self.add(xy, EXTENT_MARGIN)
+
+    def arc(self, xy: Sequence[Any], start: float, end: float, fill: Any = None,
+            width: int = 1, **kwargs: Any) -> None:
+        """Record an arc by its full ellipse box."""
+        self.add(xy, EXTENT_MARGIN)
+
+
+class ExtentSurface:
+    """Surface that measures where a shape draws without touching pixels."""
+
+    def __init__(self, canvas_size: Tuple[int, int]):
+        """
+        Initialize extent surface.
+
+        Args:
+            canvas_size: Size of the canvas the shape would be drawn on
+        """
+        self.size = canvas_size
+        self._draw = ExtentDraw()
+
+    @property
+    def extent(self) -> Optional[Bounds]:
+        """Extent of everything drawn so far, or None if nothing was drawn."""
+        return self._draw.extent
+
+    @property
+    def clip_safe(self) -> bool:
+        """Whether everything drawn so far may be clipped by a window edge."""
+        return self._draw.clip_safe
+
+    def get_draw(self) -> ExtentDraw:
+        """Get the recording drawing context."""
+        return self._draw
+
+    def paste(self, im: Image.Image, box: Sequence[int], mask: Optional[Image.Image] = None) -> None:
+        """Record a pasted image."""
+        self._draw.add([(box[0], box[1]), (box[0] + im.width, box[1] + im.height)])
+
+
+def shape_extent(shape: Any, canvas_size: Tuple[int, int]) -> Optional[Bounds]:
+    """
+    Get the extent of a shape in canvas coordinates.
+
+    Uses the shape's own bounds when it reports them and otherwise
+    measures the drawing calls the shape makes.
+
+    Args:
+        shape: Shape to measure
+        canvas_size: Size of the canvas the shape is drawn on
+
+    Returns:
+        (left, top, right, bottom) box, or None if the shape draws nothing
+    """
+    bounds: Optional[Bounds] = shape.bounds()
+    if bounds is not None:
+        return bounds
+    surface = ExtentSurface(canvas_size)
+    shape.draw(surface)
+    return surface.extent
+
+
+def unclipped_extents(shape: Any, extent: Optional[Bounds],
+                      canvas_size: Tuple[int, int]) -> List[Bounds]:
+    """
+    Get the extents of the parts of a shape that must be drawn unclipped.
+
+    Parts no larger than TILE_MARGIN always fit in the area of a tile they
+    touch and are left out; a larger shape is measured to find out whether
+    it may be clipped.
+
+    Args:
+        shape: Shape to check
+        extent: Extent of the shape, from shape_extent()
+        canvas_size: Size of the canvas the shape is drawn on
+
+    Returns:
+        Extents of the parts, in canvas coordinates
+    """
+    parts: Optional[List[Bounds]] = shape.unclipped_parts(canvas_size, TILE_MARGIN)
+    if parts is not None:
+        return parts
+    if extent is None or (extent[2] - extent[0] <= TILE_MARGIN and extent[3] - extent[1] <= TILE_MARGIN):
+        return []
+    surface = ExtentSurface(canvas_size)
+    shape.draw(surface)
+    return [] if surface.clip_safe else [extent]
+
+
+def plan_tiles(size: Tuple[int, int], tile_size: int) -> List[Box]:
+    """
+    Split a canvas into tiles.
+
+    Args:
+        size: Canvas size
+        tile_size: Edge length of a tile in pixels
+
+    Returns:
+        List of (left, top, right, bottom) tile boxes, row by row
+    """
+    width, height = size
+    return [
+        (x, y, min(x + tile_size, width), min(y + tile_size, height))
+        for y in range(0, height, tile_size)
+        for x in range(0, width, tile_size)
+    ]
+
+
+def drawing_area(box: Box, extents: List[Bounds], canvas_size: Tuple[int, int]) -> Box:
+    """
+    Get the pixel area a tile must be drawn on.
+
+    The area covers the tile plus TILE_MARGIN pixels around it, so shapes
+    reaching over the tile's edge are drawn as on the full canvas, grown to
+    cover the full extent of the parts that must be drawn unclipped (see
+    unclipped_extents()), and limited to the canvas.
+
+    Args:
+        box: Tile box
+        extents: Extents of the unclipped parts touching the tile
+        canvas_size: Size of the full canvas
+
+    Returns:
+        (left, top, right, bottom) pixel box
+    """
+    left, top, right, bottom = (box[0] - TILE_MARGIN, box[1] - TILE_MARGIN,
+                                box[2] + TILE_MARGIN, box[3] + TILE_MARGIN)
+    for extent in extents:
+        left = min(left, math.floor(extent[0]))
+        top = min(top, math.floor(extent[1]))
+        right = max(right, math.ceil(extent[2]) + 1)
+        bottom = max(bottom, math.ceil(extent[3]) + 1)
+    return (max(left, 0), max(top, 0), min(right, canvas_size[0]), min(bottom, canvas_size[1]))
+
+
+def _init_worker(shapes: List[Any]) -> None:
+    """Pool initializer: receive the scene once per worker process."""
+    global _worker_shapes
+    _worker_shapes = shapes
+
+
+def _render_tile(shm_name: str, canvas_size: Tuple[int, int], box: Box, area: Box,
+                 indices: List[int]) -> None:
+    """Render the given shapes into one tile of the shared canvas buffer."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        buf = shm.buf
+        if buf is None:
+            raise DrawingError("Shared canvas buffer is not mapped")
+        stride = canvas_size[0] * 3
+        row_bytes = (area[2] - area[0]) * 3
+        data = b"".join(bytes(buf[y * stride + area[0] * 3:y * stride + area[0] * 3 + row_bytes])
+                        for y in range(area[1], area[3]))
+        image = Image.frombytes("RGB", (area[2] - area[0], area[3] - area[1]), data)
+
+        surface = TileSurface(image, (area[0], area[1]), canvas_size)
+        for index in indices:
+            _worker_shapes[index].paint(surface)
+
+        left, top, right, bottom = box
+        tile = image.crop((left - area[0], top - area[1], right - area[0], bottom - area[1]))
+        data = tile.tobytes()
+        row_bytes = (right - left) * 3
+        for row, y in enumerate(range(top, bottom)):
+            offset = y * stride + left * 3
+            buf[offset:offset + row_bytes] = data[row * row_bytes:(row + 1) * row_bytes]
+    finally:
+        shm.close()
+
+
+def render_tiled(image: Image.Image, shapes: List[Any], tile_size: int,
+                 workers: Optional[int] = None) -> Image.Image:
+    """
+    Render shapes onto an RGB image tile by tile in a process pool.
+
+    Each tile receives only the shapes whose extent intersects it and draws
+    them in scene order on its drawing_area(), so the result is
+    pixel-identical to sequential rendering. Tiles are written into a
+    shared-memory copy of the canvas.
+
+    Args:
+        image: Current canvas image
+        shapes: Shapes to draw, in drawing order
+        tile_size: Edge length of a tile in pixels
+        workers: Number of worker processes (defaults to the CPU count)
+
+    Returns:
+        New image with all shapes drawn
+    """
+    if image.mode != "RGB":
+        raise DrawingError(f"Tiled rendering requires an RGB canvas, got {image.mode}")
+
+    extents = [shape_extent(shape, image.size) for shape in shapes]
+    index = SpatialIndex(tile_size)
+    parts: List[Bounds] = []
+    unclipped = SpatialIndex(tile_size)
+    for i, extent in enumerate(extents):
+        if extent is not None:
+            index.insert(i, extent)
+            for part in unclipped_extents(shapes[i], extent, image.size):
+                unclipped.insert(len(parts), part)
+                parts.append(part)
+
+    jobs: List[Tuple[Box, Box, List[int]]] = []
+    for box in plan_tiles(image.size, tile_size):
+        indices = index.query(box)
+        if indices:
+            area = drawing_area(box, [parts[i] for i in unclipped.query(box)], image.size)
+            jobs.append((box, area, indices))
+
+    if not jobs:
+        return image
+
+    data = image.tobytes()
+    shm = shared_memory.SharedMemory(create=True, size=len(data))
+    try:
+        buf = shm.buf
+        if buf is None:
+            raise DrawingError("Shared canvas buffer is not mapped")
+        buf[:len(data)] = data
+        max_workers = min(workers or os.cpu_count() or 1, len(jobs))
+
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                 initargs=(shapes,)) as pool:
+            futures = [pool.submit(_render_tile, shm.name, image.size, box, area, indices)
+                       for box, area, indices in jobs]
+            for future in futures:
+                future.result()
+
+        return Image.frombytes("RGB", image.size, bytes(buf[:len(data)]))
+    finally:
+        shm.close()
+        shm.unlink()
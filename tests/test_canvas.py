@@ -4,10 +4,33 @@ import pytest
 import tempfile
 import json
 from pathlib import Path
-from PIL import Image
+from PIL import Image, ImageChops, ImageDraw
 
 from shape_canvas import Canvas, CanvasConfig
-from shape_canvas.exceptions import DrawingError, ConfigurationError
+from shape_canvas import geometry
+from shape_canvas.instances import ShapeInstances
+from shape_canvas.shapes import ShapeFactory
+from shape_canvas.spatial import SpatialIndex
+from shape_canvas.tiling import TILE_MARGIN, drawing_area, shape_extent, unclipped_extents
+from shape_canvas.grid import grid_cache_info, grid_layer
+from shape_canvas.sprites import sprite_cache
+from shape_canvas.exceptions import DrawingError, ConfigurationError, ValidationError
+
+
+def render_both(reference, candidate):
+    """
+    Render two canvases and check that they draw exactly the same pixels.
+    
+    Args:
+        reference: Canvas drawing the shapes the established way
+        candidate: Canvas drawing them through the path under test
+    
+    Returns:
+        The rendered candidate canvas
+    """
+    expected = reference.render().get_image()
+    assert candidate.render().get_image().tobytes() == expected.tobytes()
+    return candidate
 
 
 class TestCanvas:
@@ -143,4 +166,1282 @@ class TestCanvas:
         assert info["background_color"] == (255, 255, 255)
         assert info["shapes_count"] == 0
         assert isinstance(info["supported_shapes"], list)
-        assert len(info["supported_shapes"]) > 0
\ No newline at end of file
+        assert len(info["supported_shapes"]) > 0
+    
+    def test_flatness_from_config(self):
+        """Test that the canvas-wide flatness tolerance reaches the shapes."""
+        config = {"canvas_size": [300, 200], "background_color": [255, 255, 255], "flatness": 1.5}
+        canvas = Canvas(config).add_shape(TestTiledRendering.SHAPES[1])
+        assert canvas.get_canvas_info()["flatness"] == 1.5
+        assert canvas._shapes[0]._get_flatness() == 1.5
+        
+        with pytest.raises(ValidationError):
+            Canvas(dict(config, flatness=0))
+
+
+class TestTiledRendering:
+    """Test cases for tiled rendering."""
+    
+    SHAPES = [
+        {
+            "type": "star",
+            "center": [180, 90],
+            "size": 120,
+            "fill_color": [0, 255, 0],
+            "outline_color": [255, 0, 255],
+            "border_width": 5,
+            "num_points": 6
+        },
+        {
+            "type": "wavy_line",
+            "start": [10, 150],
+            "end": [290, 40],
+            "fill_color": [0, 0, 255],
+            "border_width": 3
+        },
+        {
+            "type": "moon",
+            "center": [60, 60],
+            "radius": 40,
+            "phase_offset": 30,
+            "outline_color": [0, 0, 0],
+            "border_width": 2
+        },
+        {
+            "type": "circle",
+            "center": [250, 170],
+            "radius": 45,
+            "fill_color": [255, 0, 0],
+            "outline_color": [0, 0, 0],
+            "border_width": 2
+        }
+    ]
+    
+    def _render(self, tile_size=None, workers=None):
+        canvas = Canvas.create_blank(300, 200)
+        canvas.set_tiling(tile_size, workers)
+        return canvas.add_shapes(self.SHAPES).render().get_image()
+    
+    def test_tiled_render_is_pixel_identical(self):
+        """Test that tiled rendering matches sequential rendering."""
+        expected = self._render()
+        
+        for tile_size in (37, 64, 512):
+            result = self._render(tile_size=tile_size, workers=2)
+            assert result.tobytes() == expected.tobytes()
+
+    LARGE_SHAPES = [
+        {"type": "rectangle", "start": [0, 0], "end": [299, 199], "fill_color": [20, 30, 40]},
+        {"type": "star", "center": [150.5, 100.25], "size": 240, "fill_color": [0, 200, 0],
+         "outline_color": [255, 255, 0], "border_width": 3, "num_points": 7},
+        {"type": "circle", "center": [120, 90], "radius": 110, "fill_color": [200, 0, 0],
+         "outline_color": [0, 0, 255], "border_width": 4},
+        {"type": "straight_line", "start": [-20, 30], "end": [330, 170],
+         "fill_color": [255, 255, 255], "border_width": 9},
+        {"type": "shape_batch", "shape": "straight_line", "start": [[5, 5], [10.5, 190], [0, 100]],
+         "end": [[295, 195], [290, 10.25], [300, 100]], "fill_color": [0, 255, 255],
+         "border_width": [1, 1, 6]},
+        {"type": "instances", "offsets": [[0, 0], [150, 0], [75.5, 100]],
+         "template": {"type": "star", "center": [75, 50], "size": 150, "fill_color": [255, 0, 255],
+                      "num_points": 5}},
+    ]
+
+    def test_large_shapes_tiled_pixel_identical(self):
+        """Test that shapes larger than the tile margin render as sequentially."""
+        expected = Canvas.create_blank(300, 200).add_shapes(self.LARGE_SHAPES).render().get_image()
+        for tile_size in (37, 64):
+            canvas = Canvas.create_blank(300, 200).set_tiling(tile_size, 2)
+            result = canvas.add_shapes(self.LARGE_SHAPES).render().get_image()
+            assert result.tobytes() == expected.tobytes()
+        region = Canvas.create_blank(300, 200).add_shapes(self.LARGE_SHAPES).render()
+        region.render(region=(40, 50, 130, 140))
+        assert region.get_image().tobytes() == expected.tobytes()
+
+    def test_only_unclippable_parts_grow_tiles(self):
+        """Test that backgrounds and large batches keep tiles at their margin."""
+        shapes = [ShapeFactory.create_shape(shape) for shape in self.LARGE_SHAPES]
+        parts = [unclipped_extents(shape, shape_extent(shape, (300, 200)), (300, 200))
+                 for shape in shapes]
+        assert parts[0] == [] and parts[2] == [] and parts[3] != []
+        assert len(parts[1]) == 1
+        # Only the fractional line and the wide one; every instance is a polygon
+        assert len(parts[4]) == 2
+        assert len(parts[5]) == 3
+        assert drawing_area((64, 64, 128, 128), parts[0], (4000, 4000)) == (
+            64 - TILE_MARGIN, 64 - TILE_MARGIN, 128 + TILE_MARGIN, 128 + TILE_MARGIN)
+
+    def test_tiling_from_config(self):
+        """Test reading tiling settings from configuration."""
+        canvas = Canvas({
+            "canvas_size": [100, 100],
+            "background_color": [255, 255, 255],
+            "tile_size": 32,
+            "workers": 2
+        })
+        info = canvas.get_canvas_info()
+        assert info["tile_size"] == 32
+        assert info["workers"] == 2
+    
+    def test_invalid_tiling(self):
+        """Test rejection of invalid tiling settings."""
+        canvas = Canvas.create_blank(100, 100)
+        with pytest.raises(ValidationError):
+            canvas.set_tiling(0)
+        with pytest.raises(ValidationError):
+            Canvas({
+                "canvas_size": [100, 100],
+                "background_color": [255, 255, 255],
+                "workers": -1
+            })
+
+
+class TestDisplayList:
+    """Test cases for compiled display lists."""
+    
+    def _canvas(self):
+        canvas = Canvas.create_blank(300, 200)
+        return canvas.add_shapes(TestTiledRendering.SHAPES)
+    
+    def test_compile_is_cached(self):
+        """Test that the display list is reused and extended as shapes are added."""
+        canvas = self._canvas()
+        display_list = canvas.compile()
+        length = len(display_list)
+        assert length > 0
+        assert canvas.compile() is display_list
+        
+        canvas.add_shape(TestTiledRendering.SHAPES[0])
+        assert canvas.compile() is display_list
+        assert len(display_list) > length
+        assert display_list.shape_count == len(TestTiledRendering.SHAPES) + 1
+    
+    def test_replay_matches_direct_drawing(self):
+        """Test that replaying the display list matches drawing the shapes."""
+        canvas = self._canvas()
+        expected = Image.new('RGB', (300, 200), (255, 255, 255))
+        for shape in canvas._shapes:
+            shape.draw(expected)
+        
+        assert canvas.render().get_image().tobytes() == expected.tobytes()
+        assert canvas.rasterize().tobytes() == expected.tobytes()
+    
+    def test_rasterize_at_other_size(self):
+        """Test rasterizing the scene at a different output size."""
+        canvas = self._canvas()
+        image = canvas.rasterize((600, 400))
+        assert image.size == (600, 400)
+        # Circle centre scales from (250, 170) to (500, 340)
+        assert image.getpixel((500, 340)) == (255, 0, 0)
+
+
+class TestIncrementalRendering:
+    """Test cases for rendering only newly added shapes."""
+    
+    def _config(self, grid):
+        return {"canvas_size": [300, 200], "background_color": [255, 255, 255],
+                "show_grid": grid, "line_interval": 50}
+    
+    def _expected(self, shapes, grid=False):
+        canvas = Canvas(self._config(grid))
+        if grid:
+            canvas.add_grid()
+        return canvas.add_shapes(shapes).render().get_image().tobytes()
+    
+    def test_render_draws_only_new_shapes(self):
+        """Test that repeated renders do not draw shapes twice."""
+        canvas = Canvas.create_blank(300, 200)
+        canvas.add_shapes(TestTiledRendering.SHAPES[:2]).render()
+        canvas.add_shapes(TestTiledRendering.SHAPES[2:]).render()
+        # Moon draws a translucent shadow, which would darken on a second pass
+        canvas.render()
+        
+        assert canvas.get_image().tobytes() == self._expected(TestTiledRendering.SHAPES)
+        assert canvas.get_canvas_info()["rendered_count"] == len(TestTiledRendering.SHAPES)
+    
+    def test_full_render_rebuilds_from_background(self):
+        """Test that a full render redraws the background, grid and every shape."""
+        canvas = Canvas(self._config(True))
+        canvas.add_grid().add_shapes(TestTiledRendering.SHAPES).render()
+        canvas.get_image().paste((0, 0, 0), (0, 0, 300, 200))
+        
+        canvas.render(full=True)
+        assert canvas.get_image().tobytes() == self._expected(TestTiledRendering.SHAPES, grid=True)
+    
+    def test_region_render_rebuilds_from_background(self):
+        """Test that rendering a region twice leaves it unchanged."""
+        canvas = Canvas.create_blank(300, 200)
+        canvas.add_shapes(TestTiledRendering.SHAPES).render()
+        canvas.render(region=(0, 0, 300, 200))
+        
+        assert canvas.get_image().tobytes() == self._expected(TestTiledRendering.SHAPES)
+    
+    def test_tiled_render_draws_only_new_shapes(self):
+        """Test incremental rendering through the tiled renderer."""
+        canvas = Canvas.create_blank(300, 200).set_tiling(128, workers=2)
+        canvas.add_shapes(TestTiledRendering.SHAPES[:3]).render()
+        canvas.add_shapes(TestTiledRendering.SHAPES[3:]).render()
+        
+        assert canvas.get_image().tobytes() == self._expected(TestTiledRendering.SHAPES)
+
+
+class TestConfigLifecycle:
+    """Test cases for loading configuration shapes and grid only once."""
+    
+    CONFIG = {
+        "canvas_size": [300, 200],
+        "background_color": [255, 255, 255],
+        "line_interval": 50,
+        "shapes": TestTiledRendering.SHAPES,
+    }
+    
+    def test_repeated_load_and_grid_do_nothing(self):
+        """Test that the CLI call chain loads and draws everything once."""
+        canvas = Canvas(dict(self.CONFIG))
+        canvas.add_grid().load_shapes_from_config().render()
+        canvas.add_grid().load_shapes_from_config().render()
+        
+        info = canvas.get_canvas_info()
+        assert info["shapes_count"] == len(TestTiledRendering.SHAPES)
+        assert info["config_loads"] == 1
+        assert info["grid_draws"] == 1
+        
+        expected = Canvas.create_blank(300, 200)
+        expected.config.line_interval = 50
+        expected.config.show_grid = True
+        expected.add_grid().add_shapes(TestTiledRendering.SHAPES).render()
+        assert canvas.get_image().tobytes() == expected.get_image().tobytes()
+    
+    def test_grid_can_be_disabled_after_loading(self):
+        """Test that disabling the grid before rendering skips it."""
+        canvas = Canvas(dict(self.CONFIG))
+        canvas.config.show_grid = False
+        canvas.render()
+        
+        assert canvas.get_canvas_info()["grid_draws"] == 0
+        expected = Canvas.create_blank(300, 200).add_shapes(TestTiledRendering.SHAPES).render()
+        assert canvas.get_image().tobytes() == expected.get_image().tobytes()
+    
+    def test_clear_allows_reloading(self):
+        """Test that config shapes can be loaded again after clearing."""
+        canvas = Canvas(dict(self.CONFIG))
+        canvas.clear().load_shapes_from_config()
+        
+        info = canvas.get_canvas_info()
+        assert info["shapes_count"] == len(TestTiledRendering.SHAPES)
+        assert info["config_loads"] == 2
+
+
+class TestGridLayer:
+    """Test cases for the cached grid overlay."""
+    
+    def _text_grid(self, size, interval, line_color):
+        image = Image.new('RGB', size, (255, 255, 255))
+        draw = ImageDraw.Draw(image)
+        for x in range(0, size[0], interval):
+            draw.line([(x, 0), (x, size[1])], fill=line_color)
+        for y in range(0, size[1], interval):
+            draw.line([(0, y), (size[0], y)], fill=line_color)
+        for x in range(0, size[0] + 1, interval):
+            for y in range(0, size[1] + 1, interval):
+                draw.text((x, y), f"({x},{y})", fill="black")
+        return image
+    
+    def test_grid_matches_text_rendering(self):
+        """Test that the glyph-atlas grid matches drawing each label as text."""
+        for interval, line_color, expected_color in [(50, "gray", "gray"),
+                                                     (20, [200, 0, 0], (200, 0, 0))]:
+            canvas = Canvas.create_blank(300, 200)
+            canvas.config.line_interval = interval
+            canvas.config.line_color = line_color
+            canvas.config.show_grid = True
+            canvas.add_grid()
+            
+            expected = self._text_grid((300, 200), interval, expected_color)
+            assert canvas.get_image().tobytes() == expected.tobytes()
+    
+    def test_grid_layer_is_cached(self):
+        """Test that canvases with the same grid share one rendered layer."""
+        assert grid_layer((320, 240), 40) is grid_layer((320, 240), 40, "gray")
+        hits = grid_cache_info().hits
+        grid_layer((320, 240), 40)
+        assert grid_cache_info().hits == hits + 1
+        assert grid_layer((320, 240), 40, "blue") is not grid_layer((320, 240), 40)
+
+
+class TestCulling:
+    """Test cases for off-canvas culling."""
+    
+    def test_off_canvas_shapes_are_culled(self):
+        """Test that shapes outside the canvas are skipped and counted."""
+        canvas = Canvas.create_blank(200, 100)
+        canvas.add_shapes([
+            {
+                "type": "regular_polygon",
+                "center": [100, 584],
+                "radius": 400,
+                "n_sides": 6,
+                "fill_color": [255, 0, 0],
+                "outline_color": [0, 0, 255],
+                "border_width": 5
+            },
+            {
+                "type": "circle",
+                "center": [100, 50],
+                "radius": 20,
+                "fill_color": [0, 255, 0],
+                "outline_color": [0, 0, 0],
+                "border_width": 1
+            }
+        ])
+        canvas.render()
+        
+        info = canvas.get_canvas_info()
+        assert info["shapes_count"] == 2
+        assert info["culled_count"] == 1
+        assert canvas.get_image().getpixel((100, 50)) == (0, 255, 0)
+    
+    def test_partially_visible_shapes_are_drawn(self):
+        """Test that shapes crossing the canvas edge are not culled."""
+        canvas = Canvas.create_blank(200, 100)
+        canvas.add_shape({
+            "type": "circle",
+            "center": [-10, 50],
+            "radius": 20,
+            "fill_color": [0, 255, 0],
+            "outline_color": [0, 0, 0],
+            "border_width": 1
+        }).render()
+        
+        assert canvas.get_canvas_info()["culled_count"] == 0
+        assert canvas.get_image().getpixel((2, 50)) == (0, 255, 0)
+
+
+class TestOcclusionCulling:
+    """Test cases for culling shapes hidden under later opaque shapes."""
+    
+    CONTENT = [
+        {"type": "star", "center": [60, 50], "size": 30, "num_points": 5, "fill_color": [255, 200, 0]},
+        {"type": "circle", "center": [150, 60], "radius": 25, "fill_color": [0, 0, 255]},
+        {"type": "straight_line", "start": [-10, 90], "end": [210, 90], "fill_color": [0, 0, 0],
+         "border_width": 3},
+    ]
+    
+    PANEL = {"type": "rectangle", "start": [0, 0], "end": [199, 99], "fill_color": [230, 230, 230],
+             "outline_color": [0, 0, 0], "border_width": 1}
+    
+    def _culled(self, shapes):
+        """Render shapes with occlusion culling, checking them against a plain render."""
+        config = {"canvas_size": [200, 100], "background_color": [255, 255, 255], "shapes": shapes}
+        return render_both(Canvas(config), Canvas(dict(config, occlusion_culling=True)))
+    
+    def test_shapes_under_a_panel_are_skipped(self):
+        """Test that shapes covered by a later panel are skipped and counted."""
+        canvas = self._culled(self.CONTENT + [self.PANEL])
+        info = canvas.get_canvas_info()
+        assert info["occluded_count"] == 2
+        # The line reaches past the panel's edges
+        assert canvas._visible == [False, False, True, True]
+        assert info["overdraw_pixels_saved"] > 0
+    
+    def test_shapes_crossing_the_interior_edge_are_drawn(self):
+        """Test that shapes reaching outside every later interior are kept."""
+        circle = {"type": "circle", "center": [100, 50], "radius": 40, "fill_color": [255, 0, 0]}
+        shapes = [
+            {"type": "square", "start": [90, 40], "size": 20, "fill_color": [0, 255, 0]},
+            {"type": "square", "start": [70, 20], "size": 60, "fill_color": [0, 0, 255]},
+            circle,
+        ]
+        canvas = self._culled(shapes)
+        assert canvas.get_canvas_info()["occluded_count"] == 1
+        assert canvas._visible == [False, True, True]
+    
+    def test_culling_is_off_by_default(self):
+        """Test that occlusion culling only runs when configured."""
+        canvas = Canvas({"canvas_size": [200, 100], "background_color": [255, 255, 255],
+                         "shapes": self.CONTENT + [self.PANEL]}).render()
+        assert canvas.get_canvas_info()["occluded_count"] == 0
+    
+    def test_rendered_shapes_are_not_culled(self):
+        """Test that incremental renders only cull shapes not drawn yet."""
+        canvas = Canvas({"canvas_size": [200, 100], "background_color": [255, 255, 255],
+                         "occlusion_culling": True, "shapes": self.CONTENT})
+        canvas.render()
+        canvas.add_shapes([dict(self.CONTENT[0], center=[100, 50]), self.PANEL]).render()
+        assert canvas.get_canvas_info()["occluded_count"] == 1
+        assert canvas.get_image().getpixel((100, 50)) == (230, 230, 230)
+
+
+class TestSpatialQueries:
+    """Test cases for the spatial index and region rendering."""
+    
+    def _grid_canvas(self):
+        canvas = Canvas.create_blank(400, 400)
+        for row in range(10):
+            for col in range(10):
+                canvas.add_shape({
+                    "type": "circle",
+                    "center": [col * 40 + 20, row * 40 + 20],
+                    "radius": 15,
+                    "fill_color": [row * 25, col * 25, 100],
+                    "outline_color": [0, 0, 0],
+                    "border_width": 1
+                })
+        return canvas
+    
+    def test_shapes_at(self):
+        """Test finding shapes at a point."""
+        canvas = self._grid_canvas()
+        hits = canvas.shapes_at(60, 100)
+        assert len(hits) == 1
+        assert hits[0].data["center"] == [60, 100]
+        assert canvas.shapes_at(-50, -50) == []
+    
+    def test_shapes_in(self):
+        """Test finding shapes intersecting a box in drawing order."""
+        canvas = self._grid_canvas()
+        hits = canvas.shapes_in((0, 0, 80, 40))
+        assert [shape.data["center"] for shape in hits] == [[20, 20], [60, 20]]
+    
+    def test_render_region_matches_full_render(self):
+        """Test that a region render matches the full render inside the region."""
+        full = self._grid_canvas().render().get_image()
+        
+        canvas = self._grid_canvas()
+        region = (55, 70, 190, 230)
+        image = canvas.render(region=region).get_image()
+        
+        assert image.crop(region).tobytes() == full.crop(region).tobytes()
+        assert image.getpixel((20, 20)) == (255, 255, 255)
+    
+    def test_spatial_index_query_is_local(self):
+        """Test that index queries only look at nearby items."""
+        index = SpatialIndex(cell_size=10)
+        for i in range(1000):
+            index.insert(i, (i * 10, 0, i * 10 + 5, 5))
+        assert index.query((100, 0, 120, 10)) == [10, 11]
+        assert len(index._cells) == 1000
+
+
+class TestCompactShapes:
+    """Test cases for compact shape storage and the memory report."""
+    
+    CIRCLES = [
+        {"type": "circle", "center": [20 + 40 * i, 50], "radius": 15, "fill_color": [200, 30, 30],
+         "outline_color": [0, 0, 0], "border_width": 2}
+        for i in range(7)
+    ]
+    
+    def _canvas(self, compact, shapes=None):
+        return Canvas({
+            "canvas_size": [300, 200],
+            "background_color": [255, 255, 255],
+            "compact_shapes": compact,
+            "shapes": self.CIRCLES if shapes is None else shapes,
+        })
+    
+    def test_compact_render_matches(self):
+        """Test that compacted shapes draw exactly like regular ones."""
+        shapes = TestTiledRendering.SHAPES + self.CIRCLES
+        regular = self._canvas(False, shapes).render().get_image()
+        compact = self._canvas(True, shapes).render().get_image()
+        assert compact.tobytes() == regular.tobytes()
+    
+    def test_compact_shapes_release_data(self):
+        """Test that compacted shapes keep no source data but can rebuild it."""
+        canvas = self._canvas(True)
+        shape = canvas.shapes_at(60, 50)[0]
+        assert shape._data is None
+        assert shape.data == self.CIRCLES[1]
+        assert not hasattr(shape, "__dict__")
+    
+    def test_compact_shapes_share_values(self):
+        """Test that equal colors of compacted shapes are stored once."""
+        first, second = self._canvas(True).shapes_in((0, 40, 80, 60))
+        assert first.params.fill_color is second.params.fill_color
+        assert first._extra is second._extra
+    
+    def test_memory_report(self):
+        """Test that the memory report shows compacted shapes are smaller."""
+        regular = self._canvas(False).memory_report()
+        compact = self._canvas(True).memory_report()
+        
+        assert regular["Circle"]["count"] == len(self.CIRCLES)
+        assert regular["total"]["count"] == len(self.CIRCLES)
+        assert compact["Circle"]["bytes_per_shape"] < regular["Circle"]["bytes_per_shape"] / 2
+        assert compact["total"]["bytes"] < regular["total"]["bytes"]
+
+
+class TestShapeBatch:
+    """Test cases for columnar shape batches."""
+    
+    CONFIG = {"canvas_size": [300, 200], "background_color": [255, 255, 255]}
+    
+    COLUMNS = {
+        "circle": {"center": [[30, 40], [150, 100], [290, 190], [500, 500]], "radius": [20, 35, 15, 5],
+                   "fill_color": [[255, 0, 0], [0, 255, 0], [0, 0, 255], [9, 9, 9]],
+                   "outline_color": [0, 0, 0], "border_width": [1, 3, 0, 2]},
+        "rectangle": {"start": [[10, 10], [100, 50]], "end": [[60, 80], [250.5, 180]],
+                      "fill_color": [200, 200, 0], "border_width": 2},
+        "straight_line": {"start": [[0, 0], [300, 0]], "end": [[300, 200], [0, 200]],
+                          "fill_color": [[0, 0, 255], [255, 0, 255]], "border_width": [1, 5]},
+    }
+    
+    @staticmethod
+    def _rows(columns):
+        """Split batch columns into single-shape dicts."""
+        def per_shape(name, value):
+            if name in ("center", "start", "end") or name.endswith("color"):
+                return isinstance(value[0], list)
+            return isinstance(value, list)
+        
+        count = len(columns.get("center") or columns["start"])
+        return [{name: value[i] if per_shape(name, value) else value for name, value in columns.items()}
+                for i in range(count)]
+    
+    def _single(self, shape_type, **config):
+        """Build a canvas with the shapes of a batch added one by one."""
+        canvas = Canvas(dict(self.CONFIG, **config))
+        for row in self._rows(self.COLUMNS[shape_type]):
+            canvas.add_shape(dict(row, type=shape_type))
+        return canvas
+    
+    def _batch(self, shape_type, **config):
+        """Build a canvas with the batch of a shape type."""
+        return Canvas(dict(self.CONFIG, **config)).add_batch(shape_type, **self.COLUMNS[shape_type])
+    
+    @pytest.mark.parametrize("shape_type", ["circle", "rectangle", "straight_line"])
+    def test_batch_matches_single_shapes(self, shape_type):
+        """Test that a batch draws exactly like its shapes added one by one."""
+        batch = render_both(self._single(shape_type), self._batch(shape_type))
+        assert batch.get_canvas_info()["shapes_count"] == 1
+        assert len(batch._shapes[0]) == len(self._rows(self.COLUMNS[shape_type]))
+    
+    def test_batch_without_numpy(self, monkeypatch):
+        """Test that batches fall back to plain Python columns."""
+        monkeypatch.setattr(geometry, "np", None)
+        batch = render_both(self._single("circle"), self._batch("circle"))
+        assert isinstance(batch._shapes[0].params.center, list)
+    
+    def test_batch_is_one_display_list_entry(self):
+        """Test that the display list keeps the batch instead of one primitive per shape."""
+        batch = self._batch("circle")
+        assert len(batch.compile()) == 1
+        assert batch.rasterize((600, 400)).tobytes() == self._single("circle").rasterize((600, 400)).tobytes()
+    
+    def test_batch_tiled_rendering(self):
+        """Test that batches render identically across tiles."""
+        render_both(self._single("straight_line"), self._batch("straight_line", tile_size=64, workers=2))
+    
+    def test_batch_from_configuration(self):
+        """Test that batches can be given as shapes in a configuration."""
+        config = dict(self.CONFIG, shapes=[dict(self.COLUMNS["circle"], type="shape_batch", shape="circle")])
+        canvas = render_both(self._single("circle"), Canvas(config))
+        assert canvas.memory_report()["ShapeBatch[circle]"]["count"] == 4
+    
+    def test_batch_memory(self):
+        """Test that batched shapes take a few dozen bytes each."""
+        canvas = Canvas(dict(self.CONFIG)).add_batch(
+            "circle", center=[[i % 300, i % 200] for i in range(10000)], radius=3,
+            fill_color=[255, 0, 0])
+        report = canvas.memory_report()
+        assert report["ShapeBatch[circle]"]["count"] == 10000
+        assert report["total"]["bytes_per_shape"] < 64
+    
+    @pytest.mark.parametrize("shape_type, columns", [
+        ("circle", {"center": [[1, 2]], "radius": [0]}),
+        ("circle", {"center": [[1, 2]], "radius": [5], "fill_color": [[256, 0, 0]]}),
+        ("circle", {"center": [[1, 2], [3, 4]], "radius": [5, 6, 7]}),
+        ("circle", {"center": [[1, 2]], "radius": [5], "size": [3]}),
+        ("straight_line", {"start": [[1, 2]], "end": [[3, 4]]}),
+        ("heart", {"center": [[1, 2]], "size": [5]}),
+        ("circle", {"center": [400, 300], "radius": 5}),
+        ("rectangle", {"start": [1, 2], "end": [[3, 4], [5, 6]]}),
+    ])
+    def test_invalid_batches(self, shape_type, columns):
+        """Test that invalid batch columns are rejected."""
+        with pytest.raises(DrawingError):
+            Canvas(dict(self.CONFIG)).add_batch(shape_type, **columns)
+    
+    @pytest.mark.parametrize("use_numpy", [True, False])
+    def test_single_row_is_one_shape(self, monkeypatch, use_numpy):
+        """Test that a batch of one shape needs its first column as a list of rows."""
+        if use_numpy:
+            np = pytest.importorskip("numpy")
+            centers = np.array([[40, 30]])
+            with pytest.raises(DrawingError):
+                Canvas(dict(self.CONFIG)).add_batch("circle", center=np.array([40, 30]), radius=5)
+        else:
+            monkeypatch.setattr(geometry, "np", None)
+            centers = [[40, 30]]
+        canvas = Canvas(dict(self.CONFIG)).add_batch("circle", center=centers, radius=5)
+        assert canvas.memory_report()["ShapeBatch[circle]"]["count"] == 1
+
+    @pytest.mark.parametrize("use_numpy", [True, False])
+    def test_rectangle_bounds_include_wide_borders(self, monkeypatch, use_numpy):
+        """Test that batch bounds grow with borders wider than the rectangles, like single shapes."""
+        if not use_numpy:
+            monkeypatch.setattr(geometry, "np", None)
+        columns = {"start": [[100, 100], [200, 50]], "end": [[120, 110], [210, 90]], "border_width": [40, 1]}
+        batch = ShapeFactory.create_shape(dict(columns, type="shape_batch", shape="rectangle"))
+        boxes = [ShapeFactory.create_shape(dict(row, type="rectangle")).bounds() for row in self._rows(columns)]
+        assert batch.bounds() == (min(box[0] for box in boxes), min(box[1] for box in boxes),
+                                  max(box[2] for box in boxes), max(box[3] for box in boxes))
+
+
+class TestRasterBackend:
+    """Test cases for the NumPy raster backend."""
+    
+    CONFIG = {"canvas_size": [300, 200], "background_color": [255, 255, 255]}
+    
+    @staticmethod
+    def _random_shapes(count, kinds=("circle", "rectangle"), seed=0):
+        """Create overlapping circles and rectangles, some crossing the canvas edges."""
+        import random
+        rng = random.Random(seed)
+        shapes = []
+        for _ in range(count):
+            style = {"fill_color": [rng.randrange(256) for _ in range(3)],
+                     "outline_color": [rng.randrange(256) for _ in range(3)],
+                     "border_width": rng.randrange(0, 5)}
+            x, y = rng.randrange(-20, 320), rng.randrange(-20, 220)
+            if rng.choice(kinds) == "circle":
+                shapes.append(dict(style, type="circle", center=[x, y], radius=rng.randrange(1, 40)))
+            else:
+                shapes.append(dict(style, type="rectangle", start=[x, y],
+                                   end=[x + rng.randrange(0, 60), y + rng.randrange(0, 60)]))
+        return shapes
+    
+    def _raster(self, shapes):
+        """Render shapes with the raster backend, checking them against ImageDraw."""
+        pytest.importorskip("numpy")
+        return render_both(Canvas(dict(self.CONFIG, shapes=shapes)),
+                           Canvas(dict(self.CONFIG, shapes=shapes, raster_backend="numpy")))
+    
+    def test_rectangles_match_imagedraw(self, monkeypatch):
+        """Test that rectangles are drawn exactly like ImageDraw draws them."""
+        from shape_canvas import raster
+        
+        windows = []
+        draw_window = raster._draw_window
+        monkeypatch.setattr(raster, "_draw_window",
+                            lambda image, styles, box: windows.append(len(styles)) or draw_window(image, styles, box))
+        canvas = self._raster(self._random_shapes(300, kinds=("rectangle",)))
+        assert canvas.get_image().mode == "RGB"
+        assert windows
+    
+    def test_circles_match_imagedraw(self):
+        """Test that circles mixed with rectangles are drawn exactly like ImageDraw draws them."""
+        self._raster(self._random_shapes(300))
+    
+    def test_other_shapes_keep_drawing_order(self):
+        """Test that shapes drawn by Pillow interleave correctly with rasterized ones."""
+        shapes = self._random_shapes(20, kinds=("rectangle",))
+        shapes.insert(10, {"type": "triangle", "point1": [0, 0], "point2": [300, 0], "point3": [150, 200],
+                           "fill_color": [0, 128, 0]})
+        self._raster(shapes)
+    
+    def test_batches_use_backend(self):
+        """Test that batches drawn from their columns match ImageDraw."""
+        pytest.importorskip("numpy")
+        columns = {"start": [[i % 290, (i * 7) % 190] for i in range(500)],
+                   "end": [[i % 290 + 9, (i * 7) % 190 + 9] for i in range(500)],
+                   "fill_color": [[i % 256, 0, 255 - i % 256] for i in range(500)], "border_width": 2}
+        render_both(Canvas(dict(self.CONFIG)).add_batch("rectangle", **columns),
+                    Canvas(dict(self.CONFIG, raster_backend="numpy")).add_batch("rectangle", **columns))
+        
+        columns = {"center": columns["start"], "radius": 6, "fill_color": columns["fill_color"]}
+        render_both(Canvas(dict(self.CONFIG)).add_batch("circle", **columns),
+                    Canvas(dict(self.CONFIG, raster_backend="numpy")).add_batch("circle", **columns))
+    
+    def test_batch_tiles_keep_order_across_edges(self, monkeypatch):
+        """Test that batch shapes crossing tile edges are drawn in every tile, in order."""
+        pytest.importorskip("numpy")
+        from shape_canvas import raster
+    
+        tiles = []
+        draw_tile = raster._draw_tile
+        monkeypatch.setattr(raster, "TILE_SIZE", 64)
+        monkeypatch.setattr(raster, "_draw_tile",
+                            lambda image, box, index, columns: tiles.append(box) or draw_tile(image, box, index, columns))
+        columns = {"center": [[(i * 37) % 300, (i * 23) % 200] for i in range(400)],
+                   "radius": [i % 12 + 1 for i in range(400)],
+                   "fill_color": [[i % 256, 0, 255 - i % 256] for i in range(400)], "border_width": 2}
+        render_both(Canvas(dict(self.CONFIG)).add_batch("circle", **columns),
+                    Canvas(dict(self.CONFIG, raster_backend="numpy")).add_batch("circle", **columns))
+        assert len(tiles) == 20
+        assert all(box[2] - box[0] <= 64 and box[3] - box[1] <= 64 for box in tiles)
+    
+    def test_scattered_shapes_split_windows(self, monkeypatch):
+        """Test that primitives drawn through separate canvas windows keep their order."""
+        from shape_canvas import raster
+        
+        windows = []
+        draw_window = raster._draw_window
+        monkeypatch.setattr(raster, "WINDOW_COST_PIXELS", 16)
+        monkeypatch.setattr(raster, "_draw_window",
+                            lambda image, styles, box: windows.append(len(styles)) or draw_window(image, styles, box))
+        self._raster(self._random_shapes(300))
+        assert len(windows) > 1 and sum(windows) <= 300
+    
+    def test_pixels_are_a_snapshot(self):
+        """Test that the pixel array copies the canvas without sharing its memory."""
+        pytest.importorskip("numpy")
+        canvas = Canvas(dict(self.CONFIG, raster_backend="numpy"))
+        canvas.add_shape({"type": "rectangle", "start": [10, 10], "end": [20, 20],
+                          "fill_color": [255, 0, 0]}).render()
+        pixels = canvas.pixels()
+        assert pixels.shape == (200, 300, 3)
+        assert pixels[15, 15].tolist() == [255, 0, 0]
+        assert pixels.tobytes() == canvas.get_image().tobytes()
+        
+        pixels[100:110, 100:110] = (0, 0, 255)
+        assert canvas.get_image().getpixel((105, 105)) == (255, 255, 255)
+    
+    def test_invalid_backend_configuration(self, monkeypatch):
+        """Test that the backend needs NumPy, a known name and untiled rendering."""
+        pytest.importorskip("numpy")
+        with pytest.raises(DrawingError):
+            Canvas(dict(self.CONFIG)).pixels()
+        with pytest.raises(ValidationError):
+            CanvasConfig(size=(10, 10), background_color=(0, 0, 0), raster_backend="cuda")
+        with pytest.raises(ValidationError):
+            Canvas(dict(self.CONFIG, raster_backend="numpy")).set_tiling(64)
+        monkeypatch.setattr(geometry, "np", None)
+        with pytest.raises(ValidationError):
+            CanvasConfig(size=(10, 10), background_color=(0, 0, 0), raster_backend="numpy")
+
+
+class TestAntialiasing:
+    """Test cases for supersampled anti-aliasing."""
+    
+    CONFIG = {"canvas_size": [300, 200], "background_color": [255, 255, 255]}
+    
+    SHAPES = [
+        {"type": "circle", "center": [60, 60], "radius": 40, "fill_color": [255, 0, 0],
+         "outline_color": [0, 0, 0], "border_width": 2},
+        {"type": "triangle", "point1": [120, 20], "point2": [280, 60], "point3": [150, 180],
+         "fill_color": [0, 0, 255]},
+        {"type": "straight_line", "start": [0, 190], "end": [300, 120], "fill_color": [0, 128, 0],
+         "border_width": 3},
+    ]
+    
+    def test_edges_are_blended(self):
+        """Test that anti-aliasing only changes pixels near shape edges, blending colors."""
+        aliased = Canvas(dict(self.CONFIG, shapes=self.SHAPES)).render().get_image()
+        smooth = Canvas(dict(self.CONFIG, shapes=self.SHAPES, antialias=4)).render().get_image()
+        
+        assert len(smooth.getcolors(65536)) > 10 * len(aliased.getcolors(65536))
+        assert smooth.getpixel((60, 60)) == aliased.getpixel((60, 60)) == (255, 0, 0)
+        assert smooth.getpixel((180, 80)) == aliased.getpixel((180, 80)) == (0, 0, 255)
+        unchanged = ImageChops.difference(aliased, smooth).convert("L").histogram()[0]
+        assert unchanged > 0.9 * 300 * 200
+    
+    def test_pixel_aligned_rectangles_are_unchanged(self):
+        """Test that rectangles on whole pixels draw exactly as without anti-aliasing."""
+        shapes = [{"type": "rectangle", "start": [10 + 30 * i, 20], "end": [30 + 30 * i, 150 - 10 * i],
+                   "fill_color": [40 * i, 100, 200], "outline_color": [0, 0, 0], "border_width": i}
+                  for i in range(6)]
+        aliased = Canvas(dict(self.CONFIG, shapes=shapes)).render().get_image()
+        smooth = Canvas(dict(self.CONFIG, shapes=shapes, antialias=3)).render().get_image()
+        assert smooth.tobytes() == aliased.tobytes()
+    
+    def test_incremental_and_region_renders_match(self):
+        """Test that renders in steps and region renders match a single render."""
+        config = dict(self.CONFIG, antialias=2, tile_size=64)
+        full = Canvas(dict(config, shapes=self.SHAPES)).render().get_image()
+        
+        steps = Canvas(dict(config, shapes=self.SHAPES[:1])).render()
+        steps.add_shapes(self.SHAPES[1:]).render()
+        assert steps.get_image().tobytes() == full.tobytes()
+        
+        steps.render(region=(50, 40, 170, 130))
+        assert steps.get_image().tobytes() == full.tobytes()
+    
+    def test_only_one_tile_is_supersampled_at_a_time(self, monkeypatch):
+        """Test that the largest enlarged image is one tile at the supersampling factor."""
+        sizes = []
+        resize = Image.Image.resize
+        
+        def record(image, size, *args, **kwargs):
+            sizes.append(size)
+            return resize(image, size, *args, **kwargs)
+        
+        monkeypatch.setattr(Image.Image, "resize", record)
+        Canvas(dict(self.CONFIG, shapes=self.SHAPES, antialias=4, tile_size=100)).render()
+        assert sizes and max(width * height for width, height in sizes) == 400 * 400
+    
+    def test_set_antialias_validates_factor(self):
+        """Test that the supersampling factor must be a small positive integer."""
+        canvas = Canvas(dict(self.CONFIG)).set_antialias(2)
+        assert canvas.get_canvas_info()["antialias"] == 2
+        for factor in (0, 9, 2.5, True):
+            with pytest.raises(ValidationError):
+                canvas.set_antialias(factor)
+
+
+class TestStreaming:
+    """Test cases for streaming shapes from large files."""
+    
+    CONFIG = {"canvas_size": [200, 150], "background_color": [255, 255, 255],
+              "line_interval": 50, "show_grid": True}
+    
+    SHAPES = [
+        {"type": "circle", "center": [50, 50], "radius": 30, "fill_color": [255, 0, 0]},
+        {"type": "rectangle", "start": [40, 40], "end": [150, 120], "fill_color": [0, 0, 255],
+         "outline_color": [0, 0, 0], "border_width": 2},
+        {"type": "straight_line", "start": [0, 140], "end": [200, 10], "fill_color": [0, 128, 0],
+         "border_width": 3},
+        {"type": "circle", "center": [500, 500], "radius": 10},
+    ]
+    
+    def expected(self):
+        return Canvas(dict(self.CONFIG, shapes=self.SHAPES)).render().get_image()
+    
+    def test_render_stream_matches_render_without_keeping_shapes(self, tmp_path):
+        """Test that streamed NDJSON shapes draw like loaded shapes and are not kept."""
+        path = tmp_path / "shapes.ndjson"
+        path.write_text("\n".join(json.dumps(shape) for shape in self.SHAPES) + "\n\n")
+        
+        canvas = Canvas(dict(self.CONFIG)).add_grid().render_stream(path, chunk_shapes=2)
+        info = canvas.get_canvas_info()
+        assert canvas.get_image().tobytes() == self.expected().tobytes()
+        assert info["shapes_count"] == 0
+        assert info["streamed_count"] == 4
+        assert info["culled_count"] == 1
+    
+    def test_config_shapes_are_parsed_across_chunks(self, tmp_path):
+        """Test that a config's shapes array is read incrementally whatever the chunk size."""
+        from shape_canvas.stream import iter_shapes, load_settings
+        
+        path = tmp_path / "config.json"
+        path.write_text(json.dumps(dict(self.CONFIG, shapes=self.SHAPES, line_color="gray"), indent=1))
+        for chunk_size in (1, 7, 4096):
+            assert list(iter_shapes(path, chunk_size)) == self.SHAPES
+            assert load_settings(path, chunk_size) == dict(self.CONFIG, line_color="gray")
+        
+        canvas = Canvas(load_settings(path)).add_grid().render_stream(path)
+        assert canvas.get_image().tobytes() == self.expected().tobytes()
+    
+    def test_stream_draws_over_stored_shapes_in_order(self):
+        """Test that stored shapes are drawn before streamed ones and invalid shapes are skipped."""
+        canvas = Canvas(dict(self.CONFIG, shapes=self.SHAPES[:1]))
+        canvas.render_stream(iter([self.SHAPES[1], {"type": "nonexistent"}] + self.SHAPES[2:]))
+        assert canvas.get_image().tobytes() == self.expected().tobytes()
+        assert canvas.get_canvas_info()["streamed_count"] == 3
+    
+    def test_invalid_json_raises(self, tmp_path):
+        """Test that malformed files raise configuration errors."""
+        from shape_canvas.stream import iter_shapes
+        
+        path = tmp_path / "broken.json"
+        path.write_text('{"shapes": [{"type": "circle"} {"type": "circle"}]}')
+        with pytest.raises(ConfigurationError):
+            list(iter_shapes(path))
+        with pytest.raises(ConfigurationError):
+            list(iter_shapes(tmp_path / "missing.ndjson"))
+
+
+class TestOpacityAndBlending:
+    """Test cases for per-shape opacity and blend modes."""
+    
+    CONFIG = {"canvas_size": [200, 120], "background_color": [255, 255, 255]}
+    
+    BACKDROP = {"type": "rectangle", "start": [0, 0], "end": [99, 119], "fill_color": [200, 100, 40]}
+    
+    OVERLAYS = [
+        {"type": "circle", "center": [90, 60], "radius": 45, "fill_color": [30, 60, 250],
+         "outline_color": [0, 0, 0], "border_width": 2, "opacity": 0.5},
+        {"type": "star", "center": [150, 50], "size": 40, "num_points": 5, "fill_color": [250, 200, 0],
+         "opacity": 0.75, "blend_mode": "multiply"},
+        {"type": "moon", "center": [60, 90], "radius": 25, "phase_offset": 30, "opacity": 0.6,
+         "blend_mode": "screen"},
+    ]
+    
+    def _render(self, shapes, **config):
+        return Canvas(dict(self.CONFIG, shapes=shapes, **config)).render().get_image()
+    
+    @pytest.mark.parametrize("mode, expected", [
+        ("normal", (115, 80, 145)),
+        ("multiply", (111, 61, 39)),
+        ("screen", (204, 119, 146)),
+        ("darken", (115, 80, 40)),
+        ("lighten", (200, 100, 145)),
+        ("add", (215, 130, 148)),
+    ])
+    def test_blend_modes(self, mode, expected):
+        """Test the colors each blend mode gives over a backdrop at half opacity."""
+        overlay = {"type": "rectangle", "start": [50, 20], "end": [150, 100], "fill_color": [30, 60, 250],
+                   "opacity": 0.5, "blend_mode": mode}
+        image = self._render([self.BACKDROP, overlay])
+        assert image.getpixel((75, 60)) == expected
+        assert image.getpixel((10, 60)) == (200, 100, 40)
+    
+    def test_numpy_and_pillow_blends_match(self, monkeypatch):
+        """Test that blending without NumPy gives the same pixels."""
+        pytest.importorskip("numpy")
+        shapes = [self.BACKDROP] + self.OVERLAYS + [
+            dict(self.OVERLAYS[0], center=[140, 70], blend_mode=mode) for mode in ("darken", "lighten", "add")]
+        with_numpy = self._render(shapes)
+        monkeypatch.setattr(geometry, "np", None)
+        assert self._render(shapes).tobytes() == with_numpy.tobytes()
+    
+    def test_opaque_shapes_draw_as_before(self):
+        """Test that full opacity draws directly and zero opacity draws nothing."""
+        plain = [self.BACKDROP, {k: v for k, v in self.OVERLAYS[0].items() if k != "opacity"}]
+        expected = self._render(plain)
+        assert self._render([self.BACKDROP, dict(plain[1], opacity=1)]).tobytes() == expected.tobytes()
+        assert self._render([self.BACKDROP, dict(plain[1], opacity=0)]).tobytes() == \
+            self._render([self.BACKDROP]).tobytes()
+    
+    def test_tiled_region_and_raster_renders_match(self):
+        """Test that every render path composites translucent shapes the same way."""
+        shapes = [self.BACKDROP] + self.OVERLAYS
+        expected = self._render(shapes)
+        assert self._render(shapes, tile_size=48, workers=2).tobytes() == expected.tobytes()
+        
+        canvas = Canvas(dict(self.CONFIG, shapes=shapes)).render()
+        canvas.render(region=(40, 30, 170, 110))
+        assert canvas.get_image().tobytes() == expected.tobytes()
+        
+        if geometry.has_numpy():
+            assert self._render(shapes, raster_backend="numpy").tobytes() == expected.tobytes()
+    
+    def test_translucent_shapes_do_not_occlude(self):
+        """Test that shapes below a translucent panel are not culled."""
+        panel = {"type": "rectangle", "start": [0, 0], "end": [199, 119], "fill_color": [0, 0, 0],
+                 "opacity": 0.3}
+        canvas = Canvas(dict(self.CONFIG, shapes=[self.BACKDROP, panel], occlusion_culling=True)).render()
+        assert canvas.get_canvas_info()["occluded_count"] == 0
+        assert canvas.get_image().getpixel((10, 10)) == (140, 70, 28)
+    
+    def test_antialiased_translucent_shapes(self):
+        """Test that supersampling keeps translucent interiors at the blended color."""
+        image = self._render([self.BACKDROP] + self.OVERLAYS[:1], antialias=2)
+        assert image.getpixel((90, 60)) == self._render([self.BACKDROP] + self.OVERLAYS[:1]).getpixel((90, 60))
+    
+    @pytest.mark.parametrize("key, value", [
+        ("opacity", 1.5), ("opacity", -0.1), ("opacity", True), ("opacity", "half"),
+        ("blend_mode", "overlay"), ("blend_mode", None),
+    ])
+    def test_invalid_compositing_settings(self, key, value):
+        """Test rejection of invalid opacity and blend mode values."""
+        canvas = Canvas(dict(self.CONFIG))
+        with pytest.raises(DrawingError):
+            canvas.add_shape(dict(self.OVERLAYS[0], **{key: value}))
+
+
+class TestSpriteCache:
+    """Test cases for stamping repeated shapes from cached sprites."""
+    
+    CONFIG = {"canvas_size": [300, 200], "background_color": [255, 255, 255], "sprite_cache": True}
+    
+    FLOWER = {"type": "flower", "petal_size": 20, "num_petals": 6, "fill_color": [200, 100, 250],
+              "outline_color": [0, 0, 0], "border_width": 1}
+    
+    SUN = {"type": "sun", "radius": 12, "ray_length": 8, "num_rays": 8, "outline_color": [0, 0, 0],
+           "border_width": 1}
+    
+    CENTERS = [[40, 40], [150, 60], [260, 150], [90, 170], [5, 100]]
+    
+    @pytest.fixture(autouse=True)
+    def empty_cache(self):
+        sprite_cache.clear()
+        yield
+        sprite_cache.clear()
+    
+    def _shapes(self):
+        return [dict(shape, center=center) for center in self.CENTERS for shape in (self.FLOWER, self.SUN)]
+    
+    def test_repeated_shapes_hit_the_cache(self):
+        """Test that each distinct shape is drawn once and stamped afterwards."""
+        canvas = Canvas(dict(self.CONFIG, shapes=self._shapes())).render()
+        info = canvas.get_canvas_info()["sprites"]
+        assert (info["misses"], info["hits"]) == (2, 8)
+        assert info["hit_rate"] == 0.8
+        assert info["size"] == 2 and info["bytes"] > 0
+    
+    def test_copies_are_identical(self):
+        """Test that every stamped copy has exactly the same pixels."""
+        image = Canvas(dict(self.CONFIG, shapes=[dict(self.SUN, center=c) for c in self.CENTERS[:3]])) \
+            .render().get_image()
+        crops = [image.crop((x - 25, y - 25, x + 25, y + 25)).tobytes() for x, y in self.CENTERS[:3]]
+        assert crops[0] == crops[1] == crops[2]
+    
+    def test_stamps_match_drawn_shapes_up_to_edge_pixels(self):
+        """Test that stamped flowers only differ from flowers drawn in place at petal edges."""
+        shapes = [dict(self.FLOWER, center=center) for center in self.CENTERS[:4]]
+        drawn = Canvas(dict(self.CONFIG, shapes=shapes, sprite_cache=False)).render().get_image()
+        stamped = Canvas(dict(self.CONFIG, shapes=shapes)).render().get_image()
+        changed = 300 * 200 - ImageChops.difference(stamped, drawn).convert("L").histogram()[0]
+        painted = 300 * 200 - ImageChops.difference(drawn, Image.new("RGB", (300, 200), "white")) \
+            .convert("L").histogram()[0]
+        assert changed < 0.1 * painted
+        assert stamped.getpixel((150, 60)) == drawn.getpixel((150, 60)) == (255, 255, 0)
+    
+    def test_render_paths_agree(self):
+        """Test that tiled and region renders stamp the same sprites."""
+        canvas = render_both(Canvas(dict(self.CONFIG, shapes=self._shapes())),
+                             Canvas(dict(self.CONFIG, shapes=self._shapes(), tile_size=64, workers=2)))
+        expected = canvas.get_image().copy()
+        canvas.render(region=(30, 30, 200, 120))
+        assert canvas.get_image().tobytes() == expected.tobytes()
+        
+        # Supersampling draws the shapes themselves rather than enlarged sprites
+        render_both(Canvas(dict(self.CONFIG, shapes=self._shapes(), antialias=2, sprite_cache=False)),
+                    Canvas(dict(self.CONFIG, shapes=self._shapes(), antialias=2)))
+    
+    def test_memory_is_bounded(self, monkeypatch):
+        """Test that least recently used sprites are evicted over the byte budget."""
+        monkeypatch.setattr(sprite_cache, "max_bytes", 6000)
+        shapes = [dict(self.FLOWER, center=[40, 40], petal_size=size) for size in (20, 21, 22, 20)]
+        Canvas(dict(self.CONFIG, shapes=shapes)).render()
+        info = sprite_cache.info()
+        assert info["evictions"] > 0
+        assert info["bytes"] <= 6000 or info["size"] == 1
+    
+    def test_cache_is_off_by_default(self):
+        """Test that shapes are drawn in place unless sprite_cache is set."""
+        Canvas(dict(self.CONFIG, shapes=self._shapes(), sprite_cache=False)).render()
+        assert sprite_cache.info()["misses"] == 0
+        with pytest.raises(ValidationError):
+            Canvas(dict(self.CONFIG, sprite_cache="yes"))
+
+
+class TestInstances:
+    """Test cases for one template shape placed at many offsets."""
+    
+    CONFIG = {"canvas_size": [300, 200], "background_color": [255, 255, 255]}
+    
+    CIRCLE = {"type": "circle", "center": [10, 10], "radius": 8, "fill_color": [0, 120, 255],
+              "outline_color": [0, 0, 0], "border_width": 2}
+    
+    STAR = {"type": "star", "center": [0, 0], "size": 15, "fill_color": [255, 200, 0],
+            "outline_color": [0, 0, 0], "border_width": 1}
+    
+    HEART = {"type": "heart", "center": [0, 0], "size": 1, "fill_color": [255, 0, 100],
+             "outline_color": [0, 0, 0], "border_width": 1}
+    
+    OFFSETS = [[20, 30], [150, 60], [260, 150], [90.5, 170], [-30, 100], [400, 400]]
+    
+    @pytest.fixture(autouse=True)
+    def empty_cache(self):
+        sprite_cache.clear()
+        yield
+        sprite_cache.clear()
+    
+    def _placed(self, template, offsets=None):
+        x, y = template["center"]
+        return [dict(template, center=[x + dx, y + dy]) for dx, dy in (offsets or self.OFFSETS)]
+    
+    def test_matches_separate_shapes(self):
+        """Test that instances draw like the same shapes added one by one."""
+        canvas = render_both(Canvas(dict(self.CONFIG, shapes=self._placed(self.CIRCLE))),
+                             Canvas(self.CONFIG).add_instances(self.CIRCLE, self.OFFSETS))
+        assert canvas.get_canvas_info()["shapes_count"] == 1
+    
+    def test_overrides(self):
+        """Test that per-instance fill colors and rotations replace the template's."""
+        colors = [[i * 40, 0, 0] for i in range(len(self.OFFSETS))]
+        rotations = [i * 10 for i in range(len(self.OFFSETS))]
+        shapes = [dict(shape, fill_color=color, rotation_angle=rotation) for shape, color, rotation
+                  in zip(self._placed(self.HEART), colors, rotations)]
+        # Placements are stamped from sprites, like separate shapes with the cache on
+        canvas = render_both(Canvas(dict(self.CONFIG, shapes=shapes, sprite_cache=True)),
+                             Canvas(dict(self.CONFIG, sprite_cache=True, shapes=[
+                                 {"type": "instances", "template": self.HEART, "offsets": self.OFFSETS,
+                                  "fill_colors": colors, "rotations": rotations}])))
+        assert canvas.get_image().getpixel((150, 60)) == (40, 0, 0)
+    
+    @pytest.mark.parametrize("raster_backend", [None, "numpy"])
+    @pytest.mark.parametrize("template", [
+        CIRCLE,
+        {"type": "circle", "center": [10, 10], "radius": 8, "fill_color": [0, 120, 255]},
+        {"type": "rectangle", "start": [0, 0], "end": [12, 7], "fill_color": [0, 200, 0],
+         "outline_color": [0, 0, 0], "border_width": 3},
+    ])
+    def test_circles_and_rectangles_draw_as_batch(self, template, raster_backend, monkeypatch):
+        """Test that circle and rectangle placements are drawn from batch columns."""
+        if raster_backend:
+            pytest.importorskip("numpy")
+        offsets = self.OFFSETS[:3] + self.OFFSETS[4:]
+        colors = [[i * 40, 0, 0] for i in range(len(offsets))]
+        shapes = []
+        for (dx, dy), color in zip(offsets, colors):
+            shape = dict(template, fill_color=color)
+            for name in ("center", "start", "end"):
+                if name in shape:
+                    shape[name] = [shape[name][0] + dx, shape[name][1] + dy]
+            shapes.append(shape)
+        config = dict(self.CONFIG, raster_backend=raster_backend)
+
+        monkeypatch.setattr(ShapeInstances, "instance", lambda self, index: pytest.fail("copied"))
+        canvas = render_both(Canvas(dict(config, shapes=shapes)),
+                             Canvas(config).add_instances(template, offsets, fill_colors=colors))
+        assert canvas._shapes[0].batch is not None
+        expected = canvas.get_image().copy()
+        canvas.render(region=(0, 0, 100, 100))
+        assert canvas.get_image().tobytes() == expected.tobytes()
+
+    def test_placements_are_measured_once(self, monkeypatch):
+        """Test that rotated placements are not copied again to find their bounds."""
+        shape = ShapeFactory.create_shape({"type": "instances", "template": self.HEART,
+                                           "offsets": self.OFFSETS, "rotations": [10] * len(self.OFFSETS)})
+        calls = []
+        instance = ShapeInstances.instance
+        monkeypatch.setattr(ShapeInstances, "instance",
+                            lambda self, index: calls.append(index) or instance(self, index))
+        shape.bounds()
+        shape.draw(Image.new("RGB", (300, 200)))
+        # Only the placements on the canvas are copied, to be drawn
+        assert len(calls) == 4
+
+    def test_copies_are_stamped(self):
+        """Test that placements of one template share a single sprite."""
+        Canvas(dict(self.CONFIG, sprite_cache=True)).add_instances(self.STAR, self.OFFSETS[:3]).render()
+        info = sprite_cache.info()
+        assert (info["misses"], info["hits"]) == (1, 2)
+    
+    def test_sprites_follow_canvas_setting(self):
+        """Test that placements are drawn in place unless sprite_cache is set."""
+        render_both(Canvas(dict(self.CONFIG, shapes=self._placed(self.STAR))),
+                    Canvas(self.CONFIG).add_instances(self.STAR, self.OFFSETS))
+        assert sprite_cache.info()["misses"] == 0
+    
+    def test_polygon_coordinates_are_moved(self):
+        """Test that polygon coordinates move with their instance."""
+        polygon = {"type": "polygon_with_coordinates", "coordinates": [[0, 0], [20, 0], [10, 15]],
+                   "fill_color": [0, 150, 0]}
+        shapes = [dict(polygon, coordinates=[[x + dx, y + dy] for x, y in polygon["coordinates"]])
+                  for dx, dy in self.OFFSETS]
+        canvas = render_both(Canvas(dict(self.CONFIG, shapes=shapes)),
+                             Canvas(self.CONFIG).add_instances(polygon, self.OFFSETS))
+        assert canvas.get_image().getpixel((160, 63)) == (0, 150, 0)
+    
+    def test_render_paths_agree(self):
+        """Test that tiled and region renders draw the visible placements only."""
+        canvas = render_both(Canvas(self.CONFIG).add_instances(self.STAR, self.OFFSETS),
+                             Canvas(dict(self.CONFIG, tile_size=64, workers=2)).add_instances(
+                                 self.STAR, self.OFFSETS))
+        expected = canvas.get_image().copy()
+        canvas.render(region=(100, 40, 200, 90))
+        assert canvas.get_image().tobytes() == expected.tobytes()
+    
+    def test_numpy_offsets(self):
+        """Test that offsets may be given as a NumPy array."""
+        np = pytest.importorskip("numpy")
+        offsets = np.array(self.OFFSETS[:3], dtype=np.int64)
+        render_both(Canvas(dict(self.CONFIG, shapes=self._placed(self.CIRCLE, self.OFFSETS[:3]))),
+                    Canvas(self.CONFIG).add_instances(self.CIRCLE, offsets))
+    
+    def test_memory_report_counts_instances(self):
+        """Test that the memory report counts each placement."""
+        report = Canvas(self.CONFIG).add_instances(self.CIRCLE, self.OFFSETS).memory_report()
+        assert report["ShapeInstances[Circle]"]["count"] == len(self.OFFSETS)
+    
+    def test_invalid_instances(self):
+        """Test that the template and the per-instance arrays are validated."""
+        canvas = Canvas(self.CONFIG)
+        with pytest.raises(DrawingError):
+            canvas.add_instances(dict(self.CIRCLE, radius=0), self.OFFSETS)
+        with pytest.raises(DrawingError):
+            canvas.add_instances(self.CIRCLE, [[1, 2, 3]])
+        with pytest.raises(DrawingError):
+            canvas.add_instances(self.CIRCLE, self.OFFSETS, fill_colors=[[0, 0, 0]])
+        with pytest.raises(DrawingError):
+            canvas.add_instances(self.CIRCLE, self.OFFSETS, rotations=[0.5] * len(self.OFFSETS))
+        with pytest.raises(DrawingError):
+            canvas.add_instances({"type": "instances", "template": self.CIRCLE, "offsets": []}, [[0, 0]])
+        with pytest.raises(DrawingError):
+            canvas.add_shape({"type": "instances", "template": self.CIRCLE, "offsets": [], "scale": 2})
+        with pytest.raises(DrawingError):
+            canvas.add_instances(self.STAR, self.OFFSETS, rotations=[0] * len(self.OFFSETS))
+        assert canvas.get_canvas_info()["shapes_count"] == 0
+
+
+class TestBatchJobs:
+    """Test cases for rendering many configuration files in warm worker processes."""
+    
+    CONFIG = {"canvas_size": [120, 80], "background_color": [255, 255, 255], "line_interval": 40,
+              "show_grid": True,
+              "shapes": [{"type": "circle", "center": [60, 40], "radius": 20, "fill_color": [255, 0, 0]}]}
+    
+    def _configs(self, tmp_path):
+        for name in ("a", "b"):
+            (tmp_path / "in" / name).mkdir(parents=True)
+            for i in range(3):
+                config = dict(self.CONFIG, background_color=[i * 50, 255, 255])
+                (tmp_path / "in" / name / f"scene{i}.json").write_text(json.dumps(config))
+        (tmp_path / "in" / "b" / "broken.json").write_text('{"canvas_size": [10')
+        return tmp_path / "in"
+    
+    def test_find_configs(self, tmp_path):
+        """Test that directories, glob patterns and manifests are expanded in order."""
+        from shape_canvas.jobs import find_configs
+        
+        root = self._configs(tmp_path)
+        assert find_configs([root / "a"]) == [root / "a" / f"scene{i}.json" for i in range(3)]
+        assert len(find_configs([str(root / "**" / "*.json")])) == 7
+        
+        manifest = root / "list.txt"
+        manifest.write_text("# nightly\nb/scene2.json\na/scene0.json  # first scene\n\n")
+        assert find_configs([manifest, root / "a" / "scene0.json"]) == [
+            root / "b" / "scene2.json", root / "a" / "scene0.json"]
+        with pytest.raises(ConfigurationError):
+            find_configs([root / "missing"])
+    
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_run_jobs(self, tmp_path, workers):
+        """Test that every config is rendered like the single-file CLI and errors are recorded."""
+        from shape_canvas.jobs import find_configs, plan_jobs, run_jobs
+        
+        root = self._configs(tmp_path)
+        jobs = plan_jobs(find_configs([root / "a", root / "b"]), tmp_path / "out")
+        assert jobs[0].output == tmp_path / "out" / "a" / "scene0.png"
+        
+        finished = []
+        results = run_jobs(jobs, workers=workers, on_result=finished.append)
+        assert [result["index"] for result in results] == list(range(7))
+        assert sorted(result["index"] for result in finished) == list(range(7))
+        
+        broken = results[3]
+        assert broken["config"].endswith("broken.json")
+        assert (broken["status"], broken["error_type"], broken["output"]) == \
+            ("error", "ConfigurationError", None)
+        assert broken["error"].startswith("load: ")
+        
+        ok = [result for result in results if result["status"] == "ok"]
+        assert len(ok) == 6
+        assert all(result["total_ms"] >= result["render_ms"] >= 0 for result in ok)
+        assert ok[0]["size"] == [120, 80] and ok[0]["shapes"] == 1
+        expected = Canvas(dict(self.CONFIG, background_color=[0, 255, 255])).render().get_image()
+        assert Image.open(ok[0]["output"]).tobytes() == expected.tobytes()
+
+    def test_in_process_run_keeps_worker_options(self, tmp_path):
+        """Test that rendering in this process does not change the options later jobs default to."""
+        from shape_canvas import jobs as jobs_module
+
+        root = self._configs(tmp_path)
+        jobs = jobs_module.plan_jobs(jobs_module.find_configs([root / "a"]), tmp_path / "out")
+        before = dict(jobs_module._options)
+        results = jobs_module.run_jobs(jobs, workers=1, format="BMP", no_grid=True)
+        assert jobs_module._options == before
+        assert all(result["status"] == "ok" for result in results)
+        assert Image.open(results[0]["output"]).format == "BMP"
+
+    def test_batch_command_writes_manifest(self, tmp_path):
+        """Test that the batch subcommand writes one manifest record per job and fails on errors."""
+        from shape_canvas.cli import main
+        
+        root = self._configs(tmp_path)
+        with pytest.raises(SystemExit) as exit_info:
+            main(["batch", str(root / "a"), str(root / "b"), "-o", str(tmp_path / "out"),
+                  "--workers", "1", "--format", "BMP"])
+        assert exit_info.value.code == 1
+        
+        records = [json.loads(line) for line in (tmp_path / "out" / "manifest.jsonl").read_text().splitlines()]
+        assert [record["status"] for record in records].count("ok") == 6
+        assert (tmp_path / "out" / "b" / "scene1.bmp").exists()
+        
+        main(["batch", str(root / "a"), "-o", str(tmp_path / "ok"), "--workers", "1",
+              "--manifest", str(tmp_path / "results.jsonl")])
+        assert len((tmp_path / "results.jsonl").read_text().splitlines()) == 3
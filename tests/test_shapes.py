@@ -1,10 +1,20 @@
 """Tests for shape classes."""
 
+import json
+import math
+import pickle
+import random
+from pathlib import Path
+
 import pytest
-from PIL import Image
+from PIL import Image, ImageChops, ImageDraw
 
-from shape_canvas.shapes import ShapeFactory, ShapeType, StraightLine, Rectangle, Circle
-from shape_canvas.exceptions import InvalidShapeError, ValidationError
+from shape_canvas.shapes import (
+    ShapeFactory, ShapeType, BaseShape, StraightLine, Rectangle, Circle, Heart, Star, FractalTree
+)
+from shape_canvas import geometry
+from shape_canvas.displaylist import DisplayList
+from shape_canvas.exceptions import InvalidShapeError, ShapeCanvasError, ValidationError
 
 
 class TestShapeFactory:
@@ -208,4 +218,557 @@ class TestShapeDrawing:
         
         result = shape.draw(canvas)
         assert isinstance(result, Image.Image)
-        assert result.size == (200, 200)
\ No newline at end of file
+        assert result.size == (200, 200)
+
+
+class TestShapeBounds:
+    """Test cases for shape bounds."""
+    
+    CONFIG_FILES = [
+        Path(__file__).parent.parent / "examples" / "all_new_shapes_demo.json",
+        Path(__file__).parent.parent / "config" / "lines_canvas_coordinates_json_data_input_json.json",
+    ]
+    
+    def _example_shapes(self):
+        shapes = []
+        for config_file in self.CONFIG_FILES:
+            with open(config_file, encoding='utf-8') as f:
+                shapes.extend(json.load(f)["shapes"])
+        return shapes
+    
+    def test_all_registered_shapes_report_bounds(self):
+        """Test that every registered shape class overrides bounds()."""
+        for shape_class in ShapeFactory._shape_registry.values():
+            assert shape_class.bounds is not BaseShape.bounds, shape_class.__name__
+    
+    def test_bounds_cover_drawn_pixels(self):
+        """Test that bounds contain every pixel a shape draws."""
+        background = (1, 2, 3)
+        for shape_data in self._example_shapes():
+            shape = ShapeFactory.create_shape(shape_data)
+            canvas = Image.new('RGB', (2200, 2200), background)
+            shape.draw(canvas)
+            
+            drawn = ImageChops.difference(canvas, Image.new('RGB', canvas.size, background)).getbbox()
+            if drawn is None:
+                continue
+            left, top, right, bottom = shape.bounds()
+            assert left <= drawn[0] and top <= drawn[1], shape_data["type"]
+            assert right >= drawn[2] - 1 and bottom >= drawn[3] - 1, shape_data["type"]
+    
+    def _assert_bounds_cover(self, shape_data):
+        """Draw a shape on black and check that its bounds contain every lit pixel."""
+        shape = ShapeFactory.create_shape(shape_data)
+        canvas = Image.new('RGB', (2200, 2200))
+        shape.draw(canvas)
+        drawn = canvas.getbbox()
+        if drawn is None:
+            return
+        left, top, right, bottom = shape.bounds()
+        assert left <= drawn[0] and top <= drawn[1], shape_data
+        assert right >= drawn[2] - 1 and bottom >= drawn[3] - 1, shape_data
+    
+    @pytest.mark.parametrize("shape_data", [
+        {"type": "tree", "base": [400, 370], "height": 30, "crown_width": 146},
+        {"type": "banner_ribbon", "start": [900, 125], "width": 35, "height": 12, "tail_length": 52},
+    ])
+    def test_bounds_cover_unusual_proportions(self, shape_data):
+        """Test bounds of a crown wider than twice the tree and a tail longer than the banner."""
+        self._assert_bounds_cover(dict(shape_data, fill_color=[200, 0, 0], outline_color=[0, 0, 200],
+                                       border_width=2))
+
+    @pytest.mark.parametrize("shape_data", [
+        {"type": "square", "start": [1261, 1261], "size": 99, "border_width": 132},
+        {"type": "rectangle", "start": [600, 600], "end": [640, 700], "border_width": 90},
+        {"type": "speech_bubble_rectangle", "start": [600, 600], "end": [650, 640], "border_width": 70},
+    ])
+    def test_bounds_cover_border_wider_than_shape(self, shape_data):
+        """Test that a border wider than a rectangle, which Pillow paints outside it, is in the bounds."""
+        self._assert_bounds_cover(dict(shape_data, fill_color=[200, 0, 0], outline_color=[0, 0, 200]))
+
+    def test_bounds_cover_randomized_parameters(self):
+        """Test bounds containment with the example shapes' integer parameters randomized."""
+        rng = random.Random(3)
+        for base in self._example_shapes():
+            for _ in range(4):
+                shape_data = {key: rng.randint(1, 4 * value + 50) if type(value) is int else value
+                              for key, value in base.items()}
+                # Colors that show up on black
+                for key in list(shape_data) + ['fill_color', 'outline_color']:
+                    if key.endswith('color'):
+                        shape_data[key] = [rng.randint(1, 255) for _ in range(3)]
+                try:
+                    self._assert_bounds_cover(shape_data)
+                except (ShapeCanvasError, ValueError):
+                    # Parameters the shape rejects, or Pillow cannot draw
+                    continue
+    
+    @pytest.mark.parametrize("shape_data", [
+        {"type": "rectangle", "start": [5, 10], "end": [40, 30], "outline_color": [9, 9, 9], "border_width": 3},
+        {"type": "square", "start": [12, 7], "size": 31},
+        {"type": "circle", "center": [30, 30], "radius": 1},
+        {"type": "circle", "center": [30, 30], "radius": 25, "border_width": 4},
+    ])
+    def test_interior_is_painted(self, shape_data):
+        """Test that every pixel of a shape's interior box is painted."""
+        shape = ShapeFactory.create_shape(dict(shape_data, fill_color=[200, 0, 0]))
+        canvas = Image.new('RGB', (80, 80), (255, 255, 255))
+        shape.draw(canvas)
+        interior = shape.interior()
+        if interior is None:
+            assert shape_data["radius"] < 2
+            return
+        left, top, right, bottom = interior
+        colors = {color for _, color in canvas.crop((left, top, right + 1, bottom + 1)).getcolors()}
+        assert (255, 255, 255) not in colors
+    
+    def test_interior_is_unknown_for_open_shapes(self):
+        """Test that shapes without an opaque area report no interior."""
+        star = Star({"type": "star", "center": [50, 50], "size": 30, "num_points": 5})
+        assert star.interior() is None
+    
+    def test_arrowhead_extends_bounds(self):
+        """Test that arrowheads are included in line bounds."""
+        line = ShapeFactory.create_shape({
+            "type": "straight_line",
+            "start": [0, 50],
+            "end": [100, 50],
+            "fill_color": [0, 0, 0],
+            "border_width": 1
+        })
+        arrow = ShapeFactory.create_shape({
+            "type": "line_with_arrowhead",
+            "start": [0, 50],
+            "end": [100, 50],
+            "fill_color": [0, 0, 0],
+            "border_width": 1,
+            "arrow_size": 20
+        })
+        assert arrow.bounds()[1] < line.bounds()[1] - 5
+
+
+class TestGeometry:
+    """Test cases for NumPy and pure-Python curve sampling."""
+    
+    CURVES = [
+        ("sine_wave", ((10, 100), 500, 40, 3, 500)),
+        ("wave_along_line", ((0, 0), (300, 400), 10, 4, 100)),
+        ("spiral", ((200, 200), 150, 5, 250)),
+        ("helix", ((200, 200), 50, 300, 4, 120)),
+        ("quadratic_bezier", ((0, 0), (50, -80), (100, 0), 50)),
+        ("heart", ((200, 200), 5, 30, 100)),
+    ]
+    
+    SHAPES = [
+        {"type": "sine_wave_pattern", "start": [10, 100], "width": 380, "amplitude": 40,
+         "frequency": 3, "fill_color": [0, 0, 255], "border_width": 2},
+        {"type": "wavy_line", "start": [20, 20], "end": [380, 180], "wave_amplitude": 12,
+         "wave_frequency": 5, "fill_color": [0, 128, 0], "border_width": 2},
+        {"type": "spiral", "center": [100, 100], "max_radius": 80, "turns": 4,
+         "fill_color": [255, 0, 0], "border_width": 1},
+        {"type": "helix", "center": [300, 100], "radius": 40, "height": 160, "turns": 5,
+         "fill_color": [128, 0, 128], "border_width": 1},
+        {"type": "curved_arrow", "start": [50, 180], "end": [350, 180], "curve_height": 60,
+         "arrow_size": 12, "fill_color": [0, 0, 0], "border_width": 2},
+        {"type": "heart", "center": [200, 100], "size": 4, "fill_color": [255, 105, 180],
+         "outline_color": [128, 0, 0], "border_width": 1, "rotation_angle": 15},
+    ]
+    
+    def _render(self):
+        canvas = Image.new('RGB', (400, 200), (255, 255, 255))
+        for shape_data in self.SHAPES:
+            ShapeFactory.create_shape(shape_data).draw(canvas)
+        return canvas
+    
+    def test_backends_agree(self, monkeypatch):
+        """Test that NumPy and pure-Python sampling produce the same points."""
+        pytest.importorskip("numpy")
+        monkeypatch.setattr(geometry, "NUMPY_MIN_POINTS", 0)
+        vectorized = {name: getattr(geometry, name)(*args) for name, args in self.CURVES}
+        
+        monkeypatch.setattr(geometry, "np", None)
+        for name, args in self.CURVES:
+            expected = getattr(geometry, name)(*args)
+            assert len(vectorized[name]) == len(expected), name
+            for (x1, y1), (x2, y2) in zip(vectorized[name], expected):
+                assert abs(x1 - x2) < 1e-9 and abs(y1 - y2) < 1e-9, name
+    
+    def test_shapes_render_without_numpy(self, monkeypatch):
+        """Test that curve shapes draw the same with the pure-Python fallback."""
+        pytest.importorskip("numpy")
+        expected = self._render()
+        
+        monkeypatch.setattr(geometry, "np", None)
+        assert not geometry.has_numpy()
+        assert ImageChops.difference(self._render(), expected).getbbox() is None
+
+
+class TestPolylines:
+    """Test cases for drawing multi-segment lines as single polylines."""
+    
+    def test_one_line_call_per_path(self):
+        """Test that long multi-segment paths are drawn with one line call."""
+        shapes = [
+            {"type": "sine_wave_pattern", "start": [0, 100], "width": 2000, "amplitude": 40,
+             "frequency": 20, "fill_color": [0, 0, 255], "border_width": 2},
+            {"type": "spiral", "center": [500, 500], "max_radius": 300, "turns": 20,
+             "fill_color": [255, 0, 0], "border_width": 1},
+            {"type": "zigzag_line", "start": [0, 50], "end": [900, 50], "zigzag_frequency": 40,
+             "zigzag_height": 10, "fill_color": [0, 0, 0], "border_width": 3},
+            {"type": "elbow_connector", "start": [10, 10], "end": [200, 200],
+             "fill_color": [0, 0, 0], "border_width": 3},
+        ]
+        for shape_data in shapes:
+            ops = DisplayList.compile([ShapeFactory.create_shape(shape_data)], (2000, 1000)).ops
+            assert [op.kind for op in ops] == ["polyline"], shape_data["type"]
+            assert ops[0].extra == "curve"
+    
+    def test_wide_joints_have_no_gaps(self):
+        """Test that the polyline covers every pixel of the separate segments."""
+        shape = ShapeFactory.create_shape({
+            "type": "zigzag_line", "start": [20, 100], "end": [380, 100], "zigzag_frequency": 5,
+            "zigzag_height": 40, "fill_color": [0, 0, 0], "border_width": 9
+        })
+        canvas = shape.draw(Image.new('RGB', (400, 200), (255, 255, 255))).convert('L')
+        
+        segments = Image.new('L', (400, 200), 255)
+        points = DisplayList.compile([shape], (400, 200)).ops[0].xy
+        draw = ImageDraw.Draw(segments)
+        for i in range(len(points) - 1):
+            draw.line([points[i], points[i + 1]], fill=0, width=9)
+        
+        # Every segment pixel is inked, and the joints add pixels
+        assert ImageChops.darker(canvas, segments).tobytes() == canvas.tobytes()
+        assert canvas.histogram()[0] > segments.histogram()[0]
+
+
+class TestShapeParams:
+    """Test cases for parameter records parsed at construction."""
+    
+    def test_record_holds_parsed_values(self):
+        """Test that validated parameters are stored as typed fields."""
+        shape = Circle({"center": [50, 60], "radius": 10, "fill_color": [255, 0, 0],
+                        "outline_color": [0, 0, 0], "border_width": 2})
+        assert shape.params.center == (50, 60)
+        assert shape.params.fill_color == (255, 0, 0)
+        assert shape.params.radius == 10
+        assert type(shape.params).__name__ == "CircleParams"
+    
+    def test_record_is_immutable(self):
+        """Test that parameter records cannot be modified."""
+        shape = StraightLine({"start": [0, 0], "end": [10, 10], "fill_color": [0, 0, 0],
+                              "border_width": 1})
+        with pytest.raises(AttributeError):
+            shape.params.start = (5, 5)
+    
+    def test_draw_reads_parsed_record(self):
+        """Test that drawing uses the data parsed at construction."""
+        shape = Rectangle({"start": [0, 0], "end": [10, 10], "fill_color": [255, 0, 0],
+                           "outline_color": [0, 0, 0]})
+        shape.data["fill_color"] = "not a color"
+        
+        ops = DisplayList.compile([shape], (20, 20)).ops
+        assert ops[0].fill == (255, 0, 0)
+        # Parameters left out keep the defaults draw() asks for
+        assert ops[0].width == 1
+    
+    def test_records_pickle(self):
+        """Test that shapes with parameter records can be sent to worker processes."""
+        shape = Star({"center": [50, 50], "size": 20, "fill_color": [255, 255, 0],
+                      "outline_color": [0, 0, 0], "border_width": 1})
+        copy = pickle.loads(pickle.dumps(shape))
+        assert copy.params == shape.params
+        assert type(copy.params) is type(shape.params)
+
+
+class TestDashPatterns:
+    """Test cases for the dash-pattern engine."""
+    
+    def test_dash_lengths_and_offset(self):
+        """Test that dashes follow the dash array and start at the offset."""
+        dashes = geometry.dash_polyline([(0, 0), (100, 0)], [10, 5])
+        assert [(dash[0][0], dash[-1][0]) for dash in dashes[:2]] == [(0, 10), (15, 25)]
+        assert len(dashes) == 7
+        
+        dashes = geometry.dash_polyline([(0, 0), (100, 0)], [10, 5], offset=12)
+        assert [(dash[0][0], dash[-1][0]) for dash in dashes[:2]] == [(3, 13), (18, 28)]
+    
+    def test_odd_dash_array_repeats(self):
+        """Test that an odd-length dash array is used twice, alternating dashes and gaps."""
+        dashes = geometry.dash_polyline([(0, 0), (30, 0)], [4, 2, 6])
+        assert [(dash[0][0], dash[-1][0]) for dash in dashes] == [(0, 4), (6, 12), (16, 18), (24, 28)]
+    
+    def test_dashes_continue_across_vertices(self):
+        """Test that a dash spanning a corner keeps the corner vertex."""
+        dashes = geometry.dash_polyline([(0, 0), (10, 0), (10, 10)], [15, 2])
+        assert dashes[0] == [(0, 0), (10, 0), (10, 5)]
+        assert dashes[1][0] == (10, 7)
+    
+    def test_numpy_and_python_agree(self, monkeypatch):
+        """Test that both dash implementations produce the same dashes."""
+        points = [(math.cos(i / 5) * i, math.sin(i / 5) * i) for i in range(100)]
+        expected = geometry.dash_polyline(points, [7, 3, 1], offset=4)
+        monkeypatch.setattr(geometry, "np", None)
+        fallback = geometry.dash_polyline(points, [7, 3, 1], offset=4)
+        
+        assert len(fallback) == len(expected)
+        for dash, other in zip(expected, fallback):
+            assert len(dash) == len(other)
+            assert all(math.isclose(a, b, abs_tol=1e-9) for p, q in zip(dash, other) for a, b in zip(p, q))
+    
+    def test_dashed_zigzag(self):
+        """Test that polyline shapes draw one line call per dash."""
+        shape = ShapeFactory.create_shape({
+            "type": "zigzag_line", "start": [0, 50], "end": [400, 50], "zigzag_frequency": 10,
+            "zigzag_height": 10, "fill_color": [0, 0, 0], "border_width": 2, "dash_array": [12, 6]
+        })
+        ops = DisplayList.compile([shape], (400, 100)).ops
+        solid = DisplayList.compile([ShapeFactory.create_shape(
+            {**shape.data, "dash_array": None})], (400, 100)).ops
+        
+        path_length = sum(math.dist(a, b) for a, b in zip(solid[0].xy, solid[0].xy[1:]))
+        assert len(ops) == math.ceil(path_length / 18)
+        assert all(op.kind == "polyline" for op in ops)
+    
+    def test_dashed_line_defaults(self):
+        """Test that a dashed line without a dash array uses equal dashes and gaps."""
+        shape = ShapeFactory.create_shape({
+            "type": "dashed_line", "start": [0, 0], "end": [95, 0], "fill_color": [0, 0, 0],
+            "border_width": 1, "dash_length": 10
+        })
+        ops = DisplayList.compile([shape], (100, 10)).ops
+        assert [op.xy for op in ops][-1] == ((80.0, 0.0), (90.0, 0.0))
+        assert len(ops) == 5
+
+    def test_dashes_paste_through_one_mask(self, monkeypatch):
+        """Test that the dashes of a stroke are drawn into one mask and pasted once."""
+        data = {"type": "zigzag_line", "start": [0, 20], "end": [200, 20], "zigzag_frequency": 5,
+                "zigzag_height": 8, "fill_color": [200, 0, 0], "border_width": 3, "dash_array": [7, 4]}
+        shape = ShapeFactory.create_shape(data)
+        expected = DisplayList.compile([shape], (200, 40)).execute(Image.new('RGB', (200, 40), (255, 255, 255)))
+
+        lines, pastes = [], []
+        line, paste = ImageDraw.ImageDraw.line, Image.Image.paste
+
+        def record_line(draw, *args, **kwargs):
+            lines.append(draw.im.mode)
+            line(draw, *args, **kwargs)
+
+        def record_paste(image, *args, **kwargs):
+            pastes.append(image.mode)
+            paste(image, *args, **kwargs)
+
+        monkeypatch.setattr(ImageDraw.ImageDraw, "line", record_line)
+        monkeypatch.setattr(Image.Image, "paste", record_paste)
+        canvas = shape.draw(Image.new('RGB', (200, 40), (255, 255, 255)))
+
+        assert len(lines) > 1 and set(lines) == {'L'}
+        assert pastes == ['RGB']
+        assert canvas.tobytes() == expected.tobytes()
+
+    def test_invalid_dash_array(self):
+        """Test that dash arrays without any dash length are rejected."""
+        with pytest.raises(ValidationError):
+            StraightLine({"start": [0, 0], "end": [10, 0], "fill_color": [0, 0, 0],
+                          "border_width": 1, "dash_array": [0, 0]})
+
+
+class TestOutlineCache:
+    """Test cases for the cache of origin-centred shape outlines."""
+    
+    def test_outline_is_translated_to_center(self):
+        """Test that cached outlines give the same vertices as direct computation."""
+        outline = geometry.regular_polygon_outline(50, 6, 30)
+        points = geometry.translate(outline, (100, 200))
+        for i, (x, y) in enumerate(points):
+            angle = 2 * math.pi * i / 6 + math.radians(30)
+            assert x == 100 + 50 * math.cos(angle)
+            assert y == 200 + 50 * math.sin(angle)
+    
+    def test_repeated_shapes_hit_cache(self):
+        """Test that same-sized shapes at different positions share one outline."""
+        geometry.outline_cache.clear()
+        canvas = Image.new('RGB', (300, 300), (255, 255, 255))
+        for x in range(20, 300, 40):
+            ShapeFactory.create_shape({
+                "type": "star", "center": [x, 150], "size": 15,
+                "fill_color": [255, 215, 0], "outline_color": [0, 0, 0], "border_width": 1
+            }).draw(canvas)
+        
+        info = geometry.outline_cache.info()
+        assert info["misses"] == 1
+        assert info["hits"] == 6
+        assert info["size"] == 1
+    
+    def test_pentagon_shares_regular_polygon_outline(self):
+        """Test that fixed-side polygons reuse regular polygon outlines."""
+        geometry.outline_cache.clear()
+        canvas = Image.new('RGB', (200, 200), (255, 255, 255))
+        for shape_type, extra in [("pentagon", {}), ("regular_polygon", {"n_sides": 5})]:
+            ShapeFactory.create_shape(dict({
+                "type": shape_type, "center": [100, 100], "radius": 40,
+                "fill_color": [0, 0, 255], "outline_color": [0, 0, 0], "border_width": 1
+            }, **extra)).draw(canvas)
+        assert geometry.outline_cache.info()["hits"] == 1
+    
+    def test_cache_is_bounded(self):
+        """Test that the least recently used outlines are evicted."""
+        cache = geometry.OutlineCache(maxsize=3)
+        for size in range(5):
+            cache.get(("star", size), lambda: ((0.0, 0.0),))
+        cache.get(("star", 4), lambda: ((0.0, 0.0),))
+        
+        info = cache.info()
+        assert len(cache) == 3
+        assert info["evictions"] == 2
+        assert info["misses"] == 5 and info["hits"] == 1
+
+
+class TestAdaptiveTessellation:
+    """Test cases for flatness-driven curve sampling."""
+    
+    def _points(self, shape_data, flatness=None):
+        shape = ShapeFactory.create_shape(shape_data)
+        if flatness is not None:
+            shape.flatness = flatness
+        return DisplayList.compile([shape], (3000, 3000)).ops[0].xy
+    
+    def _heart(self, size, **extra):
+        return dict({"type": "heart", "center": [500, 500], "size": size,
+                     "fill_color": [255, 0, 0], "outline_color": [0, 0, 0], "border_width": 1},
+                    **extra)
+    
+    def test_sine_wave_stays_within_tolerance(self):
+        """Test that the polyline deviates from the sine wave by at most the tolerance."""
+        points = self._points({
+            "type": "sine_wave_pattern", "start": [0, 300], "width": 2000, "amplitude": 80,
+            "frequency": 10, "fill_color": [0, 0, 0], "border_width": 1, "flatness": 0.5
+        })
+        assert len(points) < 2000
+        for (x0, y0), (x1, y1) in zip(points, points[1:]):
+            for k in range(1, 10):
+                x = x0 + (x1 - x0) * k / 10
+                curve = 300 + 80 * math.sin(2 * math.pi * 10 * x / 2000)
+                chord = y0 + (y1 - y0) * k / 10
+                assert abs(curve - chord) <= 0.5
+    
+    def test_point_count_follows_size(self):
+        """Test that small shapes get few vertices and large shapes many."""
+        small = len(self._points(self._heart(1)))
+        large = len(self._points(self._heart(40)))
+        assert small < 40 < 100 < large
+    
+    def test_tolerance_controls_point_count(self):
+        """Test per-shape and canvas-wide tolerances."""
+        default = len(self._points(self._heart(10)))
+        assert len(self._points(self._heart(10, flatness=2.0))) < default
+        assert len(self._points(self._heart(10), flatness=0.05)) > default
+        # The shape's own tolerance wins over the canvas-wide one
+        assert len(self._points(self._heart(10, flatness=2.0), flatness=0.05)) < default
+        # An explicit point count overrides the tolerance
+        assert len(self._points(self._heart(10, num_points=100))) == 100
+    
+    def test_invalid_flatness(self):
+        """Test that non-positive tolerances are rejected."""
+        with pytest.raises(ValidationError):
+            Heart(self._heart(10, flatness=0))
+
+
+class TestFractalTree:
+    """Test cases for level-by-level fractal tree generation."""
+    
+    def _tree(self, **extra):
+        return dict({"type": "fractal_tree", "base": [200, 390], "height": 120, "levels": 8,
+                     "angle": 25, "fill_color": [0, 100, 0], "border_width": 3}, **extra)
+    
+    def _draw_recursively(self, canvas, data):
+        """Reference implementation drawing one line per branch."""
+        draw = ImageDraw.Draw(canvas)
+        
+        def branch(start, direction, length, level):
+            end = (start[0] + length * math.cos(math.radians(direction)),
+                   start[1] - length * math.sin(math.radians(direction)))
+            draw.line([start, end], fill=tuple(data["fill_color"]),
+                      width=max(1, data["border_width"] - level + 1))
+            if level > 1:
+                branch(end, direction + data["angle"], length * 0.7, level - 1)
+                branch(end, direction - data["angle"], length * 0.7, level - 1)
+        
+        branch(tuple(data["base"]), 90, data["height"], data["levels"])
+        return canvas
+    
+    def test_matches_recursive_drawing(self, monkeypatch):
+        """Test that batched drawing matches drawing each branch separately."""
+        for backend in (geometry.np, None):
+            monkeypatch.setattr(geometry, "np", backend)
+            for data in (self._tree(), self._tree(levels=11, border_width=1, angle=17)):
+                expected = self._draw_recursively(Image.new('RGB', (400, 400), (255, 255, 255)), data)
+                canvas = ShapeFactory.create_shape(data).draw(Image.new('RGB', (400, 400), (255, 255, 255)))
+                assert ImageChops.difference(canvas, expected).getbbox() is None
+    
+    def test_branches_are_batched(self):
+        """Test that runs of equal-width levels share draw calls."""
+        shape = ShapeFactory.create_shape(self._tree(levels=10, border_width=1))
+        ops = DisplayList.compile([shape], (400, 400)).ops
+        # One polyline per outermost branch instead of one line per branch
+        assert len(ops) == 2 ** 9
+        assert sum(len(op.xy) - 1 for op in ops) == 2 ** 10 - 1
+    
+    def test_branch_budget(self):
+        """Test that trees exceeding the branch budget are rejected up front."""
+        with pytest.raises(ValidationError, match="max_branches"):
+            FractalTree(self._tree(levels=20))
+        with pytest.raises(ValidationError):
+            FractalTree(self._tree(levels=6, max_branches=62))
+        assert FractalTree(self._tree(levels=6, max_branches=63))
+
+
+class TestLocalCompositing:
+    """Test cases for compositing masked shapes within their bounds."""
+    
+    MOON = {"type": "moon", "center": [60, 50], "radius": 30, "phase_offset": 40,
+            "fill_color": [250, 240, 200], "outline_color": [90, 90, 90], "border_width": 2}
+    
+    def full_canvas_moon(self, size, data):
+        """Draw a crescent the way it was drawn before, through a canvas-sized layer."""
+        canvas = Image.new('RGB', size, (20, 30, 60))
+        x, y = data["center"]
+        radius = data["radius"]
+        layer = Image.new('RGBA', size, (0, 0, 0, 0))
+        draw = ImageDraw.Draw(layer)
+        draw.ellipse([x - radius, y - radius, x + radius, y + radius],
+                     fill=tuple(data["fill_color"]) + (255,),
+                     outline=tuple(data["outline_color"]) + (255,), width=data["border_width"])
+        shadow_x = x + abs(data["phase_offset"]) * radius // 100
+        draw.ellipse([shadow_x - radius, y - radius, shadow_x + radius, y + radius], fill=(0, 0, 0, 200))
+        canvas.paste(layer, (0, 0), layer)
+        return canvas
+    
+    @pytest.mark.parametrize("center", [[60, 50], [5, 95], [-100, 50]])
+    def test_crescent_matches_full_canvas_layer(self, center):
+        """Test that a crescent drawn in a bbox-sized layer matches a canvas-sized layer."""
+        data = dict(self.MOON, center=center)
+        canvas = Image.new('RGB', (200, 100), (20, 30, 60))
+        ShapeFactory.create_shape(data).draw(canvas)
+        assert canvas.tobytes() == self.full_canvas_moon((200, 100), data).tobytes()
+    
+    def test_layer_covers_only_the_shape(self, monkeypatch):
+        """Test that the temporary layer is the size of the shape, not the canvas."""
+        sizes = []
+        new = Image.new
+        
+        def record(mode, size, *args, **kwargs):
+            sizes.append(size)
+            return new(mode, size, *args, **kwargs)
+        
+        monkeypatch.setattr(Image, "new", record)
+        canvas = new('RGB', (4000, 3000))
+        ShapeFactory.create_shape(self.MOON).draw(canvas)
+        assert sizes and max(width * height for width, height in sizes) < 100 * 100
+    
+    def test_crescent_replays_from_display_list(self):
+        """Test that the bbox-sized paste is recorded and replayed in place."""
+        shape = ShapeFactory.create_shape(self.MOON)
+        direct = shape.draw(Image.new('RGB', (200, 100), (20, 30, 60)))
+        replayed = DisplayList.compile([shape], (200, 100)).execute(Image.new('RGB', (200, 100), (20, 30, 60)))
+        assert replayed.tobytes() == direct.tobytes()